@@ -26,6 +26,7 @@ CREATE TABLE hotels (
     approval_status VARCHAR(20) DEFAULT 'approved',
     images JSON,
     listing_id INT UNIQUE,
+    content_hash CHAR(32) COMMENT 'MD5 of the imported fields, for incremental imports',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_location (city, state),
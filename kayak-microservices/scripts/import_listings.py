@@ -1,23 +1,136 @@
 #!/usr/bin/env python3
+"""
+Import Inside Airbnb listings into the hotels / hotel_amenities tables.
+
+Modes:
+  (default)   serial read with csv.DictReader, capped at --limit rows
+  --pipeline  split the CSV into byte-range chunks, transform them in a
+              process pool and stream the rows into a single writer
+  --bulk      write rows to staging TSV files, LOAD DATA LOCAL INFILE them
+              into staging tables and merge into hotels in one statement
+              (needs local_infile=1 on the server); combines with --pipeline
+  --incremental
+              keep existing rows and upsert on listing_id; rows whose
+              content hash is unchanged are skipped (no DELETE-all)
+
+Hotel ids are uuid5(listing_id), so they are stable across runs.
+
+Connection settings come from DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME.
+"""
+import argparse
 import csv
-import mysql.connector
+import hashlib
+import io
 import json
+import os
 import re
+import sys
+import tempfile
+import time
 import uuid
-from decimal import Decimal
-
-# Database connection
-conn = mysql.connector.connect(
-    host='localhost',
-    port=3307,
-    user='root',
-    password='Somalwar1!',
-    database='kayak_listings'
-)
-cursor = conn.cursor()
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 # Owner ID from existing user
 OWNER_ID = '036e48a5-96a9-4086-b87f-c430d6f0d9ab'
+# Namespace for deterministic hotel ids: uuid5(LISTING_NAMESPACE, listing_id)
+LISTING_NAMESPACE = uuid.UUID('5d0b7a36-2f0e-5c63-9a4e-0c1f3b8e6a21')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(SCRIPT_DIR, 'stays-data/listings_reduced.csv')
+
+BATCH_SIZE = 500
+# Serial mode keeps the original dataset size; pipeline mode loads everything
+DEFAULT_LIMIT = 5000
+CHUNK_BYTES = 16 * 1024 * 1024
+# Bulk mode: rows per staging file / LOAD DATA statement
+BULK_FILE_ROWS = 100000
+
+FALLBACK_IMAGES = [
+    'https://images.unsplash.com/photo-1566073771259-6a8506099945',
+    'https://images.unsplash.com/photo-1542314831-068cd1dbfeeb',
+    'https://images.unsplash.com/photo-1564501049412-61c2a3083791',
+    'https://images.unsplash.com/photo-1571896349842-33c89424de2d'
+]
+
+HOTEL_COLUMNS = ['id', 'owner_id', 'name', 'address', 'city', 'state', 'zip_code',
+                 'star_rating', 'rating', 'price_per_night', 'num_rooms', 'room_type',
+                 'amenities', 'approval_status', 'images', 'listing_id', 'content_hash']
+INSERT_HOTEL_SQL = 'INSERT INTO hotels ({}) VALUES ({})'.format(
+    ', '.join(HOTEL_COLUMNS), ', '.join(['%s'] * len(HOTEL_COLUMNS)))
+INSERT_AMENITY_SQL = 'INSERT INTO hotel_amenities (hotel_id, amenity) VALUES (%s, %s)'
+# The id of an existing listing is kept, so bookings and amenities stay attached
+UPSERT_HOTEL_SQL = INSERT_HOTEL_SQL + ' ON DUPLICATE KEY UPDATE ' + ', '.join(
+    f'{c} = VALUES({c})' for c in HOTEL_COLUMNS if c not in ('id', 'listing_id'))
+
+
+# Bulk mode: connection-local staging tables. Staged hotels are keyed on
+# listing_id and loaded with REPLACE, so the last row per listing wins
+STAGE_HOTELS_SQL = """
+CREATE TEMPORARY TABLE stage_hotels (
+    id VARCHAR(36) NOT NULL,
+    owner_id VARCHAR(36),
+    name VARCHAR(255) NOT NULL,
+    address VARCHAR(255) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    state CHAR(2) NOT NULL,
+    zip_code VARCHAR(10) NOT NULL,
+    star_rating INT,
+    rating DECIMAL(3, 2),
+    price_per_night DECIMAL(10, 2) NOT NULL,
+    num_rooms INT NOT NULL,
+    room_type VARCHAR(50),
+    amenities JSON,
+    approval_status VARCHAR(20),
+    images JSON,
+    listing_id INT NOT NULL PRIMARY KEY,
+    content_hash CHAR(32)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+STAGE_AMENITIES_SQL = """
+CREATE TEMPORARY TABLE stage_amenities (
+    hotel_id VARCHAR(36) NOT NULL,
+    amenity VARCHAR(100) NOT NULL,
+    INDEX idx_stage_hotel (hotel_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+LOAD_SQL = """
+LOAD DATA LOCAL INFILE %s {mode} INTO TABLE {table}
+CHARACTER SET utf8mb4
+FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+LINES TERMINATED BY '\\n'
+({columns})
+"""
+# Listings already in hotels are kept, as the row-by-row path skips duplicates;
+# amenities of staged rows that were replaced or skipped match no hotel
+MERGE_HOTELS_SQL = """
+INSERT INTO hotels ({columns})
+SELECT {staged}
+FROM stage_hotels s
+LEFT JOIN hotels h ON h.listing_id = s.listing_id
+WHERE h.id IS NULL
+""".format(columns=', '.join(HOTEL_COLUMNS), staged=', '.join('s.' + c for c in HOTEL_COLUMNS))
+MERGE_AMENITIES_SQL = """
+INSERT INTO hotel_amenities (hotel_id, amenity)
+SELECT DISTINCT a.hotel_id, a.amenity
+FROM stage_amenities a
+JOIN hotels h ON h.id = a.hotel_id
+LEFT JOIN hotel_amenities existing ON existing.hotel_id = a.hotel_id AND existing.amenity = a.amenity
+WHERE existing.id IS NULL
+"""
+
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def connect(local_infile=False):
+    import mysql.connector
+    return mysql.connector.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '3307')),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', 'Somalwar1!'),
+        database=os.getenv('DB_NAME', 'kayak_listings'),
+        allow_local_infile=local_infile
+    )
 
 def clean_price(price_str):
     """Convert price string like '$150.00' to decimal"""
@@ -77,18 +190,18 @@ def get_star_rating(review_score):
 def extract_location(neighbourhood, neighbourhood_cleansed, latitude, longitude):
     """Extract city and state from neighbourhood"""
     city = neighbourhood_cleansed if neighbourhood_cleansed else (neighbourhood if neighbourhood else 'Brooklyn')
-    
+
     # Clean up city name and limit to 100 characters (database limit)
     city = str(city).replace(' ', ' ').strip()[:100]
-    
+
     # Default to NY for NYC neighborhoods
     state = 'NY'
-    
+
     # Generate zip code based on latitude/longitude ranges (NYC zip codes)
     try:
         lat = float(latitude) if latitude else 40.7128
         lon = float(longitude) if longitude else -74.0060
-        
+
         # Manhattan: 10001-10282
         if lat > 40.70 and lat < 40.88 and lon > -74.02 and lon < -73.93:
             zip_code = '10001'
@@ -105,243 +218,505 @@ def extract_location(neighbourhood, neighbourhood_cleansed, latitude, longitude)
             zip_code = '10001'
     except:
         zip_code = '10001'
-    
+
     return city, state, zip_code
 
-# Clear existing data
-print("Clearing existing hotels...")
-cursor.execute("DELETE FROM hotel_amenities")
-cursor.execute("DELETE FROM hotels")
-conn.commit()
+def transform_row(row):
+    """
+    One CSV row -> (hotel tuple in HOTEL_COLUMNS order, amenity list),
+    or None when the row is missing critical fields or is malformed.
+    """
+    # Skip if missing critical fields or row seems malformed
+    if not row.get('name') or not row.get('id'):
+        return None
 
-# Read CSV and import data
-print("Reading CSV file...")
-import os
-script_dir = os.path.dirname(os.path.abspath(__file__))
-csv_path = os.path.join(script_dir, 'stays-data/listings_reduced.csv')
-with open(csv_path, 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    
-    batch_size = 500
-    hotels_batch = []
-    amenities_batch = []
-    count = 0
-    
-    for row in reader:
-        try:
-            # Skip if missing critical fields or row seems malformed
-            if not row.get('name') or not row.get('id'):
-                continue
-            
-            # Skip if id is not numeric (indicates malformed CSV row)
-            try:
-                listing_id = int(str(row['id']).strip())
-            except:
-                continue
-            
-            # Store the original listing_id for review linking
-            original_listing_id = listing_id
-            
-            hotel_id = str(uuid.uuid4())
-            name = str(row['name'])[:255] if row.get('name') else 'Unnamed Property'
-            
-            # Extract location with coordinates
-            city, state, zip_code = extract_location(
-                row.get('neighbourhood', ''),
-                row.get('neighbourhood_cleansed', ''),
-                row.get('latitude', ''),
-                row.get('longitude', '')
-            )
-            
-            # Get address - combine neighbourhood with city for better context
-            neighbourhood = row.get('neighbourhood', '')
-            if neighbourhood:
-                address = f"{neighbourhood}, {city}, NY"[:255]
+    # Skip if id is not numeric (indicates malformed CSV row)
+    try:
+        listing_id = int(str(row['id']).strip())
+    except:
+        return None
+
+    hotel_id = str(uuid.uuid5(LISTING_NAMESPACE, str(listing_id)))
+    name = str(row['name'])[:255] if row.get('name') else 'Unnamed Property'
+
+    # Extract location with coordinates
+    city, state, zip_code = extract_location(
+        row.get('neighbourhood', ''),
+        row.get('neighbourhood_cleansed', ''),
+        row.get('latitude', ''),
+        row.get('longitude', '')
+    )
+
+    # Get address - combine neighbourhood with city for better context
+    neighbourhood = row.get('neighbourhood', '')
+    if neighbourhood:
+        address = f"{neighbourhood}, {city}, NY"[:255]
+    else:
+        address = f"{city}, NY"[:255]
+
+    # Price
+    price = clean_price(row.get('price', ''))
+
+    # Ratings
+    review_score = row.get('review_scores_rating', '')
+    star_rating = get_star_rating(review_score)
+
+    # Handle rating with validation
+    try:
+        if review_score and review_score != '' and review_score is not None:
+            rating_val = float(str(review_score).strip())
+            # Normalize rating to 0-5 scale
+            if rating_val > 5:
+                rating_val = rating_val / 20.0  # Convert from 0-100 to 0-5
+            # Ensure within valid range for DECIMAL(3,2)
+            rating = max(0.0, min(5.0, rating_val))
+        else:
+            rating = 4.0
+    except:
+        rating = 4.0
+
+    # Room details - handle invalid bedrooms data
+    try:
+        bedrooms_str = row.get('bedrooms', '1')
+        if bedrooms_str and bedrooms_str != '' and bedrooms_str is not None:
+            # Check if it's actually a number
+            bedrooms_clean = str(bedrooms_str).strip()
+            if bedrooms_clean.replace('.', '', 1).isdigit():
+                num_rooms = max(1, int(float(bedrooms_clean)))
             else:
-                address = f"{city}, NY"[:255]
-            
-            # Price
-            price = clean_price(row.get('price', ''))
-            
-            # Ratings
-            review_score = row.get('review_scores_rating', '')
-            star_rating = get_star_rating(review_score)
-            
-            # Handle rating with validation
-            try:
-                if review_score and review_score != '' and review_score is not None:
-                    rating_val = float(str(review_score).strip())
-                    # Normalize rating to 0-5 scale
-                    if rating_val > 5:
-                        rating_val = rating_val / 20.0  # Convert from 0-100 to 0-5
-                    # Ensure within valid range for DECIMAL(3,2)
-                    rating = max(0.0, min(5.0, rating_val))
-                else:
-                    rating = 4.0
-            except:
-                rating = 4.0
-            
-            # Room details - handle invalid bedrooms data
-            try:
-                bedrooms_str = row.get('bedrooms', '1')
-                if bedrooms_str and bedrooms_str != '' and bedrooms_str is not None:
-                    # Check if it's actually a number
-                    bedrooms_clean = str(bedrooms_str).strip()
-                    if bedrooms_clean.replace('.', '', 1).isdigit():
-                        num_rooms = max(1, int(float(bedrooms_clean)))
-                    else:
-                        num_rooms = 1
-                else:
-                    num_rooms = 1
-            except:
                 num_rooms = 1
-            
-            room_type = str(row.get('room_type', 'Entire home/apt'))[:50]
-            
-            # Amenities
-            amenities_list = parse_amenities(row.get('amenities', ''))
-            amenities_json = json.dumps(amenities_list)
-            
-            # Images - extract proper URLs
-            picture_url = row.get('picture_url', '')
-            images_list = []
-            if picture_url and picture_url.startswith('http'):
-                images_list.append(picture_url)
-            else:
-                # Use fallback images based on room type
-                fallback_images = [
-                    'https://images.unsplash.com/photo-1566073771259-6a8506099945',
-                    'https://images.unsplash.com/photo-1542314831-068cd1dbfeeb',
-                    'https://images.unsplash.com/photo-1564501049412-61c2a3083791',
-                    'https://images.unsplash.com/photo-1571896349842-33c89424de2d'
-                ]
-                import random
-                images_list.append(random.choice(fallback_images))
-            images_json = json.dumps(images_list)
-            
-            # Prepare hotel insert with listing_id for review linking
-            hotels_batch.append((
-                hotel_id,
-                OWNER_ID,
-                name,
-                address,
-                city,
-                state,
-                zip_code,
-                star_rating,
-                round(rating, 2),
-                round(price, 2),
-                num_rooms,
-                room_type,
-                amenities_json,
-                'approved',
-                images_json,
-                original_listing_id
-            ))
-            
-            # Prepare amenities inserts
-            for amenity in amenities_list:
-                if amenity:
-                    amenities_batch.append((hotel_id, amenity[:100]))
-            
-            count += 1
-            
-            # Insert in batches
-            if len(hotels_batch) >= batch_size:
-                try:
-                    cursor.executemany('''
-                        INSERT INTO hotels (id, owner_id, name, address, city, state, zip_code, 
-                                          star_rating, rating, price_per_night, num_rooms, room_type, 
-                                          amenities, approval_status, images, listing_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ''', hotels_batch)
-                    
-                    if amenities_batch:
-                        cursor.executemany('''
-                            INSERT INTO hotel_amenities (hotel_id, amenity)
-                            VALUES (%s, %s)
-                        ''', amenities_batch)
-                    
-                    conn.commit()
-                    print(f"Imported {count} hotels...")
-                except Exception as batch_error:
-                    conn.rollback()
-                    # Insert one by one to skip duplicates
-                    for hotel_data in hotels_batch:
-                        try:
-                            cursor.execute('''
-                                INSERT INTO hotels (id, owner_id, name, address, city, state, zip_code, 
-                                                  star_rating, rating, price_per_night, num_rooms, room_type, 
-                                                  amenities, approval_status, images, listing_id)
-                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ''', hotel_data)
-                            conn.commit()
-                        except:
-                            conn.rollback()
-                            continue
-                hotels_batch = []
-                amenities_batch = []
-            
-            # Limit to first 5000 for reasonable dataset size
-            if count >= 5000:
-                break
-                
-        except Exception as e:
-            # Only print first 50 errors to avoid spam
-            if count < 50 or count % 100 == 0:
-                print(f"Error processing row {count}: {e}")
-            continue
-    
-    # Insert remaining batch
-    if hotels_batch:
+        else:
+            num_rooms = 1
+    except:
+        num_rooms = 1
+
+    room_type = str(row.get('room_type', 'Entire home/apt'))[:50]
+
+    # Amenities
+    parsed_amenities = parse_amenities(row.get('amenities', ''))
+    amenities_json = json.dumps(parsed_amenities)
+    amenities_list = [a[:100] for a in parsed_amenities if a]
+
+    # Images - extract proper URLs, otherwise a fallback picked by listing so reruns agree
+    picture_url = row.get('picture_url', '')
+    if picture_url and picture_url.startswith('http'):
+        images_list = [picture_url]
+    else:
+        images_list = [FALLBACK_IMAGES[listing_id % len(FALLBACK_IMAGES)]]
+    images_json = json.dumps(images_list)
+
+    # Hotel row with listing_id for review linking
+    fields = (
+        hotel_id,
+        OWNER_ID,
+        name,
+        address,
+        city,
+        state,
+        zip_code,
+        star_rating,
+        round(rating, 2),
+        round(price, 2),
+        num_rooms,
+        room_type,
+        amenities_json,
+        'approved',
+        images_json,
+        listing_id
+    )
+    return fields + (content_hash(fields),), amenities_list
+
+
+def content_hash(fields):
+    """MD5 over everything but the id, so unchanged listings can be skipped on reruns"""
+    return hashlib.md5(json.dumps(fields[1:], default=str).encode('utf-8')).hexdigest()
+
+
+class BatchWriter:
+    """Buffers transformed rows and inserts them with executemany"""
+
+    def __init__(self, conn, batch_size=BATCH_SIZE):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+        self.hotels = []
+        self.amenities = []
+        self.written = 0
+
+    def add(self, hotel, amenities):
+        self.hotels.append(hotel)
+        self.amenities.extend((hotel[0], amenity) for amenity in amenities)
+        if len(self.hotels) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.hotels:
+            return
         try:
-            cursor.executemany('''
-                INSERT INTO hotels (id, owner_id, name, address, city, state, zip_code, 
-                                  star_rating, rating, price_per_night, num_rooms, room_type, 
-                                  amenities, approval_status, images, listing_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', hotels_batch)
-            
-            if amenities_batch:
-                cursor.executemany('''
-                    INSERT INTO hotel_amenities (hotel_id, amenity)
-                    VALUES (%s, %s)
-                ''', amenities_batch)
-            
-            conn.commit()
-        except Exception as batch_error:
-            conn.rollback()
+            self.cursor.executemany(INSERT_HOTEL_SQL, self.hotels)
+            if self.amenities:
+                self.cursor.executemany(INSERT_AMENITY_SQL, self.amenities)
+            self.conn.commit()
+            self.written += len(self.hotels)
+        except Exception:
+            self.conn.rollback()
             # Insert one by one to skip duplicates
-            for hotel_data in hotels_batch:
+            for hotel_data in self.hotels:
                 try:
-                    cursor.execute('''
-                        INSERT INTO hotels (id, owner_id, name, address, city, state, zip_code, 
-                                          star_rating, rating, price_per_night, num_rooms, room_type, 
-                                          amenities, approval_status, images, listing_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ''', hotel_data)
-                    conn.commit()
+                    self.cursor.execute(INSERT_HOTEL_SQL, hotel_data)
+                    self.conn.commit()
+                    self.written += 1
                 except:
-                    conn.rollback()
+                    self.conn.rollback()
+                    continue
+        self.hotels = []
+        self.amenities = []
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
+
+
+class UpsertWriter(BatchWriter):
+    """
+    Incremental writer keyed on listing_id. Existing (listing_id, id,
+    content_hash) triples are read once; unchanged listings are skipped
+    client-side, changed ones keep their id and have their amenities
+    replaced, and everything goes through INSERT ... ON DUPLICATE KEY UPDATE.
+    """
+
+    def __init__(self, conn, batch_size=BATCH_SIZE):
+        super().__init__(conn, batch_size)
+        self.cursor.execute("SELECT listing_id, id, content_hash FROM hotels WHERE listing_id IS NOT NULL")
+        self.existing = {listing_id: (hotel_id, digest) for listing_id, hotel_id, digest in self.cursor}
+        self.replaced = []
+        self.pending = set()
+        self.unchanged = 0
+        self.inserted = 0
+        self.updated = 0
+
+    def add(self, hotel, amenities):
+        listing_id = hotel[-2]
+        known = self.existing.get(listing_id)
+        if known is not None:
+            hotel_id, digest = known
+            if digest == hotel[-1]:
+                self.unchanged += 1
+                return
+            if hotel_id in self.pending:
+                # Listing repeated within this batch: write the earlier copy first
+                self.flush()
+            hotel = (hotel_id,) + hotel[1:]
+            self.replaced.append(hotel_id)
+        self.existing[listing_id] = (hotel[0], hotel[-1])
+        self.pending.add(hotel[0])
+        super().add(hotel, amenities)
+
+    def flush(self):
+        if not self.hotels:
+            return
+        try:
+            if self.replaced:
+                placeholders = ', '.join(['%s'] * len(self.replaced))
+                self.cursor.execute(f"DELETE FROM hotel_amenities WHERE hotel_id IN ({placeholders})", self.replaced)
+            self.cursor.executemany(UPSERT_HOTEL_SQL, self.hotels)
+            if self.amenities:
+                self.cursor.executemany(INSERT_AMENITY_SQL, self.amenities)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.written += len(self.hotels)
+        self.updated += len(self.replaced)
+        self.inserted += len(self.hotels) - len(self.replaced)
+        self.hotels = []
+        self.amenities = []
+        self.replaced = []
+        self.pending = set()
+
+    def close(self):
+        super().close()
+        print(f"Inserted {self.inserted}, updated {self.updated}, unchanged {self.unchanged}")
+
+
+def ensure_content_hash(conn):
+    """Add hotels.content_hash on databases created before it existed"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = 'hotels' AND column_name = 'content_hash'
+    """)
+    if not cursor.fetchone()[0]:
+        print("Adding hotels.content_hash...")
+        cursor.execute("ALTER TABLE hotels ADD COLUMN content_hash CHAR(32)")
+        conn.commit()
+    cursor.close()
+
+
+def tsv_line(values):
+    """One LOAD DATA line: tab-separated, backslash-escaped, NULL as \\N"""
+    return '\t'.join('\\N' if v is None else str(v).translate(_TSV_ESCAPES) for v in values) + '\n'
+
+
+class LoadDataWriter:
+    """
+    Bulk writer: rows go to staging TSV files, each file is loaded with
+    LOAD DATA LOCAL INFILE into temporary staging tables, and close()
+    dedupes and merges them into hotels / hotel_amenities with two
+    set-based INSERT ... SELECT statements in one transaction.
+    """
+
+    def __init__(self, conn, staging_dir=None, file_rows=BULK_FILE_ROWS):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.staging_dir = staging_dir
+        self.file_rows = file_rows
+        self.staged = 0
+        self.written = 0
+        self.cursor.execute(STAGE_HOTELS_SQL)
+        self.cursor.execute(STAGE_AMENITIES_SQL)
+        self._open()
+
+    def _open(self):
+        self.rows = 0
+        self.hotels_file = tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='', suffix='.tsv',
+                                                       prefix='hotels-', dir=self.staging_dir, delete=False)
+        self.amenities_file = tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='', suffix='.tsv',
+                                                          prefix='amenities-', dir=self.staging_dir, delete=False)
+
+    def add(self, hotel, amenities):
+        self.hotels_file.write(tsv_line(hotel))
+        for amenity in amenities:
+            self.amenities_file.write(tsv_line((hotel[0], amenity)))
+        self.rows += 1
+        if self.rows >= self.file_rows:
+            self.flush()
+            self._open()
+
+    def flush(self):
+        """Load the current staging files and remove them"""
+        for handle, mode, table, columns in ((self.hotels_file, 'REPLACE', 'stage_hotels', HOTEL_COLUMNS),
+                                             (self.amenities_file, '', 'stage_amenities', ['hotel_id', 'amenity'])):
+            handle.close()
+            try:
+                if os.path.getsize(handle.name):
+                    sql = LOAD_SQL.format(mode=mode, table=table, columns=', '.join(columns))
+                    self.cursor.execute(sql, (handle.name,))
+            finally:
+                os.unlink(handle.name)
+        self.staged += self.rows
+        print(f"Staged {self.staged} hotels...")
+        self.rows = 0
+
+    def merge(self):
+        try:
+            self.cursor.execute(MERGE_HOTELS_SQL)
+            self.written = self.cursor.rowcount
+            self.cursor.execute(MERGE_AMENITIES_SQL)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        print(f"Merged {self.written} of {self.staged} staged hotels")
+
+    def close(self):
+        self.flush()
+        self.merge()
+        self.cursor.execute("DROP TEMPORARY TABLE IF EXISTS stage_hotels, stage_amenities")
+        self.cursor.close()
+
+
+def clear_tables(conn):
+    print("Clearing existing hotels...")
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM hotel_amenities")
+    cursor.execute("DELETE FROM hotels")
+    conn.commit()
+    cursor.close()
+
+def import_serial(csv_path, writer, limit=DEFAULT_LIMIT):
+    """Original single-process import: one DictReader, one row at a time"""
+    count = 0
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                result = transform_row(row)
+                if result is None:
                     continue
+                writer.add(*result)
+                count += 1
+                if count % BATCH_SIZE == 0:
+                    print(f"Imported {count} hotels...")
+                if limit and count >= limit:
+                    break
+            except Exception as e:
+                # Only print first 50 errors to avoid spam
+                if count < 50 or count % 100 == 0:
+                    print(f"Error processing row {count}: {e}")
+                continue
+    return count
+
+
+def chunk_boundaries(path, chunk_bytes=CHUNK_BYTES):
+    """
+    (header, offsets) where offsets split the records after the header into
+    chunks of about `chunk_bytes`, each ending on a record boundary.
+    Quoted fields may contain newlines, so a newline only ends a record
+    when an even number of quote characters precede it.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        boundaries = [len(header)]
+        base = len(header)  # file offset of the current block
+        inside = 0  # 1 while inside a quoted field
+        target = base + chunk_bytes
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            pos = 0  # quote parity is known up to here
+            while base + len(block) > target:
+                start = max(target - base, pos)
+                inside ^= block.count(b'"', pos, start) & 1
+                pos = start
+                newline = block.find(b'\n', pos)
+                while newline != -1:
+                    inside ^= block.count(b'"', pos, newline) & 1
+                    pos = newline
+                    if not inside:
+                        break
+                    newline = block.find(b'\n', newline + 1)
+                if newline == -1:
+                    break  # record continues into the next block
+                pos = newline + 1
+                boundaries.append(base + pos)
+                target = base + pos + chunk_bytes
+            inside ^= block.count(b'"', pos) & 1
+            base += len(block)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return header, boundaries
+
+def transform_chunk(path, header, start, end):
+    """Worker: parse and transform the records in bytes [start, end)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    fieldnames = next(csv.reader([header.decode('utf-8')]))
+    rows = []
+    errors = 0
+    for row in csv.DictReader(io.StringIO(data.decode('utf-8', errors='replace'), newline=''), fieldnames=fieldnames):
+        try:
+            result = transform_row(row)
+        except Exception:
+            errors += 1
+            continue
+        if result is not None:
+            rows.append(result)
+    return rows, errors
+
+def import_pipeline(csv_path, writer, workers=None, chunk_bytes=CHUNK_BYTES, limit=None):
+    """
+    Transform byte-range chunks in a process pool and feed the results to
+    one writer as they complete. At most 2 chunks per worker are in flight,
+    so memory stays bounded however large the dump is.
+    """
+    header, boundaries = chunk_boundaries(csv_path, chunk_bytes)
+    ranges = list(zip(boundaries, boundaries[1:]))
+    workers = workers or os.cpu_count() or 1
+    print(f"Pipeline: {len(ranges)} chunks, {workers} workers")
+    count = 0
+    errors = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        remaining = iter(ranges)
+        done = False
+        while not done:
+            for start, end in remaining:
+                pending.add(pool.submit(transform_chunk, csv_path, header, start, end))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                rows, chunk_errors = future.result()
+                errors += chunk_errors
+                for hotel, amenities in rows:
+                    writer.add(hotel, amenities)
+                    count += 1
+                    if limit and count >= limit:
+                        done = True
+                        break
+                print(f"Imported {count} hotels...")
+                if done:
+                    break
+        for future in pending:
+            future.cancel()
+    if errors:
+        print(f"Skipped {errors} rows that failed to transform")
+    return count
+
+
+def print_stats(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM hotels")
+    total = cursor.fetchone()[0]
+    print(f"Total hotels in database: {total}")
+
+    cursor.execute("SELECT COUNT(DISTINCT city) FROM hotels")
+    cities = cursor.fetchone()[0]
+    print(f"Total cities: {cities}")
+
+    cursor.execute("SELECT city, COUNT(*) as cnt FROM hotels GROUP BY city ORDER BY cnt DESC LIMIT 10")
+    print("\nTop 10 cities:")
+    for city, cnt in cursor.fetchall():
+        print(f"  {city}: {cnt}")
+    cursor.close()
+
 
-print(f"\nTotal hotels imported: {count}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='listings CSV (default: %(default)s)')
+    parser.add_argument('--pipeline', action='store_true', help='multi-process byte-range pipeline')
+    parser.add_argument('--workers', type=int, default=None, help='pipeline worker processes (default: CPU count)')
+    parser.add_argument('--chunk-mb', type=float, default=CHUNK_BYTES / 2 ** 20, help='pipeline chunk size in MB')
+    parser.add_argument('--bulk', action='store_true', help='LOAD DATA into staging tables, then set-based merge')
+    parser.add_argument('--incremental', action='store_true',
+                        help='upsert on listing_id and skip unchanged rows instead of DELETE-all')
+    parser.add_argument('--staging-dir', default=None, help='directory for bulk staging TSV files (default: temp dir)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help=f'stop after this many hotels (default: {DEFAULT_LIMIT} serial, all with --pipeline)')
+    args = parser.parse_args(argv)
+    if args.bulk and args.incremental:
+        parser.error('--incremental upserts row batches; use it with --pipeline rather than --bulk')
+    limit = args.limit if args.limit is not None else (None if args.pipeline else DEFAULT_LIMIT)
 
-# Show statistics
-cursor.execute("SELECT COUNT(*) FROM hotels")
-total = cursor.fetchone()[0]
-print(f"Total hotels in database: {total}")
+    conn = connect(local_infile=args.bulk)
+    ensure_content_hash(conn)
+    if args.incremental:
+        writer = UpsertWriter(conn)
+    else:
+        clear_tables(conn)
+        writer = LoadDataWriter(conn, args.staging_dir) if args.bulk else BatchWriter(conn)
 
-cursor.execute("SELECT COUNT(DISTINCT city) FROM hotels")
-cities = cursor.fetchone()[0]
-print(f"Total cities: {cities}")
+    print("Reading CSV file...")
+    started = time.perf_counter()
+    if args.pipeline:
+        count = import_pipeline(args.csv, writer, args.workers, int(args.chunk_mb * 2 ** 20), limit)
+    else:
+        count = import_serial(args.csv, writer, limit)
+    writer.close()
+    elapsed = time.perf_counter() - started
 
-cursor.execute("SELECT city, COUNT(*) as cnt FROM hotels GROUP BY city ORDER BY cnt DESC LIMIT 10")
-print("\nTop 10 cities:")
-for city, cnt in cursor.fetchall():
-    print(f"  {city}: {cnt}")
+    print(f"\nTotal hotels imported: {count} in {elapsed:.1f}s")
+    print_stats(conn)
+    conn.close()
+    print("\nImport completed successfully!")
+    return 0
 
-cursor.close()
-conn.close()
 
-print("\nImport completed successfully!")
+if __name__ == '__main__':
+    sys.exit(main())
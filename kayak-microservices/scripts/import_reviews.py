@@ -1,96 +1,255 @@
 #!/usr/bin/env python3
+"""
+Import Inside Airbnb reviews into MongoDB (kayak.reviews).
+
+The CSV is parsed in the main thread and written by a pool of worker
+threads, each sending unordered bulk writes of --batch-size documents:
+upserts keyed on review_id by default (reruns are idempotent), or plain
+unordered insert_many with --insert. The unique review_id index is
+ensured first so upserts and duplicate detection stay indexed (reviews
+left repeated by older loaders are reported, or removed with --dedupe);
+the listing_id/date read indexes are built once the load has finished.
+Malformed CSV rows are counted and skipped.
+
+Connection settings come from MONGO_URI and MONGO_DB.
+"""
+import argparse
 import csv
-from pymongo import MongoClient
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
-# MongoDB connection
-client = MongoClient('mongodb://localhost:27017/')
-db = client['kayak']
-reviews_collection = db['reviews']
-
-# Clear existing reviews
-print("Clearing existing reviews...")
-reviews_collection.delete_many({})
-
-# Read CSV and import reviews
-print("Reading reviews CSV file...")
-with open('/Users/spartan/Stays/kayak-microservices/scripts/stays-data/reviews_reduced.csv', 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    
-    batch_size = 1000
-    reviews_batch = []
+from pymongo import ASCENDING, DESCENDING, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(SCRIPT_DIR, 'stays-data/reviews_reduced.csv')
+
+BATCH_SIZE = 1000
+WORKERS = 4
+# Keeps the original dataset size; 0 loads the whole file
+DEFAULT_LIMIT = 10000
+DUPLICATE_KEY = 11000
+
+
+def to_document(row):
+    """
+    One CSV row -> review document, or None when critical fields are missing
+    or malformed. Rows without a usable date get no 'date' here; it is
+    stamped when the review is first written, so reruns leave it alone.
+    """
+    # Skip if missing critical fields
+    if not row.get('listing_id') or not row.get('id'):
+        return None
+
+    # Parse ids as integers
+    try:
+        listing_id = int(str(row['listing_id']).strip())
+        review_id = int(row['id'])
+    except:
+        return None
+
+    # DictReader fills the fields missing from a short row with None
+    doc = {
+        'review_id': review_id,
+        'listing_id': listing_id,
+        'reviewer_id': row.get('reviewer_id') or '',
+        'reviewer_name': (row.get('reviewer_name') or 'Anonymous')[:100],
+        'comments': row['comments'][:1000] if row.get('comments') else 'Great place to stay!'
+    }
+
+    # Parse date
+    try:
+        date_str = row.get('date')
+        if date_str:
+            doc['date'] = datetime.strptime(date_str, '%Y-%m-%d')
+    except:
+        pass
+    return doc
+
+def read_batches(csv_path, batch_size=BATCH_SIZE, limit=DEFAULT_LIMIT, stats=None):
+    """Yield lists of review documents from the CSV; bad rows are counted in stats['skipped']"""
+    stats = stats if stats is not None else {}
+    stats.setdefault('skipped', 0)
+    batch = []
     count = 0
-    
-    for row in reader:
-        try:
-            # Skip if missing critical fields
-            if not row.get('listing_id') or not row.get('id'):
-                continue
-            
-            # Parse listing_id as integer
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
             try:
-                listing_id = int(str(row['listing_id']).strip())
-            except:
+                doc = to_document(row)
+            except Exception as e:
+                if stats['skipped'] < 50 or stats['skipped'] % 1000 == 0:
+                    print(f"Skipping CSV line {line}: {e}")
+                doc = None
+            if doc is None:
+                stats['skipped'] += 1
                 continue
-            
-            # Parse date
-            try:
-                date_str = row.get('date', '')
-                if date_str:
-                    review_date = datetime.strptime(date_str, '%Y-%m-%d')
-                else:
-                    review_date = datetime.now()
-            except:
-                review_date = datetime.now()
-            
-            # Create review document
-            review_doc = {
-                'review_id': int(row['id']),
-                'listing_id': listing_id,
-                'date': review_date,
-                'reviewer_id': row.get('reviewer_id', ''),
-                'reviewer_name': row.get('reviewer_name', 'Anonymous')[:100],
-                'comments': row.get('comments', '')[:1000] if row.get('comments') else 'Great place to stay!'
-            }
-            
-            reviews_batch.append(review_doc)
+            batch.append(doc)
             count += 1
-            
-            # Insert in batches
-            if len(reviews_batch) >= batch_size:
-                reviews_collection.insert_many(reviews_batch)
-                print(f"Imported {count} reviews...")
-                reviews_batch = []
-            
-            # Limit to reasonable dataset size
-            if count >= 10000:
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+            if limit and count >= limit:
                 break
-                
-        except Exception as e:
-            if count < 50 or count % 1000 == 0:
-                print(f"Error processing review {count}: {e}")
-            continue
-    
-    # Insert remaining batch
-    if reviews_batch:
-        reviews_collection.insert_many(reviews_batch)
-
-print(f"\nTotal reviews imported: {count}")
-
-# Show statistics
-total = reviews_collection.count_documents({})
-print(f"Total reviews in database: {total}")
-
-# Count reviews per listing (top 10)
-pipeline = [
-    {"$group": {"_id": "$listing_id", "count": {"$sum": 1}}},
-    {"$sort": {"count": -1}},
-    {"$limit": 10}
-]
-top_listings = list(reviews_collection.aggregate(pipeline))
-print("\nTop 10 listings by review count:")
-for item in top_listings:
-    print(f"  Listing {item['_id']}: {item['count']} reviews")
-
-client.close()
-print("\nReview import completed successfully!")
+    if batch:
+        yield batch
+
+
+def write_batch(collection, docs, upsert=True):
+    """
+    One unordered bulk write; returns (written, duplicates). Unordered
+    writes let the server apply the whole batch even when some documents
+    fail, so duplicates in --insert mode are counted rather than fatal.
+    """
+    now = datetime.now()
+    try:
+        if upsert:
+            result = collection.bulk_write([
+                UpdateOne({'review_id': doc['review_id']},
+                          {'$set': doc, '$setOnInsert': {'date': now}} if 'date' not in doc else {'$set': doc},
+                          upsert=True)
+                for doc in docs
+            ], ordered=False)
+            return result.upserted_count + result.modified_count, 0
+        result = collection.insert_many([doc if 'date' in doc else dict(doc, date=now) for doc in docs],
+                                        ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        duplicates = sum(1 for error in errors if error.get('code') == DUPLICATE_KEY)
+        if duplicates < len(errors):
+            raise
+        details = e.details
+        return details.get('nInserted', 0) + details.get('nUpserted', 0) + details.get('nModified', 0), duplicates
+
+def load(collection, batches, workers=WORKERS, upsert=True):
+    """Write batches from a pool of threads, at most 2 in flight per worker"""
+    written = 0
+    duplicates = 0
+    documents = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for batch in batches:
+            pending[pool.submit(write_batch, collection, batch, upsert)] = len(batch)
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    documents += pending.pop(future)
+                    batch_written, batch_duplicates = future.result()
+                    written += batch_written
+                    duplicates += batch_duplicates
+                print(f"Imported {documents} reviews...")
+        for future in pending:
+            documents += pending[future]
+            batch_written, batch_duplicates = future.result()
+            written += batch_written
+            duplicates += batch_duplicates
+    return documents, written, duplicates
+
+
+def find_duplicate_keys(collection, limit=None):
+    """Groups of documents sharing a review_id (older loaders inserted repeats)"""
+    pipeline = [
+        {'$group': {'_id': '$review_id', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ]
+    if limit:
+        pipeline.append({'$limit': limit})
+    return list(collection.aggregate(pipeline, allowDiskUse=True))
+
+def remove_duplicate_keys(collection):
+    """Keep the first-inserted document per review_id; returns how many were deleted"""
+    removed = 0
+    for group in find_duplicate_keys(collection):
+        extra = sorted(group['ids'])[1:]
+        removed += collection.delete_many({'_id': {'$in': extra}}).deleted_count
+    return removed
+
+def ensure_key_index(collection, dedupe=False):
+    """
+    Unique review_id index. A collection that already repeats review_ids
+    can't take it: with dedupe the repeats are removed first, otherwise the
+    duplicates are reported and the import stops before writing anything.
+    """
+    if 'review_id_unique' in collection.index_information():
+        return
+    if dedupe:
+        removed = remove_duplicate_keys(collection)
+        if removed:
+            print(f"Removed {removed} duplicate reviews")
+    else:
+        duplicates = find_duplicate_keys(collection, limit=10)
+        if duplicates:
+            sample = ', '.join(str(group['_id']) for group in duplicates)
+            raise SystemExit(
+                f"reviews already has documents sharing a review_id (e.g. {sample}); "
+                f"rerun with --dedupe to keep one per review_id, or --replace to reload from scratch")
+    collection.create_index([('review_id', ASCENDING)], unique=True, name='review_id_unique')
+
+def build_read_indexes(collection):
+    """Indexes for per-listing review lookups (latest first) and date scans"""
+    print("Building indexes...")
+    collection.create_index([('listing_id', ASCENDING), ('date', DESCENDING)], name='listing_id_date')
+    collection.create_index([('date', DESCENDING)], name='date')
+
+
+def print_stats(collection):
+    total = collection.count_documents({})
+    print(f"Total reviews in database: {total}")
+
+    # Count reviews per listing (top 10)
+    pipeline = [
+        {"$group": {"_id": "$listing_id", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 10}
+    ]
+    top_listings = list(collection.aggregate(pipeline))
+    print("\nTop 10 listings by review count:")
+    for item in top_listings:
+        print(f"  Listing {item['_id']}: {item['count']} reviews")
+
+
+def main(argv=None, client=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='reviews CSV (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='writer threads (default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='documents per bulk write')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='stop after this many reviews, 0 for all')
+    parser.add_argument('--insert', action='store_true',
+                        help='unordered insert_many instead of upserts (fastest into an empty collection)')
+    parser.add_argument('--replace', action='store_true', help='delete existing reviews first')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='drop existing reviews that repeat a review_id before creating the unique index')
+    args = parser.parse_args(argv)
+
+    # MongoDB connection
+    client = client or MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017/'),
+                                   maxPoolSize=max(args.workers, 1) + 2)
+    reviews_collection = client[os.getenv('MONGO_DB', 'kayak')]['reviews']
+
+    if args.replace:
+        print("Clearing existing reviews...")
+        reviews_collection.delete_many({})
+    ensure_key_index(reviews_collection, dedupe=args.dedupe)
+
+    print("Reading reviews CSV file...")
+    started = time.perf_counter()
+    read_stats = {}
+    batches = read_batches(args.csv, args.batch_size, args.limit, read_stats)
+    count, written, duplicates = load(reviews_collection, batches, args.workers, upsert=not args.insert)
+    elapsed = time.perf_counter() - started
+    print(f"\nTotal reviews imported: {count} ({written} written, {duplicates} duplicates, "
+          f"{read_stats['skipped']} bad rows skipped) in {elapsed:.1f}s")
+
+    build_read_indexes(reviews_collection)
+    print_stats(reviews_collection)
+
+    client.close()
+    print("\nReview import completed successfully!")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Bundle Optimizer
+Picks the best flight + hotel + car bundles that fit a trip budget
+"""
+
+from typing import List, Optional, Sequence
+import numpy as np
+
+DEFAULT_MERGE_LIMIT = 2000
+
+
+class Frontier:
+    """
+    Partial bundles as parallel arrays: total cost, summed quality and, per
+    component merged so far, the index of the chosen candidate.
+    """
+
+    def __init__(self, cost: np.ndarray, quality: np.ndarray, picks: np.ndarray):
+        self.cost = cost
+        self.quality = quality
+        self.picks = picks
+
+    @classmethod
+    def of(cls, cost: Sequence[float], quality: Sequence[float]) -> 'Frontier':
+        cost = np.asarray(cost, dtype=np.float64)
+        return cls(cost, np.asarray(quality, dtype=np.float64), np.arange(len(cost)).reshape(-1, 1))
+
+    def __len__(self):
+        return len(self.cost)
+
+    def take(self, idx: np.ndarray) -> 'Frontier':
+        return Frontier(self.cost[idx], self.quality[idx], self.picks[idx])
+
+
+def pareto_front(frontier: Frontier, limit: Optional[int] = None) -> Frontier:
+    """
+    Drop every bundle that another bundle beats on both cost and quality.
+    The survivors are sorted by cost with strictly rising quality; when more
+    than `limit` remain, an evenly spaced subset (ends included) is kept.
+    """
+    if len(frontier) == 0:
+        return frontier
+    order = np.lexsort((-frontier.quality, frontier.cost))
+    quality = frontier.quality[order]
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(quality)[:-1]))
+    keep = order[quality > best_before]
+    if limit is not None and len(keep) > limit:
+        keep = keep[np.unique(np.linspace(0, len(keep) - 1, limit).round().astype(np.int64))]
+    return frontier.take(keep)
+
+
+def merge(left: Frontier, right: Frontier, budget: float = np.inf,
+          limit: Optional[int] = DEFAULT_MERGE_LIMIT) -> Frontier:
+    """Pairwise combine two frontiers, keeping only affordable, non-dominated pairs"""
+    if len(left) == 0 or len(right) == 0:
+        return Frontier(np.empty(0), np.empty(0), np.empty((0, left.picks.shape[1] + 1), np.int64))
+    cost = left.cost[:, None] + right.cost[None, :]
+    i, j = np.nonzero(cost <= budget)
+    merged = Frontier(
+        cost[i, j],
+        left.quality[i] + right.quality[j],
+        np.column_stack((left.picks[i], right.picks[j, 0]))
+    )
+    return pareto_front(merged, limit)
+
+
+class BundleOptimizer:
+    """
+    Budget-constrained bundle search.
+    Each component (outbound, return, hotel, car) is first reduced to its
+    own cost/quality Pareto front, then fronts are merged one at a time.
+    Every merge drops pairs that cannot leave room for the cheapest
+    remaining components and is capped at `merge_limit`, so work is bounded
+    by front sizes rather than the full cross product of candidates.
+    """
+
+    def __init__(self, merge_limit=DEFAULT_MERGE_LIMIT):
+        self.merge_limit = merge_limit
+
+    def optimize(self, components: List[Frontier], budget: Optional[float] = None, top_n=5) -> Frontier:
+        """Top-N bundles by quality (cheapest first on ties); picks columns follow `components`"""
+        budget = np.inf if budget is None else float(budget)
+        fronts = [pareto_front(c.take(np.nonzero(np.isfinite(c.cost))[0])) for c in components]
+        if not fronts or any(len(f) == 0 for f in fronts):
+            return Frontier(np.empty(0), np.empty(0), np.empty((0, len(fronts)), np.int64))
+        # Cheapest possible spend on the components still to be merged
+        reserve = np.concatenate((np.cumsum([f.cost.min() for f in fronts[::-1]])[::-1][1:], [0.0]))
+
+        bundles = fronts[0]
+        bundles = bundles.take(np.nonzero(bundles.cost <= budget - reserve[0])[0])
+        for step, front in enumerate(fronts[1:], start=1):
+            last = step == len(fronts) - 1
+            bundles = merge(bundles, front, budget - reserve[step], None if last else self.merge_limit)
+
+        order = np.lexsort((bundles.cost, -bundles.quality))[:top_n]
+        return bundles.take(order)
@@ -3,18 +3,282 @@ Deal Detector Agent
 Identifies deals from listing data
 """
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from models.schemas import Deal
-import random
+import asyncio
+from services.price_history import PriceHistoryStore
+import numpy as np
+import pandas as pd
+
+# Score weights (sum to 1.0)
+PRICE_WEIGHT = 0.55
+SCARCITY_WEIGHT = 0.20
+RATING_WEIGHT = 0.25
+
+# A 30% price drop earns the full price component
+FULL_DISCOUNT = 0.30
+# Seat count at or above which a flight is not considered scarce
+SEATS_REFERENCE = 200.0
+# Ratings are mapped linearly from [3.0, 5.0] onto [0, 1]
+RATING_FLOOR = 3.0
+RATING_SPAN = 2.0
+# Bump whenever the formula or weights change; explanations are cached per version
+SCORE_VERSION = 1
+
+CABIN_CLASSES = ["economy", "premium economy", "business", "first"]
+MOCK_AIRPORTS = ["ATL", "BOS", "CLT", "DEN", "DFW", "DTW", "EWR", "IAD",
+                 "JFK", "LAX", "LGA", "MIA", "OAK", "ORD", "PHL", "SFO"]
+MOCK_AIRLINES = ["American Airlines", "Delta", "United", "Southwest",
+                 "Frontier", "JetBlue", "Spirit", "Alaska Airlines"]
+MOCK_START_DATE = "2025-12-01"
+MOCK_PRICE_RANGES = {
+    "economy": (80, 500),
+    "premium economy": (200, 800),
+    "business": (500, 1500),
+    "first": (1000, 3000)
+}
+
+
+def _number(value, default: float) -> float:
+    """float(value), with None and NaN as `default` (as nan_to_num does in score_batch)"""
+    if value is None:
+        return default
+    value = float(value)
+    return default if value != value else value
+
 
 class DealDetector:
-    def __init__(self):
+    def __init__(self, threshold=0.7, price_history: Optional[PriceHistoryStore] = None, tagger=None):
+        self.threshold = threshold
+        self.price_history = price_history
+        # Optional OfferTaggerAgent; deals are tagged in one batch per detection
+        self.tagger = tagger
+
+    def calculate_deal_score(self, listing):
         """Calculate deal score for a listing"""
-        # TODO: Calculate score based on price history, seasonality, etc.
-        return 0.0
-    
-    def is_deal(self, listing, threshold=0.7):
+        price = _number(listing.get('price'), 0.0)
+        base_price = _number(listing.get('base_price'), 0.0)
+        discount_percent = _number(listing.get('discount_percent'), 0.0)
+        # 0 seats left is maximally scarce, not unknown
+        seats_left = _number(listing.get('seats_left'), SEATS_REFERENCE)
+        rating = _number(listing.get('rating'), 0.0)
+
+        price_drop = (base_price - price) / base_price if base_price > 0 else 0.0
+        price_drop = max(price_drop, discount_percent / 100.0)
+        if self.price_history is not None and listing.get('departure_time') is not None:
+            position = self.price_history.price_position(
+                listing.get('departure_airport'), listing.get('arrival_airport'),
+                listing.get('cabin_class'), listing['departure_time'], price
+            )
+            if position is not None:
+                price_drop = max(price_drop, position['below_median'])
+        price_score = min(max(price_drop / FULL_DISCOUNT, 0.0), 1.0)
+        scarcity_score = min(max(1.0 - seats_left / SEATS_REFERENCE, 0.0), 1.0)
+        rating_score = min(max((rating - RATING_FLOOR) / RATING_SPAN, 0.0), 1.0)
+
+        return (PRICE_WEIGHT * price_score
+                + SCARCITY_WEIGHT * scarcity_score
+                + RATING_WEIGHT * rating_score)
+
+    def is_deal(self, listing, threshold=None):
         """Check if listing qualifies as a deal"""
+        if threshold is None:
+            threshold = self.threshold
         score = self.calculate_deal_score(listing)
         return score >= threshold
 
+    def score_components(self, price, base_price, discount_percent, seats_left, rating,
+                         route_median=None) -> Dict[str, np.ndarray]:
+        """
+        Weighted per-factor contributions ('price', 'scarcity', 'rating') for a
+        candidate set, plus the inputs behind them: 'price_drop' (fraction
+        off, best of list price, discount and route median) and 'below_median'
+        (fraction below the route's weekly median, NaN if unknown).
+        """
+        price = np.asarray(price, dtype=np.float64)
+        base_price = np.asarray(base_price, dtype=np.float64)
+        discount = np.nan_to_num(np.asarray(discount_percent, dtype=np.float64)) / 100.0
+        seats_left = np.nan_to_num(np.asarray(seats_left, dtype=np.float64), nan=SEATS_REFERENCE)
+        rating = np.nan_to_num(np.asarray(rating, dtype=np.float64))
+
+        safe_base = np.where(base_price > 0, base_price, 1.0)
+        price_drop = np.where(base_price > 0, (base_price - price) / safe_base, 0.0)
+        price_drop = np.maximum(price_drop, discount)
+        below_median = np.full(len(price), np.nan)
+        if route_median is not None:
+            median = np.asarray(route_median, dtype=np.float64)
+            known = np.isfinite(median) & (median > 0)
+            below_median = np.where(known, (median - price) / np.where(known, median, 1.0), np.nan)
+            price_drop = np.maximum(price_drop, np.nan_to_num(below_median))
+
+        return {
+            'price_drop': price_drop,
+            'below_median': below_median,
+            'price': PRICE_WEIGHT * np.clip(price_drop / FULL_DISCOUNT, 0.0, 1.0),
+            'scarcity': SCARCITY_WEIGHT * np.clip(1.0 - seats_left / SEATS_REFERENCE, 0.0, 1.0),
+            'rating': RATING_WEIGHT * np.clip((rating - RATING_FLOOR) / RATING_SPAN, 0.0, 1.0)
+        }
+
+    def score_batch(self, price, base_price, discount_percent, seats_left, rating, route_median=None):
+        """
+        Score a whole candidate set in one vectorized pass.
+        Each argument is an array-like of equal length; returns a float64 array
+        matching calculate_deal_score element for element. route_median, when
+        given, credits prices below the route's historical median (NaN = unknown).
+        """
+        parts = self.score_components(price, base_price, discount_percent, seats_left, rating, route_median)
+        return parts['price'] + parts['scarcity'] + parts['rating']
+
+    def frame_components(self, flights: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """score_components for a DataFrame of `flights` rows, with 'route_median' added"""
+        route_median = None
+        if self.price_history is not None and 'departure_time' in flights:
+            route_median = self.price_history.medians_for(flights)
+        parts = self.score_components(
+            flights['price'].to_numpy(),
+            flights['base_price'].to_numpy(),
+            flights['discount_percent'].to_numpy(),
+            flights['seats_left'].to_numpy(),
+            flights['rating'].to_numpy(),
+            route_median
+        )
+        parts['route_median'] = route_median if route_median is not None else np.full(len(flights), np.nan)
+        return parts
+
+    def score_frame(self, flights: pd.DataFrame) -> np.ndarray:
+        """Score a DataFrame of `flights` rows"""
+        parts = self.frame_components(flights)
+        return parts['price'] + parts['scarcity'] + parts['rating']
+
+    def detect(self, flights: pd.DataFrame, threshold=None, limit: Optional[int] = None) -> List[Deal]:
+        """Return the candidates scoring above threshold as Deals, best first"""
+        if threshold is None:
+            threshold = self.threshold
+        parts = self.frame_components(flights)
+        scores = parts['price'] + parts['scarcity'] + parts['rating']
+        idx = np.flatnonzero(scores >= threshold)
+        if limit is not None and len(idx) > limit:
+            idx = idx[np.argpartition(-scores[idx], limit - 1)[:limit]]
+        idx = idx[np.argsort(-scores[idx], kind='stable')]
+        return self._deals(flights.iloc[idx], scores[idx], parts, idx)
+
+    def rescore(self, listings: List[dict]) -> Tuple[List[Deal], List[str]]:
+        """
+        Re-score only the changed flight rows.
+        Returns (deals, dropped_ids): listings that now qualify as deals and
+        ids of listings that no longer do.
+        """
+        if not listings:
+            return [], []
+        flights = pd.DataFrame(listings)
+        if self.price_history is not None and 'departure_time' in flights:
+            self.price_history.observe_frame(flights)
+        parts = self.frame_components(flights)
+        scores = parts['price'] + parts['scarcity'] + parts['rating']
+        idx = np.flatnonzero(scores >= self.threshold)
+        deals = self._deals(flights.iloc[idx], scores[idx], parts, idx)
+        dropped = [str(i) for i in flights['id'].to_numpy()[scores < self.threshold]]
+        return deals, dropped
+
+    def _deals(self, selected: pd.DataFrame, scores, parts, idx) -> List[Deal]:
+        rows = selected.to_dict('records')
+        return [self._to_deal(row, score, tags, factors)
+                for row, score, tags, factors in zip(rows, scores, self._tags(selected),
+                                                     self._factors(selected, parts, idx))]
+
+    def _factors(self, selected: pd.DataFrame, parts, idx) -> List[dict]:
+        """Per-deal scoring inputs and contributions, kept on the Deal for explanations"""
+        if selected.empty:
+            return []
+        columns = {name: np.round(parts[name][idx], 4) for name in ('price_drop', 'below_median')}
+        columns['route_median'] = np.round(parts['route_median'][idx], 2)
+        contributions = {name: np.round(parts[name][idx], 4).tolist() for name in ('price', 'scarcity', 'rating')}
+        if 'departure_time' in selected:
+            departure = pd.to_datetime(selected['departure_time'])
+            week_of = (departure.dt.normalize() - pd.to_timedelta(departure.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
+            week_of = week_of.tolist()
+        else:
+            week_of = [None] * len(selected)
+        seats = pd.to_numeric(selected['seats_left'], errors='coerce').tolist()
+        ratings = pd.to_numeric(selected['rating'], errors='coerce').tolist()
+        # NaN (unknown median) becomes None so the factors stay JSON-safe
+        columns = {name: [None if np.isnan(v) else v for v in values.tolist()] for name, values in columns.items()}
+        return [{
+            'price_drop': columns['price_drop'][i],
+            'below_median': columns['below_median'][i],
+            'route_median': columns['route_median'][i],
+            'week_of': week_of[i],
+            'seats_left': None if seats[i] != seats[i] else int(seats[i]),
+            'rating': None if ratings[i] != ratings[i] else float(ratings[i]),
+            'contributions': {name: values[i] for name, values in contributions.items()}
+        } for i in range(len(selected))]
+
+    def _tags(self, flights: pd.DataFrame) -> List[List[str]]:
+        if self.tagger is None or flights.empty:
+            return [[] for _ in range(len(flights))]
+        return self.tagger.tag_flights(flights)
+
+    def _to_deal(self, row, score, tags=(), factors=None) -> Deal:
+        base_price = float(row['base_price'])
+        price = float(row['price'])
+        discount = max(float(row['discount_percent']),
+                       (base_price - price) / base_price * 100 if base_price > 0 else 0.0)
+        return Deal(
+            id=str(row['id']),
+            title=f"{row['departure_airport']} to {row['arrival_airport']} ({row['cabin_class']})",
+            description=f"{row.get('airline', 'Flight')} {row.get('flight_code', '')}".strip(),
+            price=round(price, 2),
+            original_price=round(base_price, 2),
+            discount_percentage=round(discount, 1),
+            listing_type='flight',
+            route=f"{row['departure_airport']}-{row['arrival_airport']}",
+            tags=list(tags),
+            score=round(float(score), 4),
+            score_version=SCORE_VERSION,
+            factors=factors
+        )
+
+    def generate_mock_flights(self, n=5000, seed=None) -> pd.DataFrame:
+        """Generate synthetic flight candidates shaped like the `flights` table"""
+        rng = np.random.default_rng(seed)
+        origin = rng.integers(0, len(MOCK_AIRPORTS), n)
+        dest = (origin + rng.integers(1, len(MOCK_AIRPORTS), n)) % len(MOCK_AIRPORTS)
+        cabin = rng.integers(0, len(CABIN_CLASSES), n)
+        lows = np.array([MOCK_PRICE_RANGES[c][0] for c in CABIN_CLASSES], dtype=np.float64)
+        highs = np.array([MOCK_PRICE_RANGES[c][1] for c in CABIN_CLASSES], dtype=np.float64)
+        base_price = rng.uniform(lows[cabin], highs[cabin])
+        is_deal = rng.random(n) > 0.85
+        discount = np.where(is_deal, rng.integers(10, 31, n), 0)
+        price = base_price * (1 - discount / 100.0) * rng.uniform(0.95, 1.05, n)
+        seats_total = rng.integers(100, 201, n)
+        departure_time = (pd.Timestamp(MOCK_START_DATE)
+                          + pd.to_timedelta(rng.integers(0, 90 * 24 * 60, n), unit='min'))
+        duration = rng.integers(90, 361, n)
+        airline = rng.integers(0, len(MOCK_AIRLINES), n)
+        return pd.DataFrame({
+            'id': [f"mock-{i}" for i in range(n)],
+            'flight_code': [f"{MOCK_AIRLINES[a][:2].upper()}{c}" for a, c in zip(airline, rng.integers(100, 1000, n))],
+            'airline': np.array(MOCK_AIRLINES)[airline],
+            'departure_airport': np.array(MOCK_AIRPORTS)[origin],
+            'arrival_airport': np.array(MOCK_AIRPORTS)[dest],
+            'departure_time': departure_time,
+            'arrival_time': departure_time + pd.to_timedelta(duration, unit='min'),
+            'duration': duration,
+            'stops': rng.choice([0, 1, 2], n, p=[0.6, 0.3, 0.1]),
+            'cabin_class': np.array(CABIN_CLASSES)[cabin],
+            'price': price.round(2),
+            'base_price': base_price.round(2),
+            'discount_percent': discount,
+            'seats_left': rng.integers(10, seats_total + 1),
+            'rating': rng.uniform(3.5, 5.0, n).round(2)
+        })
+
+    async def run_mock_detection(self, n=5000) -> List[Deal]:
+        """Run detection over synthetic flight inventory (MVP data source)"""
+        return await asyncio.to_thread(self._mock_detection, n)
+
+    def _mock_detection(self, n) -> List[Deal]:
+        flights = self.generate_mock_flights(n)
+        if self.price_history is not None:
+            self.price_history.observe_frame(flights)
+        return self.detect(flights)
@@ -0,0 +1,276 @@
+"""
+Entity Extractor
+Pulls airports, cities, dates and budgets out of concierge queries
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import csv
+import os
+import re
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AIRPORTS_CSV_PATHS = [
+    os.path.join(AGENT_DIR, 'data/datasets/airports.csv'),
+    os.path.join(AGENT_DIR, '../../scripts/flight-data/airports.csv'),
+]
+
+TOKEN_RE = re.compile(r"[a-z0-9']+", re.IGNORECASE)
+
+# Lowercase IATA codes are only trusted right after one of these words,
+# and never when they are also common English words
+LOCATION_CUES = {'to', 'from', 'in', 'at', 'into', 'near', 'via'}
+COMMON_WORDS = {
+    'the', 'and', 'for', 'may', 'can', 'you', 'are', 'any', 'all', 'one', 'two', 'new', 'out',
+    'get', 'buy', 'how', 'not', 'but', 'car', 'day', 'bus', 'sun', 'sea', 'big', 'old', 'top',
+    'fly', 'air', 'van', 'suv', 'inn', 'spa', 'bar', 'pub', 'zoo', 'fun', 'eat', 'see', 'now',
+}
+ORIGIN_CUES = {'from', 'leaving', 'departing'}
+DESTINATION_CUES = {'to', 'into', 'in', 'at', 'visit', 'visiting'}
+
+LISTING_TYPES = {
+    'flight': 'flight', 'flights': 'flight', 'fly': 'flight', 'flying': 'flight', 'airfare': 'flight',
+    'hotel': 'hotel', 'hotels': 'hotel', 'stay': 'hotel', 'stays': 'hotel', 'room': 'hotel', 'rooms': 'hotel',
+    'car': 'car', 'cars': 'car', 'rental': 'car', 'suv': 'car',
+}
+
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+    'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7, 'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10, 'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12,
+}
+WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+_MONTH = '|'.join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY = '|'.join(WEEKDAYS)
+DATE_RE = re.compile(
+    r"\b(?:"
+    r"(?P<iso>\d{4}-\d{2}-\d{2})"
+    r"|(?P<us>\d{1,2}/\d{1,2}(?:/\d{2,4})?)"
+    rf"|(?P<md>(?:{_MONTH})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?)"
+    rf"|(?P<dm>\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:{_MONTH})(?:,?\s+\d{{4}})?)"
+    r"|(?P<rel>today|tonight|tomorrow|(?:this|next)\s+weekend)"
+    rf"|(?P<wd>(?:next\s+|this\s+|on\s+)?(?:{_WEEKDAY}))"
+    r")\b",
+    re.IGNORECASE
+)
+BUDGET_RE = re.compile(
+    r"(?:(?P<cue>under|below|less\s+than|max(?:imum)?|up\s+to|budget(?:\s+of|\s+is)?|around|about|for)\s+)?"
+    r"(?P<cur>\$)?(?P<amount>(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{1,2})?)\s*(?P<k>k\b)?"
+    r"(?:\s*(?P<suffix>dollars|usd|bucks))?",
+    re.IGNORECASE
+)
+MAX_CUES = {'under', 'below', 'less than', 'max', 'maximum', 'up to', 'budget', 'budget of', 'budget is'}
+
+
+class EntityExtractor:
+    """
+    Dictionary-backed extractor.
+    City names and IATA codes live in a token trie built once at startup;
+    extraction walks the query's tokens once, trying the longest dictionary
+    phrase at each position, so cost is linear in query length no matter
+    how many airports are loaded.
+    """
+
+    def __init__(self):
+        self._trie: Dict = {}
+        self._max_phrase = 1
+        self.airports: Dict[str, dict] = {}
+
+    @classmethod
+    def from_csv(cls, path: Optional[str] = None) -> 'EntityExtractor':
+        extractor = cls()
+        path = path or os.getenv('AIRPORTS_CSV') or next(
+            (p for p in AIRPORTS_CSV_PATHS if os.path.exists(p)), None)
+        if path is None or not os.path.exists(path):
+            print("Airports dictionary not found; location extraction disabled")
+            return extractor
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        groups: Dict[Tuple[str, str], dict] = {}
+        for row in rows:
+            iata = (row.get('IATA') or '').strip().upper()
+            if len(iata) != 3:
+                continue
+            city = (row.get('City_Name') or '').split(',')[0].strip()
+            airport = {
+                'iata': iata,
+                'name': (row.get('AirportName') or '').strip(),
+                'city': city,
+                'city_code': (row.get('City_IATA') or iata).strip().upper(),
+                'country': row.get('Country_CodeA2', '')
+            }
+            extractor.airports.setdefault(iata, airport)
+            if not city:
+                continue
+            group = groups.setdefault((city.lower(), airport['country']), {
+                'kind': 'city', 'city': city, 'city_code': airport['city_code'],
+                'country': airport['country'], 'airports': []
+            })
+            group['airports'].append(iata)
+        # Ambiguous city names resolve to the best-served city, US first on ties
+        cities: Dict[str, dict] = {}
+        for (name, country), group in groups.items():
+            current = cities.get(name)
+            rank = (len(group['airports']), country == 'US')
+            if current is None or rank > (len(current['airports']), current['country'] == 'US'):
+                cities[name] = group
+        for name, entry in cities.items():
+            extractor._insert(name, entry)
+        for iata, airport in extractor.airports.items():
+            extractor._insert(iata.lower(), dict(airport, kind='airport'), overwrite=False)
+        return extractor
+
+    def _insert(self, phrase: str, value: dict, overwrite=True):
+        words = [w.lower() for w in TOKEN_RE.findall(phrase)]
+        if not words:
+            return
+        node = self._trie
+        for word in words:
+            node = node.setdefault(word, {})
+        if overwrite or '$' not in node:
+            node['$'] = value
+        self._max_phrase = max(self._max_phrase, len(words))
+
+    def extract(self, text: str, today: Optional[date] = None) -> dict:
+        """Return structured entities for a query"""
+        today = today or date.today()
+        tokens = [(m.group(), m.start(), m.end()) for m in TOKEN_RE.finditer(text)]
+        entities: dict = {}
+
+        listing_type = next((LISTING_TYPES[t.lower()] for t, _, _ in tokens if t.lower() in LISTING_TYPES), None)
+        if listing_type:
+            entities['type'] = listing_type
+
+        dates, date_spans = self._dates(text, today)
+
+        locations = self._locations(tokens, date_spans)
+        if locations:
+            entities['locations'] = [loc for loc, _ in locations]
+            for loc, cue in locations:
+                if cue in ORIGIN_CUES:
+                    entities.setdefault('origin', loc)
+                elif cue in DESTINATION_CUES:
+                    entities.setdefault('destination', loc)
+            if 'destination' not in entities and 'origin' not in entities:
+                entities['destination'] = locations[0][0]
+
+        if dates:
+            entities['dates'] = dates
+            entities['start_date'] = dates[0]
+            if len(dates) > 1:
+                entities['end_date'] = dates[1]
+
+        budget = self._budget(text, date_spans)
+        if budget:
+            entities['budget'] = budget
+        return entities
+
+    def _locations(self, tokens, date_spans=()) -> List[Tuple[dict, Optional[str]]]:
+        found = []
+        words = [t[0].lower() for t in tokens]
+        # Tokens inside a date are not places: "Dec 20" is not Decatur (DEC)
+        in_date = [any(s <= start < e for s, e in date_spans) for _, start, _ in tokens]
+        i = 0
+        while i < len(tokens):
+            cue = words[i - 1] if i > 0 else None
+            node, match, length = self._trie, None, 0
+            for j in range(i, min(i + self._max_phrase, len(tokens))):
+                node = node.get(words[j]) if not in_date[j] else None
+                if node is None:
+                    break
+                value = node.get('$')
+                if value is not None and self._accept(value, tokens[i][0], cue, j - i + 1):
+                    match, length = value, j - i + 1
+            if match is None:
+                i += 1
+                continue
+            found.append((self._entity(match, tokens[i][1], tokens[i + length - 1][2]), cue))
+            i += length
+        return found
+
+    def _accept(self, value, raw, cue, length) -> bool:
+        if value['kind'] == 'city':
+            # "a nice hotel" is not Nice, France; "to nice" or "Nice" may be
+            return length > 1 or raw[0].isupper() or cue in LOCATION_CUES
+        # "SFO" anywhere, "sfo" only in a location context like "to sfo"
+        return raw.isupper() or (length == 1 and cue in LOCATION_CUES and raw.lower() not in COMMON_WORDS)
+
+    def _entity(self, value, start, end) -> dict:
+        entity = {k: v for k, v in value.items() if k != 'kind'}
+        entity['type'] = value['kind']
+        if value['kind'] == 'city':
+            entity['airports'] = list(value['airports'])
+        entity['span'] = [start, end]
+        return entity
+
+    def _dates(self, text, today) -> Tuple[List[str], List[Tuple[int, int]]]:
+        dates, spans = [], []
+        for m in DATE_RE.finditer(text):
+            parsed = self._parse_date(m, today)
+            if parsed is not None:
+                dates.append(parsed.isoformat())
+                spans.append(m.span())
+        return dates, spans
+
+    def _parse_date(self, m, today) -> Optional[date]:
+        value = m.group().lower()
+        try:
+            if m.group('iso'):
+                return date.fromisoformat(value)
+            if m.group('us'):
+                parts = [int(p) for p in value.split('/')]
+                year = parts[2] if len(parts) == 3 else None
+                if year is not None and year < 100:
+                    year += 2000
+                return self._upcoming(today, parts[0], parts[1], year)
+            if m.group('md') or m.group('dm'):
+                words = re.findall(r"[a-z]+|\d+", value)
+                month = next(MONTHS[w] for w in words if w in MONTHS)
+                numbers = [int(w) for w in words if w.isdigit()]
+                day = next(n for n in numbers if n <= 31)
+                year = next((n for n in numbers if n > 31), None)
+                return self._upcoming(today, month, day, year)
+        except (ValueError, StopIteration):
+            return None
+        if m.group('rel'):
+            if value in ('today', 'tonight'):
+                return today
+            if value == 'tomorrow':
+                return today + timedelta(days=1)
+            saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+            return saturday + timedelta(days=7) if value.startswith('next') else saturday
+        words = value.split()
+        weekday = WEEKDAYS[words[-1]]
+        ahead = (weekday - today.weekday()) % 7 or 7
+        if words[0] == 'next' and ahead < 7 - today.weekday():
+            ahead += 7
+        return today + timedelta(days=ahead)
+
+    def _upcoming(self, today, month, day, year=None) -> date:
+        if year is not None:
+            return date(year, month, day)
+        candidate = date(today.year, month, day)
+        return candidate if candidate >= today else date(today.year + 1, month, day)
+
+    def _budget(self, text, date_spans) -> Optional[dict]:
+        for m in BUDGET_RE.finditer(text):
+            cue = re.sub(r"\s+", ' ', (m.group('cue') or '').lower())
+            if not (m.group('cur') or m.group('suffix') or (cue and cue != 'for')):
+                continue
+            start, end = m.span('amount')
+            if any(s <= start < e for s, e in date_spans):
+                continue
+            amount = float(m.group('amount').replace(',', ''))
+            if m.group('k'):
+                amount *= 1000
+            return {
+                'amount': amount,
+                'currency': 'USD',
+                'qualifier': 'max' if cue in MAX_CUES else 'approx',
+                'span': [m.start(), m.end()]
+            }
+        return None
@@ -3,14 +3,189 @@ Explainer Agent
 Provides explanations for AI decisions
 """
 
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Union
+import os
+from services.parse_cache import LRUCache
+
+DEFAULT_CACHE_SIZE = 20000
+DEFAULT_CACHE_TTL = 3600.0
+
+# A factor has to contribute this much of the score to be mentioned
+MIN_CONTRIBUTION = 0.05
+MAX_REASONS = 3
+FEW_SEATS = 9
+LIMITED_SEATS = 30
+
+# Compiled once; each entry is the bound `format` of its template
+DEAL_TEMPLATES = {
+    'below_median': "{pct}% below the usual {route} fare for the week of {week}".format,
+    'below_median_no_week': "{pct}% below the usual {route} fare".format,
+    'price_drop': "{pct}% off the regular ${original:,.0f}".format,
+    'few_seats': "only {seats} seats left at this price".format,
+    'limited_seats': "{seats} seats left".format,
+    'top_rating': "highly rated at {rating:.1f}/5".format,
+    'rating': "rated {rating:.1f}/5".format,
+}
+RECOMMENDATION_TEMPLATES = {
+    'budget': "${cost:,.0f} in total, within your ${budget:,.0f} budget".format,
+    'cost': "${cost:,.0f} in total".format,
+    'direct': "direct flights".format,
+    'stops': "flights with at most {stops} stop(s)".format,
+    'hotel_rating': "a hotel rated {rating:.1f}/5".format,
+    'car': "a rental car included".format,
+    'preference': "matches your {name} preference".format,
+}
+LEADS = ((0.85, "Exceptional deal"), (0.7, "Great deal"), (0.0, "Good value"))
+
+
+def _field(item, name, default=None):
+    """Attribute or key access, so Deals and plain dicts explain alike"""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def _percent(fraction) -> int:
+    return int(round(float(fraction) * 100))
+
+
+def _join(reasons: List[str]) -> str:
+    if len(reasons) <= 1:
+        return ''.join(reasons)
+    return ', '.join(reasons[:-1]) + ' and ' + reasons[-1]
+
+
+def _week_label(week_of: Optional[str]) -> Optional[str]:
+    if not week_of:
+        return None
+    day = date.fromisoformat(week_of)
+    return f"{day:%b} {day.day}"
+
+
 class ExplainerAgent:
-    def explain_deal(self, deal, score):
+    """
+    Template-based explanations built from the factors that produced a deal
+    score (price vs the route's weekly median, seats left, rating). The
+    reasons mentioned are the factors that contributed most, and results
+    are memoized per (deal id, score version) so a feed of hundreds of
+    deals is only rendered once per rescore.
+    """
+
+    def __init__(self, cache_size=None, cache_ttl=None):
+        self.cache = LRUCache(
+            int(cache_size or os.getenv('EXPLAIN_CACHE_SIZE', DEFAULT_CACHE_SIZE)),
+            float(cache_ttl or os.getenv('EXPLAIN_CACHE_TTL', DEFAULT_CACHE_TTL))
+        )
+
+    def explain_deal(self, deal, score=None):
         """Explain why something is a deal"""
-        # TODO: Generate human-readable explanation
-        return f"This is a deal because the price is {score*100}% below average."
-    
-    def explain_recommendation(self, recommendation, factors):
+        score = _field(deal, 'score', 0.0) if score is None else score
+        deal_id = _field(deal, 'id')
+        # Score and price are part of the version: a rescore that moves either re-renders
+        key = (deal_id, _field(deal, 'score_version'), round(float(score), 4), _field(deal, 'price'))
+        if deal_id is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        text = self._render_deal(deal, float(score))
+        if deal_id is not None:
+            self.cache.set(key, text)
+        return text
+
+    def explain_deals(self, deals: Iterable) -> List[str]:
+        """explain_deal for each deal, in order"""
+        return [self.explain_deal(deal) for deal in deals]
+
+    def _render_deal(self, deal, score: float) -> str:
+        lead = next(text for floor, text in LEADS if score >= floor)
+        reasons = self.deal_reasons(deal)
+        head = f"{lead} (score {_percent(score)}/100)"
+        return f"{head}: {_join(reasons)}." if reasons else f"{head}."
+
+    def deal_reasons(self, deal) -> List[str]:
+        """Template-rendered reasons, strongest contribution first"""
+        factors = _field(deal, 'factors') or {}
+        contributions = factors.get('contributions')
+        if not contributions:
+            # Deals scored before factors were recorded: fall back to the discount
+            discount = _field(deal, 'discount_percentage') or 0.0
+            original = _field(deal, 'original_price')
+            if discount > 0 and original:
+                return [DEAL_TEMPLATES['price_drop'](pct=int(round(discount)), original=original)]
+            return []
+
+        candidates = []
+        for name, weight in contributions.items():
+            if weight < MIN_CONTRIBUTION:
+                continue
+            reason = self._deal_reason(name, deal, factors)
+            if reason:
+                candidates.append((weight, reason))
+        candidates.sort(key=lambda c: -c[0])
+        return [reason for _, reason in candidates[:MAX_REASONS]]
+
+    def _deal_reason(self, name: str, deal, factors: dict) -> Optional[str]:
+        if name == 'price':
+            below = factors.get('below_median')
+            drop = factors.get('price_drop') or 0.0
+            # Credit the route median when it is what earned the price component
+            if below is not None and below > 0 and below >= drop - 1e-4:
+                route = _field(deal, 'route') or 'route'
+                week = _week_label(factors.get('week_of'))
+                if week:
+                    return DEAL_TEMPLATES['below_median'](pct=_percent(below), route=route, week=week)
+                return DEAL_TEMPLATES['below_median_no_week'](pct=_percent(below), route=route)
+            original = _field(deal, 'original_price')
+            if drop > 0 and original:
+                return DEAL_TEMPLATES['price_drop'](pct=_percent(drop), original=original)
+        elif name == 'scarcity':
+            seats = factors.get('seats_left')
+            if seats is not None and seats <= FEW_SEATS:
+                return DEAL_TEMPLATES['few_seats'](seats=seats)
+            if seats is not None and seats <= LIMITED_SEATS:
+                return DEAL_TEMPLATES['limited_seats'](seats=seats)
+        elif name == 'rating':
+            rating = factors.get('rating')
+            if rating is not None:
+                return DEAL_TEMPLATES['top_rating' if rating >= 4.5 else 'rating'](rating=rating)
+        return None
+
+    def explain_recommendation(self, recommendation, factors: Union[Dict, Iterable[str], None] = None):
         """Explain why something was recommended"""
-        # TODO: Generate explanation based on factors
-        return "Recommended based on your preferences."
+        factors = factors or {}
+        if not isinstance(factors, dict):
+            factors = {name: True for name in factors}
+        reasons = []
+
+        cost = _field(recommendation, 'total_cost')
+        budget = factors.get('budget')
+        if cost is not None:
+            if isinstance(budget, (int, float)) and not isinstance(budget, bool):
+                reasons.append(RECOMMENDATION_TEMPLATES['budget'](cost=cost, budget=budget))
+            else:
+                reasons.append(RECOMMENDATION_TEMPLATES['cost'](cost=cost))
+
+        legs = [leg for leg in (_field(recommendation, 'outbound'), _field(recommendation, 'return')) if leg]
+        if legs:
+            stops = max(int(_field(leg, 'stops', 0) or 0) for leg in legs)
+            reasons.append(RECOMMENDATION_TEMPLATES['direct']() if stops == 0
+                           else RECOMMENDATION_TEMPLATES['stops'](stops=stops))
+
+        hotel = _field(recommendation, 'hotel')
+        rating = _field(hotel, 'rating') if hotel else None
+        if rating:
+            reasons.append(RECOMMENDATION_TEMPLATES['hotel_rating'](rating=float(rating)))
+        if _field(recommendation, 'car'):
+            reasons.append(RECOMMENDATION_TEMPLATES['car']())
+
+        for name, value in factors.items():
+            if name != 'budget' and value not in (None, False, ''):
+                reasons.append(RECOMMENDATION_TEMPLATES['preference'](name=name.replace('_', ' ')))
+
+        if not reasons:
+            return "Recommended based on your preferences."
+        return f"Recommended: {_join(reasons[:MAX_REASONS + 1])}."
 
+    def stats(self) -> dict:
+        return self.cache.stats()
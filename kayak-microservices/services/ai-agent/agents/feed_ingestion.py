@@ -3,23 +3,355 @@ Feed Ingestion Agent
 Ingests travel deals from external sources
 """
 
-class FeedIngestionAgent:
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import codecs
+import csv
+import hashlib
+import json
+import os
+import time
+import httpx
+import numpy as np
+import pandas as pd
+from agents.deal_detector import SEATS_REFERENCE
+from services.deal_validator import DealValidator
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_MAX_CONNECTIONS = 20
+
+REQUIRED_FIELDS = ('id', 'departure_airport', 'arrival_airport', 'price')
+NUMERIC_FIELDS = ('price', 'base_price', 'discount_percent', 'seats_left', 'rating')
+FALLBACKS = {'discount_percent': 0.0, 'cabin_class': 'economy', 'seats_left': float(SEATS_REFERENCE), 'rating': 0.0}
+
+# Feed rows are `flights`-shaped; Deal fields map onto their columns, and a
+# flight deal expires when the flight leaves
+FEED_VALIDATOR = DealValidator(
+    columns={'original_price': 'base_price', 'discount_percentage': 'discount_percent',
+             'expires_at': 'departure_time'},
+    derived=('title', 'description', 'score', 'tags', 'route', 'city')
+)
+
+_done = object()
+
+Sink = Callable[[List[dict], List[str]], Awaitable[object]]
+
+
+def record_digest(record: dict) -> bytes:
+    """Short stable fingerprint of a parsed record"""
+    canonical = json.dumps(record, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=8).digest()
+
+
+class FeedState:
+    """What the last successful pull of one source looked like"""
+
     def __init__(self):
-        self.sources = []
-    
-    def ingest_feeds(self):
-        """Ingest deals from external sources"""
-        # TODO: Implement feed ingestion
-        print("Ingesting feeds...")
-        return []
-    
-    def parse_feed(self, feed_data):
-        """Parse feed data into structured format"""
-        # TODO: Parse feed data
-        return {}
-    
-    def validate_deal(self, deal):
-        """Validate deal data"""
-        # TODO: Validate deal
-        return True
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.content_hash: Optional[str] = None
+        self.records: Dict[str, bytes] = {}  # record id -> record_digest
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+async def iter_ndjson(chunks: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """One JSON object per line"""
+    pending = ''
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+async def iter_json_array(chunks: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """
+    Elements of a top-level JSON array, decoded as soon as each one is
+    complete; only the unparsed tail of the payload is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, started = '', 0, False
+    async for chunk in chunks:
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("JSON feeds must be a top-level array (or use format 'ndjson')")
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # element not complete yet
+            pos = end
+            yield item
+    if buffer[pos:].strip():
+        raise ValueError("truncated JSON feed")
+
+
+async def iter_csv(chunks: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """
+    CSV rows with the header as keys. Complete lines are parsed once per
+    chunk; a quoted field spanning lines is held back until it closes.
+    """
+    header: Optional[List[str]] = None
+    pending, held, quotes = '', [], 0
+    async for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split('\n')
+        ready = []
+        for line in complete:
+            held.append(line + '\n')
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                ready.extend(held)
+                held, quotes = [], 0
+        for row in csv.reader(ready):
+            if header is None:
+                header = row
+            elif row:
+                yield dict(zip(header, row))
+    for row in csv.reader(held + ([pending] if pending else [])):
+        if header is None:
+            header = row
+        elif row:
+            yield dict(zip(header, row))
+
+
+PARSERS = {'json': iter_json_array, 'ndjson': iter_ndjson, 'csv': iter_csv}
+
 
+class FeedIngestionAgent:
+    """
+    Pulls every configured feed concurrently through one pooled
+    httpx.AsyncClient. Each response is parsed as it streams in and valid
+    records are handed, in batches, through a bounded queue to `sink`
+    (the detector). When the sink falls behind the queue fills, producers
+    stop reading and the sockets apply backpressure to the partners.
+
+    Polls are incremental: requests are conditional on the last ETag /
+    Last-Modified (a 304 costs nothing), and records are diffed against
+    the previous pull by fingerprint, so only inserted, updated and
+    removed deals reach the sink.
+    """
+
+    def __init__(self, sources: Optional[List[dict]] = None, client: Optional[httpx.AsyncClient] = None,
+                 batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, timeout=30.0):
+        # Each source: {'name', 'url', 'format': json|ndjson|csv, 'headers'?}
+        self.sources = sources if sources is not None else self._sources_from_env()
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self._client = client
+        self._owns_client = client is None
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._timeout = httpx.Timeout(timeout, connect=5.0)
+        self.last_run: Dict[str, dict] = {}
+        self.state: Dict[str, FeedState] = {}
+        self.validator = FEED_VALIDATOR
+
+    @staticmethod
+    def _sources_from_env() -> List[dict]:
+        raw = os.getenv('FEED_SOURCES')
+        if not raw:
+            return []
+        try:
+            return json.loads(raw)
+        except ValueError as e:
+            print(f"FEED_SOURCES is not valid JSON: {e}")
+            return []
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self._limits, timeout=self._timeout, follow_redirects=True)
+        return self._client
+
+    async def close(self):
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    async def run_forever(self, sink: Sink, interval: float):
+        """Re-ingest every `interval` seconds"""
+        while True:
+            await self.ingest_feeds(sink)
+            await asyncio.sleep(interval)
+
+    async def ingest_feeds(self, sink: Sink) -> Dict[str, dict]:
+        """Ingest every source once; `sink(changed, removed_ids)` gets only the delta"""
+        if not self.sources:
+            return {}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        stats = {s.get('name', s['url']): {'records': 0, 'rejected': 0, 'bytes': 0, 'not_modified': False,
+                                           'inserted': 0, 'updated': 0, 'removed': 0, 'error': None,
+                                           'rejections': {}}
+                 for s in self.sources}
+
+        async def consume():
+            while True:
+                batch = await queue.get()
+                try:
+                    if batch is _done:
+                        return
+                    await sink(*batch)
+                except Exception as e:
+                    print(f"Feed sink failed: {e}")
+                finally:
+                    queue.task_done()
+
+        consumer = asyncio.create_task(consume())
+        try:
+            await asyncio.gather(*(self._pull(source, queue, stats[source.get('name', source['url'])])
+                                   for source in self.sources))
+            await queue.put(_done)
+            await consumer
+        finally:
+            consumer.cancel()
+        self.last_run = stats
+        return stats
+
+    async def _pull(self, source: dict, queue: asyncio.Queue, stats: dict):
+        name = source.get('name', source['url'])
+        fmt = source.get('format') or ('csv' if source['url'].endswith('.csv') else 'json')
+        defaults = {'listing_type': source.get('listing_type', 'flight'), 'source': name}
+        state = self.state.setdefault(name, FeedState())
+        seen: Dict[str, bytes] = {}
+        delivered: Dict[str, bytes] = {}  # unchanged or already queued downstream
+        started = time.perf_counter()
+        try:
+            headers = dict(source.get('headers') or {}, **state.conditional_headers())
+            async with self.client.stream('GET', source['url'], headers=headers) as response:
+                if response.status_code == 304:
+                    stats['not_modified'] = True
+                    return
+                response.raise_for_status()
+                content_hash = hashlib.blake2b(digest_size=16)
+
+                async def chunks():
+                    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+                    async for raw in response.aiter_bytes():
+                        content_hash.update(raw)
+                        stats['bytes'] = response.num_bytes_downloaded
+                        yield decoder.decode(raw)
+                    yield decoder.decode(b'', final=True)
+
+                batch, pending = [], []
+
+                async def flush_pending():
+                    nonlocal batch
+                    for deal in self._accept(pending, defaults, stats):
+                        digest = record_digest(deal)
+                        seen[deal['id']] = digest
+                        previous = state.records.get(deal['id'])
+                        if previous == digest:
+                            delivered[deal['id']] = digest
+                            continue
+                        stats['inserted' if previous is None else 'updated'] += 1
+                        batch.append(deal)
+                    pending.clear()
+                    if len(batch) >= self.batch_size:
+                        await queue.put((batch, []))  # blocks while the detector is behind
+                        delivered.update((d['id'], seen[d['id']]) for d in batch)
+                        batch = []
+
+                async for record in PARSERS[fmt](chunks()):
+                    pending.append(record)
+                    if len(pending) >= self.batch_size:
+                        await flush_pending()
+                await flush_pending()
+
+                # Only a complete pull can tell which records disappeared
+                removed = [deal_id for deal_id in state.records if deal_id not in seen]
+                stats['removed'] = len(removed)
+                if batch or removed:
+                    await queue.put((batch, removed))
+                state.records = seen
+                state.etag = response.headers.get('ETag')
+                state.last_modified = response.headers.get('Last-Modified')
+                digest = content_hash.hexdigest()
+                stats['content_changed'] = digest != state.content_hash
+                state.content_hash = digest
+        except Exception as e:
+            # Remember what already went downstream so the next poll does not resend it
+            state.records.update(delivered)
+            stats['error'] = str(e) or type(e).__name__
+            print(f"Feed {name} failed: {stats['error']}")
+        finally:
+            stats['seconds'] = round(time.perf_counter() - started, 3)
+
+    def _accept(self, records: List[dict], defaults: dict, stats: dict) -> List[dict]:
+        """Parse and validate one chunk column-wise; returns the valid rows"""
+        if not records:
+            return []
+        frame = self.parse_frame(records, defaults)
+        rejected = self.validate_frame(frame)
+        stats['rejected'] += len(records) - len(frame) + int(rejected.sum())
+        for reason, count in self.validator.last_reasons.items():
+            stats['rejections'][reason] = stats['rejections'].get(reason, 0) + count
+        valid = frame[~rejected].copy()
+        stats['records'] += len(valid)
+        for column in NUMERIC_FIELDS:
+            if column in valid:
+                valid[column] = pd.to_numeric(valid[column], errors='coerce').astype(float)
+                if column in FALLBACKS:
+                    valid[column] = valid[column].fillna(FALLBACKS[column])
+        return valid.to_dict('records')
+
+    def parse_frame(self, records: List[dict], defaults: Optional[dict] = None) -> pd.DataFrame:
+        """Feed records -> `flights`-shaped DataFrame (values still raw; non-dicts dropped)"""
+        frame = pd.DataFrame([r for r in records if isinstance(r, dict)])
+        for column, value in (defaults or {}).items():
+            frame[column] = frame[column].fillna(value) if column in frame else value
+        frame['base_price'] = (frame['base_price'].replace('', np.nan).fillna(frame.get('price'))
+                               if 'base_price' in frame else frame.get('price'))
+        for column, value in FALLBACKS.items():
+            frame[column] = frame[column].replace('', np.nan).fillna(value) if column in frame else value
+        if 'id' in frame:
+            frame['id'] = frame['id'].where(frame['id'].isna(), frame['id'].astype(str))
+        return frame
+
+    def validate_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        """Rejection mask: Deal schema checks plus the feed's own required columns"""
+        rejected = self.validator.validate(frame)
+        for column in REQUIRED_FIELDS:
+            if column not in frame:
+                rejected[:] = True
+                self.validator.last_reasons[f"{column}:missing"] = len(frame)
+                return rejected
+            missing = frame[column].isna().to_numpy() | frame[column].eq('').to_numpy()
+            if (missing & ~rejected).any():
+                self.validator.last_reasons[f"{column}:missing"] = int((missing & ~rejected).sum())
+            rejected |= missing
+        same = (frame['departure_airport'] == frame['arrival_airport']).to_numpy()
+        if (same & ~rejected).any():
+            self.validator.last_reasons['route:same_airport'] = int((same & ~rejected).sum())
+        return rejected | same
+
+    def parse_feed(self, feed_data, defaults: Optional[dict] = None) -> Optional[dict]:
+        """Parse one feed record into a `flights`-shaped row"""
+        if not isinstance(feed_data, dict):
+            return None
+        return self.parse_frame([feed_data], defaults or {'listing_type': 'flight'}).to_dict('records')[0]
+
+    def validate_deal(self, deal):
+        """Validate deal data (single-row form of `validate_frame`)"""
+        return not self.validate_frame(pd.DataFrame([deal]))[0]
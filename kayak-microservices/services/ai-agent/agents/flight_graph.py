@@ -0,0 +1,158 @@
+"""
+Flight Graph
+Compact time-dependent flight network for multi-criteria itinerary search
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional
+import heapq
+import time
+import numpy as np
+import pandas as pd
+
+CABIN_CODES = {"economy": 0, "premium economy": 1, "business": 2, "first": 3}
+EPOCH = pd.Timestamp("2000-01-01")
+
+# Result columns carried over from the `flights` rows
+LEG_COLUMNS = ['id', 'flight_code', 'airline', 'departure_airport', 'arrival_airport',
+               'departure_time', 'arrival_time', 'duration', 'stops', 'price', 'cabin_class']
+
+
+def _minutes(values) -> np.ndarray:
+    """Datetimes -> int32 minutes since EPOCH"""
+    stamps = pd.to_datetime(pd.Series(values))
+    return ((stamps - EPOCH) // pd.Timedelta(minutes=1)).to_numpy(dtype=np.int32)
+
+
+class FlightGraph:
+    """
+    Airports are nodes and `flights` rows are timed edges.
+    Edges live in parallel NumPy arrays sorted by (origin, departure), with a
+    CSR offset per origin, so "departures from X between t0 and t1" is two
+    binary searches and the whole 90-day inventory stays a few bytes per edge.
+    """
+
+    def __init__(self, flights: pd.DataFrame):
+        codes, airports = pd.factorize(pd.concat([flights['departure_airport'], flights['arrival_airport']]))
+        n = len(flights)
+        dep_node = codes[:n].astype(np.int16)
+        arr_node = codes[n:].astype(np.int16)
+        dep_min = _minutes(flights['departure_time'])
+        if 'arrival_time' in flights:
+            arr_min = _minutes(flights['arrival_time'])
+        else:
+            arr_min = dep_min + flights['duration'].to_numpy(dtype=np.int32)
+
+        order = np.lexsort((dep_min, dep_node))
+        self.airports = list(airports)
+        self.node_of: Dict[str, int] = {code: i for i, code in enumerate(self.airports)}
+        self.dep_node = dep_node[order]
+        self.arr_node = arr_node[order]
+        self.dep_min = dep_min[order]
+        self.arr_min = arr_min[order]
+        self.price = flights['price'].to_numpy(dtype=np.float32)[order]
+        self.stops = flights['stops'].to_numpy(dtype=np.int8)[order] if 'stops' in flights else np.zeros(n, np.int8)
+        cabins = flights['cabin_class'].map(CABIN_CODES) if 'cabin_class' in flights else pd.Series(0, index=flights.index)
+        self.cabin = cabins.fillna(-1).to_numpy(dtype=np.int8)[order]
+        self.row = order.astype(np.int32)
+        self.offsets = np.searchsorted(self.dep_node, np.arange(len(self.airports) + 1)).astype(np.int64)
+        # Only the columns needed to describe a result leg
+        self.legs = flights[[c for c in LEG_COLUMNS if c in flights]].reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.row)
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.dep_node, self.arr_node, self.dep_min, self.arr_min,
+                                      self.price, self.stops, self.cabin, self.row, self.offsets))
+
+    def departures(self, node, earliest, latest, cabin=None) -> np.ndarray:
+        """Edge indices leaving `node` with earliest <= departure <= latest"""
+        lo, hi = self.offsets[node], self.offsets[node + 1]
+        times = self.dep_min[lo:hi]
+        start = lo + np.searchsorted(times, earliest, side='left')
+        end = lo + np.searchsorted(times, latest, side='right')
+        edges = np.arange(start, end)
+        if cabin is not None:
+            edges = edges[self.cabin[start:end] == cabin]
+        return edges
+
+    def search(self, origin: str, destination: str, window_start, window_end,
+               cabin_class: Optional[str] = None, max_legs=2, min_connection=45,
+               max_layover=360, max_results=10, time_budget_ms=200.0) -> dict:
+        """
+        Pareto-optimal itineraries over (price, duration, stops).
+        Labels are expanded cheapest first; a label is pruned when another
+        label at the same airport is no worse on price, arrival, departure
+        and stops, or when a found itinerary already beats its lower bounds.
+        Stops when the time budget is spent and reports `complete: False`.
+        """
+        deadline = time.perf_counter() + time_budget_ms / 1000.0
+        o, d = self.node_of.get(origin), self.node_of.get(destination)
+        if o is None or d is None or o == d:
+            return {'options': [], 'complete': True, 'labels_expanded': 0}
+        cabin = CABIN_CODES.get(cabin_class) if cabin_class else None
+
+        heap = []
+        for e in self.departures(o, _minutes([window_start])[0], _minutes([window_end])[0], cabin):
+            e = int(e)
+            heapq.heappush(heap, (float(self.price[e]), int(self.arr_min[e]), -int(self.dep_min[e]),
+                                  int(self.stops[e]), (e,)))
+
+        targets: List[tuple] = []  # (price, duration, stops, path)
+        node_labels = defaultdict(list)  # node -> [(price, arrival, -departure, stops)]
+        expanded = 0
+        complete = True
+        while heap:
+            if time.perf_counter() > deadline:
+                complete = False
+                break
+            price, arrival, neg_dep, stops, path = heapq.heappop(heap)
+            duration = arrival + neg_dep
+            if any(t[0] <= price and t[1] <= duration and t[2] <= stops for t in targets):
+                continue
+            node = int(self.arr_node[path[-1]])
+            if node == d:
+                targets.append((price, duration, stops, path))
+                continue
+
+            label = (price, arrival, neg_dep, stops)
+            labels = node_labels[node]
+            if any(all(a <= b for a, b in zip(other, label)) for other in labels):
+                continue
+            labels[:] = [other for other in labels if not all(a <= b for a, b in zip(label, other))]
+            labels.append(label)
+            expanded += 1
+            if len(path) >= max_legs:
+                continue
+
+            visited = {o} | {int(self.arr_node[e]) for e in path}
+            for e in self.departures(node, arrival + min_connection, arrival + max_layover, cabin):
+                e = int(e)
+                if int(self.arr_node[e]) in visited:
+                    continue
+                heapq.heappush(heap, (price + float(self.price[e]), int(self.arr_min[e]), neg_dep,
+                                      stops + 1 + int(self.stops[e]), path + (e,)))
+
+        targets.sort(key=lambda t: (t[0], t[1], t[2]))
+        return {
+            'options': [self._describe(t) for t in targets[:max_results]],
+            'complete': complete,
+            'labels_expanded': expanded
+        }
+
+    def _describe(self, target) -> dict:
+        price, duration, stops, path = target
+        legs = self.legs.iloc[[int(self.row[e]) for e in path]].to_dict('records')
+        for leg in legs:
+            for key in ('departure_time', 'arrival_time'):
+                if key in leg and hasattr(leg[key], 'isoformat'):
+                    leg[key] = leg[key].isoformat()
+        return {
+            'legs': legs,
+            'price': round(price, 2),
+            'duration': int(duration),
+            'stops': int(stops),
+            'departure_time': legs[0].get('departure_time'),
+            'arrival_time': legs[-1].get('arrival_time')
+        }
@@ -4,34 +4,126 @@ Analyzes user queries to determine intent
 """
 
 from models.schemas import UserQuery
+from agents.entity_extractor import EntityExtractor
+from services.parse_cache import ParseCache, normalize_query
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+import copy
+import hashlib
+import json
+import re
+
+
+TOKEN_RE = re.compile(r"[a-z0-9']+", re.IGNORECASE)
+
+
+class IntentMatcher:
+    """
+    Word-level phrase matcher compiled once from the intent vocabulary.
+    Phrases are indexed by their first word (longest phrase first), so one
+    left-to-right pass over the query's tokens finds every intent and span;
+    cost grows with query length, not with the number of phrases.
+    """
+
+    def __init__(self, intents: Dict[str, Iterable[str]]):
+        self.intents = {intent: list(phrases) for intent, phrases in intents.items()}
+        self._priority = {intent: i for i, intent in enumerate(self.intents)}
+        self._table: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {}
+        seen = set()
+        for intent, phrases in self.intents.items():
+            for phrase in phrases:
+                words = tuple(TOKEN_RE.findall(phrase.lower()))
+                if words and words not in seen:
+                    seen.add(words)
+                    self._table.setdefault(words[0], []).append((words, intent))
+        for candidates in self._table.values():
+            candidates.sort(key=lambda c: len(c[0]), reverse=True)
+
+    def find_all(self, text: str) -> List[dict]:
+        """Every phrase hit as {'intent', 'text', 'span'} in order of appearance"""
+        tokens = [(m.group().lower(), m.start(), m.end()) for m in TOKEN_RE.finditer(text)]
+        words = [t[0] for t in tokens]
+        matches = []
+        i = 0
+        while i < len(tokens):
+            for phrase, intent in self._table.get(words[i], ()):
+                n = len(phrase)
+                if n == 1 or tuple(words[i:i + n]) == phrase:
+                    start, end = tokens[i][1], tokens[i + n - 1][2]
+                    matches.append({'intent': intent, 'text': text[start:end], 'span': (start, end)})
+                    i += n
+                    break
+            else:
+                i += 1
+        return matches
+
+    def match(self, text: str) -> dict:
+        """Best intent, all matches and a confidence in [0, 1]"""
+        matches = self.find_all(text)
+        if not matches:
+            return {'intent': 'unknown', 'matches': [], 'confidence': 0.0}
+        counts: Dict[str, int] = {}
+        for m in matches:
+            counts[m['intent']] = counts.get(m['intent'], 0) + 1
+        # Most hits wins; ties go to the intent declared first
+        intent = min(counts, key=lambda k: (-counts[k], self._priority[k]))
+        return {
+            'intent': intent,
+            'matches': matches,
+            'confidence': round(counts[intent] / len(matches), 3)
+        }
+
 
 class IntentParser:
-    def __init__(self):
+    def __init__(self, cache: Optional[ParseCache] = None):
         self.intents = {
             'book': ['book', 'reserve', 'buy'],
             'search': ['find', 'search', 'show', 'looking for'],
             'cancel': ['cancel', 'refund'],
             'status': ['status', 'check']
         }
+        self._compile()
+        self.entity_extractor = EntityExtractor.from_csv()
+        self.cache = cache if cache is not None else ParseCache.from_env()
+
+    def _compile(self):
+        self.matcher = IntentMatcher(self.intents)
+        # Content hash, so every worker sharing the cache agrees on it
+        self.phrase_version = hashlib.sha1(json.dumps(self.intents, sort_keys=True).encode()).hexdigest()[:12]
+
+    def add_phrases(self, intent: str, phrases: Iterable[str]):
+        """Extend the vocabulary and recompile the matcher; cached parses of the old table stop matching"""
+        self.intents.setdefault(intent, []).extend(phrases)
+        self._compile()
 
     async def parse(self, query: UserQuery) -> dict:
         """
-        Parse the user query and return intent and entities
+        Parse the user query and return intent and entities.
+        Parses are memoized on the normalized text (spans refer to
+        `normalized_query`). Normalization keeps case, because the entity
+        extractor trusts "LAX" and "Paris" but not "lax" and "paris"; the
+        phrase table version and the date are part of the key, the latter
+        because relative phrases like "tomorrow" resolve against it.
         """
-        text = query.query.lower()
-        detected_intent = 'unknown'
-        
-        for intent, keywords in self.intents.items():
-            if any(keyword in text for keyword in keywords):
-                detected_intent = intent
-                break
-        
-        return {
-            'confidence': 0.0
+        text = normalize_query(query.query, casefold=False)
+        key = (text, self.phrase_version, date.today().toordinal())
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        result = self.matcher.match(text)
+        parsed = {
+            'intent': result['intent'],
+            'entities': self.entity_extractor.extract(text),
+            'matches': [{'intent': m['intent'], 'text': m['text'], 'span': list(m['span'])}
+                        for m in result['matches']],
+            'confidence': result['confidence'],
+            'normalized_query': text
         }
-    
+        await self.cache.aset(key, parsed)
+        return copy.deepcopy(parsed)
+
     def extract_entities(self, user_query):
         """Extract entities from query"""
-        # TODO: Extract dates, locations, preferences
-        return {}
-
+        text = user_query.query if isinstance(user_query, UserQuery) else str(user_query)
+        return self.entity_extractor.extract(text)
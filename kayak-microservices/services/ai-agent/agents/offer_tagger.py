@@ -3,19 +3,195 @@ Offer Tagger Agent
 Tags and categorizes offers
 """
 
+from typing import Dict, List, Optional, Union
+import json
+import re
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Absolute nightly/daily price cut-offs, used when a batch has too few
+# offers in a city to derive that city's own price quantiles
+BUDGET_PRICE = 100.0
+LUXURY_PRICE = 400.0
+MIN_CITY_GROUP = 20
+
+# Flights: cabins that are luxury by themselves, and the absolute economy
+# fare cut-off used when a route has too few fares for its own quantile
+LUXURY_CABINS = ('business', 'first')
+BUDGET_CABINS = ('economy',)
+BUDGET_FARE = 150.0
+
+# Phrases in names, amenities and room types that imply a tag
+TAG_PHRASES = {
+    'budget': ['budget', 'cheap', 'affordable', 'hostel', 'economy', 'shared room', 'bunk'],
+    'luxury': ['luxury', 'luxurious', 'penthouse', 'deluxe', 'premium', 'first class', 'villa', 'hot tub',
+               'pool', 'doorman', 'concierge', 'spa', 'sauna'],
+    'family-friendly': ['family', 'kids', 'crib', 'high chair', 'children', 'toys', 'baby',
+                        'pack n play', 'travel crib', 'babysitter'],
+    'pet-friendly': ['pets allowed', 'pet friendly', 'dog', 'dogs', 'cat', 'cats'],
+    'business': ['dedicated workspace', 'workspace', 'business', 'office', 'desk'],
+}
+
+PRICE_COLUMNS = ('price_per_night', 'daily_rental_price', 'price')
+TEXT_COLUMNS = ('name', 'title', 'description')
+CATEGORY_COLUMNS = ('room_type', 'type')
+
+
+def _amenity_text(value) -> str:
+    """Amenities arrive as a list or the JSON string stored in `hotels.amenities`"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(a) for a in value)
+    return ''
+
+
 class OfferTaggerAgent:
-    def __init__(self):
-        self.tags = []
-    
+    """
+    Batch tagger.
+    A whole catalog is vectorized once: TF-IDF keywords come from a single
+    sparse fit/transform, rule phrases from one compiled pattern per tag
+    applied column-wise, and the price rules are column operations, so no
+    per-offer Python loop runs except to hand back the final lists.
+    """
+
+    def __init__(self, max_keywords=5, max_features=50000):
+        self.tags = list(TAG_PHRASES) + ['top-rated']
+        self.max_keywords = max_keywords
+        self.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2), sublinear_tf=True,
+                                          max_features=max_features, token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z]+\b")
+        # One word-bounded alternation per tag, run column-wise over the batch
+        self._phrase_patterns = {
+            tag: re.compile(r"\b(?:%s)\b" % '|'.join(re.escape(p).replace(r'\ ', r'\s+') for p in phrases))
+            for tag, phrases in TAG_PHRASES.items()
+        }
+
+    def documents(self, offers: pd.DataFrame, details=True) -> pd.Series:
+        """One lowercase text per offer: name, plus room type and amenities when `details`"""
+        text = pd.Series('', index=offers.index)
+        for column in TEXT_COLUMNS + (CATEGORY_COLUMNS if details else ()):
+            if column in offers:
+                text = text + ' ' + offers[column].fillna('').astype(str)
+        if details and 'amenities' in offers:
+            text = text + ' ' + offers['amenities'].map(_amenity_text)
+        return text.str.lower().str.replace(r"[^\w\s]", ' ', regex=True)
+
+    def keywords(self, documents: pd.Series) -> List[List[str]]:
+        """Top TF-IDF terms per document from one fit over the batch"""
+        try:
+            matrix = self.vectorizer.fit_transform(documents).tocsr()
+        except ValueError:
+            # Empty vocabulary: no offer in the batch has a non-stop-word term
+            return [[] for _ in range(len(documents))]
+        terms = self.vectorizer.get_feature_names_out()
+        rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        # Rank entries within each row by weight, keep the first max_keywords
+        order = np.lexsort((-matrix.data, rows))
+        rank = np.arange(len(order)) - matrix.indptr[rows[order]]
+        keep = order[rank < self.max_keywords]
+        result: List[List[str]] = [[] for _ in range(matrix.shape[0])]
+        for row, term in zip(rows[keep], terms[matrix.indices[keep]]):
+            result[row].append(term)
+        return result
+
+    def _price_masks(self, offers: pd.DataFrame):
+        column = next((c for c in PRICE_COLUMNS if c in offers), None)
+        if column is None:
+            none = np.zeros(len(offers), dtype=bool)
+            return none, none
+        price = pd.to_numeric(offers[column], errors='coerce')
+        low = pd.Series(BUDGET_PRICE, index=offers.index)
+        high = pd.Series(LUXURY_PRICE, index=offers.index)
+        if 'city' in offers:
+            # Cheapest/priciest share of each city's offers, where the city has enough of them
+            by_city = price.groupby(offers['city'])
+            sized = by_city.transform('size') >= MIN_CITY_GROUP
+            low = low.where(~sized, by_city.transform('quantile', 0.25))
+            high = high.where(~sized, by_city.transform('quantile', 0.90))
+        return (price <= low).to_numpy(), (price >= high).to_numpy()
+
+    def tag_frame(self, offers: pd.DataFrame, keywords=True) -> pd.DataFrame:
+        """`offers` with `tags` (and `keywords`) list columns added"""
+        offers = offers.reset_index(drop=True)
+        documents = self.documents(offers)
+        phrase_hit = {tag: documents.str.contains(pattern).to_numpy()
+                      for tag, pattern in self._phrase_patterns.items()}
+
+        cheap, pricey = self._price_masks(offers)
+        rating = pd.to_numeric(offers['rating'], errors='coerce').to_numpy() if 'rating' in offers \
+            else np.full(len(offers), np.nan)
+        stars = pd.to_numeric(offers['star_rating'], errors='coerce').to_numpy() if 'star_rating' in offers \
+            else np.full(len(offers), np.nan)
+        rooms = pd.to_numeric(offers['num_rooms'], errors='coerce').to_numpy() if 'num_rooms' in offers \
+            else np.zeros(len(offers))
+        whole_home = documents.str.contains('entire home').to_numpy()
+
+        masks: Dict[str, np.ndarray] = {
+            'budget': cheap | (phrase_hit['budget'] & ~pricey),
+            'luxury': (pricey & ~phrase_hit['budget']) | (phrase_hit['luxury'] & ~cheap) | (stars >= 5),
+            'family-friendly': phrase_hit['family-friendly'] | (whole_home & (rooms >= 3)),
+            'pet-friendly': phrase_hit['pet-friendly'],
+            'business': phrase_hit['business'],
+            'top-rated': rating >= 4.8,
+        }
+        # Budget and luxury are exclusive; an explicit luxury signal wins
+        masks['budget'] &= ~masks['luxury']
+
+        names = list(masks)
+        tag_matrix = np.column_stack([masks[name] for name in names])
+        offers['tags'] = [[names[i] for i in np.flatnonzero(row)] for row in tag_matrix]
+        if keywords:
+            # Room types and amenity lists are shared boilerplate; keywords come from the offer's own text
+            offers['keywords'] = self.keywords(self.documents(offers, details=False))
+        return offers
+
+    def tag_flights(self, flights: pd.DataFrame) -> List[List[str]]:
+        """
+        Tags for flight rows (the `flights` table shape). Hotel phrases and
+        nightly price cut-offs don't apply to fares: luxury comes from the
+        cabin, budget from an economy fare in the cheapest quarter of the
+        batch's economy fares on that route (BUDGET_FARE on thin routes).
+        """
+        flights = flights.reset_index(drop=True)
+        cabin = flights['cabin_class'].fillna('').astype(str).str.lower()
+        price = pd.to_numeric(flights['price'], errors='coerce')
+        low = pd.Series(BUDGET_FARE, index=flights.index)
+        if 'departure_airport' in flights and 'arrival_airport' in flights:
+            by_route = price.groupby([flights['departure_airport'], flights['arrival_airport'], cabin])
+            sized = by_route.transform('size') >= MIN_CITY_GROUP
+            low = low.where(~sized, by_route.transform('quantile', 0.25))
+        rating = pd.to_numeric(flights['rating'], errors='coerce').to_numpy() if 'rating' in flights \
+            else np.full(len(flights), np.nan)
+
+        masks = {
+            'budget': (cabin.isin(BUDGET_CABINS) & (price <= low)).to_numpy(),
+            'luxury': cabin.isin(LUXURY_CABINS).to_numpy(),
+            'top-rated': rating >= 4.8,
+        }
+        names = list(masks)
+        tag_matrix = np.column_stack([masks[name] for name in names])
+        return [[names[i] for i in np.flatnonzero(row)] for row in tag_matrix]
+
+    def tag_batch(self, offers: Union[pd.DataFrame, List[dict]]) -> List[dict]:
+        """Tags and keywords for every offer, in input order"""
+        frame = offers if isinstance(offers, pd.DataFrame) else pd.DataFrame(list(offers))
+        if frame.empty:
+            return []
+        tagged = self.tag_frame(frame)
+        return [{'tags': tags, 'keywords': keywords}
+                for tags, keywords in zip(tagged['tags'], tagged['keywords'])]
+
     def tag_offer(self, offer):
         """Tag an offer with relevant categories"""
-        # TODO: Implement tagging logic
-        tags = []
-        # Example tags: 'family-friendly', 'luxury', 'budget', 'weekend-getaway'
-        return tags
-    
-    def extract_keywords(self, offer):
-        """Extract keywords from offer description"""
-        # TODO: NLP-based keyword extraction
-        return []
+        return self.tag_frame(pd.DataFrame([offer]), keywords=False)['tags'][0]
 
+    def extract_keywords(self, offer, corpus: Optional[pd.DataFrame] = None):
+        """Extract keywords from offer description; IDF comes from `corpus` when given"""
+        frame = pd.DataFrame([offer])
+        if corpus is not None:
+            frame = pd.concat([frame, corpus], ignore_index=True)
+        return self.keywords(self.documents(frame, details=False))[0]
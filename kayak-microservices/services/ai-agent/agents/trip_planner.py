@@ -3,25 +3,213 @@ Trip Planner Agent
 Plans complete trips based on user preferences
 """
 
+from datetime import datetime, time as dt_time
+from typing import List, Optional
+from agents.bundle_optimizer import BundleOptimizer, Frontier
+from agents.flight_graph import FlightGraph
+import numpy as np
+import pandas as pd
+
+DEFAULT_TIME_BUDGET_MS = 250.0
+
+# Share of bundle quality each component contributes
+COMPONENT_WEIGHTS = {'outbound': 0.2, 'return': 0.2, 'hotel': 0.4, 'car': 0.2}
+
+
 class TripPlannerAgent:
-    def __init__(self):
+    def __init__(self, flights: Optional[pd.DataFrame] = None, entity_extractor=None):
         self.preferences = {}
-    
-    def plan_trip(self, user_preferences):
-        """Plan a complete trip"""
-        # TODO: Generate trip itinerary
-        # - Flights
-        # - Hotels
-        # - Car rentals
-        # - Activities
-        return {
+        self.graph: Optional[FlightGraph] = None
+        self.entity_extractor = entity_extractor
+        self.hotels: Optional[pd.DataFrame] = None
+        self.cars: Optional[pd.DataFrame] = None
+        self.optimizer = BundleOptimizer()
+        if flights is not None:
+            self.load_flights(flights)
+
+    def load_flights(self, flights: pd.DataFrame):
+        """Build the flight graph once from `flights` rows"""
+        self.graph = FlightGraph(flights)
+
+    def load_listings(self, hotels: Optional[pd.DataFrame] = None, cars: Optional[pd.DataFrame] = None):
+        """Hotel (`hotels` table) and car (`cars` table) candidates for bundles"""
+        if hotels is not None:
+            self.hotels = hotels.reset_index(drop=True)
+        if cars is not None:
+            self.cars = cars.reset_index(drop=True)
+
+    def airports_for(self, place: str) -> List[str]:
+        """IATA codes a code or city name may refer to"""
+        code = place.strip().upper()
+        if self.entity_extractor is None or code in self.entity_extractor.airports:
+            return [code]
+        for location in self.entity_extractor.extract(f"to {place}").get('locations', []):
+            return location.get('airports', [location.get('iata')])
+        return [code]
+
+    def resolve_airport(self, place: str, graph: Optional[FlightGraph] = None) -> Optional[str]:
+        """Map an IATA code or city name to an airport present in the graph"""
+        graph = self.graph if graph is None else graph
+        return next((code for code in self.airports_for(place) if code in graph.node_of), None)
+
+    def city_of(self, airport: Optional[str]) -> Optional[str]:
+        if not airport or self.entity_extractor is None:
+            return None
+        return self.entity_extractor.airports.get(airport, {}).get('city')
+
+    def plan_trip(self, user_preferences, candidates: Optional[dict] = None):
+        """
+        Plan a complete trip.
+        Expects origin/destination (IATA codes or city names) and start_date (plus optional
+        end_date for a return leg, cabin_class, max_legs, time_budget_ms).
+        `candidates` (from TripDataService) replaces the preloaded flights,
+        hotels and cars for this request when present.
+        """
+        self.preferences = user_preferences
+        candidates = candidates or {}
+        flights = candidates.get('flights')
+        graph = FlightGraph(flights) if flights is not None and len(flights) else self.graph
+        plan = {
             'itinerary': [],
+            'options': {},
             'estimated_cost': 0.0,
             'duration': 0
         }
-    
-    def optimize_itinerary(self, itinerary):
-        """Optimize trip itinerary for cost and convenience"""
-        # TODO: Implement optimization logic
+        if graph is None:
+            return plan
+
+        origin = self.resolve_airport(user_preferences['origin'], graph)
+        destination = self.resolve_airport(user_preferences['destination'], graph)
+        if origin is None or destination is None:
+            plan['complete'] = True
+            return plan
+        start = _as_datetime(user_preferences['start_date'])
+        end = _as_datetime(user_preferences['end_date']) if user_preferences.get('end_date') else None
+        search = dict(
+            cabin_class=user_preferences.get('cabin_class'),
+            max_legs=user_preferences.get('max_legs', 2),
+            max_results=user_preferences.get('max_results', 10),
+            # Outbound and return share the request's latency budget
+            time_budget_ms=user_preferences.get('time_budget_ms', DEFAULT_TIME_BUDGET_MS) / (2 if end else 1)
+        )
+
+        legs = [('outbound', origin, destination, start)]
+        if end is not None:
+            legs.append(('return', destination, origin, end))
+            plan['duration'] = max((end.date() - start.date()).days, 0)
+
+        complete = True
+        for name, src, dst, day in legs:
+            result = graph.search(src, dst, _day_start(day), _day_end(day), **search)
+            plan['options'][name] = result['options']
+            complete = complete and result['complete']
+            if result['options']:
+                best = result['options'][0]
+                plan['itinerary'].append(dict(best, leg=name))
+                plan['estimated_cost'] += best['price']
+        plan['estimated_cost'] = round(plan['estimated_cost'], 2)
+        plan['complete'] = complete
+        plan['destination'] = destination
+        return self.optimize_itinerary(plan, candidates.get('hotels'), candidates.get('cars'),
+                                       candidates.get('reviews'))
+
+    def optimize_itinerary(self, itinerary, hotels: Optional[pd.DataFrame] = None,
+                           cars: Optional[pd.DataFrame] = None, reviews: Optional[dict] = None):
+        """
+        Combine flight options with hotel and car candidates into the top
+        bundles under `budget` (preferences: budget, top_n, include_car,
+        hotel_city). The best bundle becomes the itinerary.
+        """
+        prefs = self.preferences
+        options = itinerary.get('options') or {}
+        if not options.get('outbound'):
+            return itinerary
+        nights = max(itinerary.get('duration') or 0, 1)
+
+        components = {name: _flight_candidates(opts) for name, opts in options.items() if opts}
+        city = prefs.get('hotel_city') or self.city_of(itinerary.get('destination'))
+        hotels = _at_location(self.hotels if hotels is None else hotels, 'city', city)
+        if hotels is not None and len(hotels):
+            components['hotel'] = _listing_candidates(hotels, 'price_per_night', nights, 'rating', 'star_rating')
+        if prefs.get('include_car', True):
+            cars = _at_location(self.cars if cars is None else cars, 'location', city, itinerary.get('destination'))
+            if cars is not None and len(cars):
+                components['car'] = _listing_candidates(cars, 'daily_rental_price', nights, 'rating')
+
+        weight = sum(COMPONENT_WEIGHTS[name] for name in components)
+        fronts = [Frontier.of(cost, quality * COMPONENT_WEIGHTS[name] / weight)
+                  for name, (cost, quality) in components.items()]
+        best = self.optimizer.optimize(fronts, prefs.get('budget'), top_n=prefs.get('top_n', 5))
+
+        bundles = []
+        for cost, quality, picks in zip(best.cost, best.quality, best.picks):
+            bundle = {'total_cost': round(float(cost), 2), 'score': round(float(quality), 4)}
+            for name, pick in zip(components, picks):
+                if name in options:
+                    bundle[name] = dict(options[name][pick], leg=name)
+                else:
+                    listings = hotels if name == 'hotel' else cars
+                    bundle[name] = _record(listings.iloc[int(pick)])
+                    if name == 'hotel' and reviews is not None:
+                        bundle[name]['reviews'] = reviews.get(bundle[name].get('listing_id'), {'count': 0, 'recent': []})
+            bundles.append(bundle)
+
+        itinerary['bundles'] = bundles
+        itinerary['within_budget'] = bool(bundles) or prefs.get('budget') is None
+        if bundles:
+            top = bundles[0]
+            itinerary['itinerary'] = [top[name] for name in components if name in options]
+            itinerary['hotel'] = top.get('hotel')
+            itinerary['car'] = top.get('car')
+            itinerary['estimated_cost'] = top['total_cost']
         return itinerary
 
+
+def _flight_candidates(options):
+    """(cost, quality) per flight option; quality favours short, direct trips"""
+    cost = np.array([o['price'] for o in options], dtype=np.float64)
+    duration = np.array([max(o['duration'], 1) for o in options], dtype=np.float64)
+    stops = np.array([o['stops'] for o in options], dtype=np.float64)
+    return cost, (duration.min() / duration) * 0.9 ** stops
+
+
+def _listing_candidates(listings: pd.DataFrame, price_column, units, *rating_columns):
+    """(cost, quality) per hotel/car; quality is the first available rating out of 5"""
+    cost = pd.to_numeric(listings[price_column], errors='coerce').to_numpy(dtype=np.float64) * units
+    rating = pd.Series(np.nan, index=listings.index)
+    for column in rating_columns:
+        if column in listings:
+            rating = rating.fillna(pd.to_numeric(listings[column], errors='coerce').where(lambda r: r > 0))
+    quality = (rating.fillna(2.5).clip(0, 5) / 5.0).to_numpy(dtype=np.float64)
+    # Unpriced listings can never be picked
+    cost[np.isnan(cost)] = np.inf
+    return cost, quality
+
+
+def _at_location(listings: Optional[pd.DataFrame], column, *places):
+    if listings is None or column not in listings:
+        return listings
+    wanted = {str(p).casefold() for p in places if p}
+    if not wanted:
+        return listings
+    return listings[listings[column].astype(str).str.casefold().isin(wanted)].reset_index(drop=True)
+
+
+def _record(row: pd.Series) -> dict:
+    return {k: (v.item() if hasattr(v, 'item') else v) for k, v in row.items()}
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return datetime.combine(value, dt_time.min)
+
+
+def _day_start(value: datetime) -> datetime:
+    return datetime.combine(value.date(), dt_time.min)
+
+
+def _day_end(value: datetime) -> datetime:
+    return datetime.combine(value.date(), dt_time.max)
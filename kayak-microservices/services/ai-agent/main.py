@@ -3,13 +3,25 @@ AI Agent Service Main Entry Point
 FastAPI application for deals detection and AI concierge
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from models.schemas import Deal, UserQuery, TripPlan
+from fastapi.responses import StreamingResponse
+from models.schemas import Deal, ExplainRequest, UserQuery, TripPlan
 from services.websocket_service import WebSocketService
+from services.price_history import PriceHistoryStore
+from services.deals_cache import DealsCache
+from services.kafka_service import KafkaService, LISTING_TOPICS
+from services.trip_data import TripDataService
 from agents.deal_detector import DealDetector
+from agents.explainer import ExplainerAgent
 from agents.intent_parser import IntentParser
-from typing import List
+from agents.offer_tagger import OfferTaggerAgent
+from agents.feed_ingestion import FeedIngestionAgent
+from agents.trip_planner import TripPlannerAgent
+from typing import List, Optional
+import asyncio
+import json
+import os
 
 app = FastAPI(
     title="Kayak AI Agent",
@@ -29,9 +41,67 @@ app.add_middleware(
 # WebSocket service
 ws_service = WebSocketService()
 
+# Rolling per-route price quantiles used by deal scoring
+price_history = PriceHistoryStore()
+
 # Agents
-deal_detector = DealDetector()
+deal_detector = DealDetector(price_history=price_history, tagger=OfferTaggerAgent())
 intent_parser = IntentParser()
+explainer = ExplainerAgent()
+EXPLAIN_MAX_ITEMS = int(os.getenv('EXPLAIN_MAX_ITEMS', '1000'))
+# NDJSON lines per streamed chunk
+EXPLAIN_CHUNK = 50
+# Flight graph is built once; MVP uses synthetic 90-day inventory
+trip_planner = TripPlannerAgent(
+    deal_detector.generate_mock_flights(int(os.getenv('TRIP_PLANNER_MOCK_FLIGHTS', '100000')), seed=7),
+    entity_extractor=intent_parser.entity_extractor
+)
+# Pooled MySQL/MongoDB lookups for live trip candidates (off unless configured)
+trip_data = TripDataService.from_env()
+
+# Kafka: listing change events drive incremental re-scoring,
+# detected deals are published back in compressed batches
+KAFKA_ENABLED = bool(os.getenv('KAFKA_BROKERS'))
+kafka_service = KafkaService()
+
+# Precomputed deals, refreshed in the background
+deals_cache = DealsCache(deal_detector, publish=kafka_service.publish_event if KAFKA_ENABLED else None)
+# Push new deals to matching /ws/events subscribers
+deals_cache.listeners.append(ws_service.publish_deals)
+
+# Partner feeds (FEED_SOURCES), streamed into the detector on an interval
+feed_agent = FeedIngestionAgent()
+
+@app.on_event("startup")
+async def startup():
+    await deals_cache.start()
+    if trip_data.enabled:
+        await trip_data.connect()
+    if feed_agent.sources:
+        app.state.feed_task = asyncio.create_task(
+            feed_agent.run_forever(deals_cache.apply_listings, float(os.getenv('FEED_INTERVAL', '300')))
+        )
+    if KAFKA_ENABLED:
+        app.state.kafka_task = asyncio.create_task(
+            kafka_service.consume_events(LISTING_TOPICS, deals_cache.apply_listing_events)
+        )
+
+@app.on_event("shutdown")
+async def shutdown():
+    await deals_cache.stop()
+    # Stop the consumer loop before its Kafka client is closed underneath it
+    for name in ('kafka_task', 'feed_task'):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    await kafka_service.disconnect()
+    await trip_data.close()
+    if feed_agent.sources:
+        await feed_agent.close()
 
 @app.get("/")
 def root():
@@ -39,23 +109,69 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "OK", "service": "ai-agent"}
+    return {
+        "status": "OK",
+        "service": "ai-agent",
+        "deals_cache": deals_cache.stats(),
+        "websockets": ws_service.stats(),
+        "parse_cache": intent_parser.cache.stats(),
+        "explain_cache": explainer.stats(),
+        "kafka": kafka_service.metrics() if KAFKA_ENABLED else None,
+        "feeds": feed_agent.last_run
+    }
 
 # Deals Router
 @app.get("/api/ai/deals", response_model=List[Deal])
-async def get_deals(limit: int = 10):
-    """Get current deals"""
-    # For MVP, return mock detected deals
-    deals = await deal_detector.run_mock_detection()
-    return deals[:limit]
+async def get_deals(limit: int = 10, listing_type: Optional[str] = None,
+                    tags: Optional[str] = None, match: str = 'all', explain: bool = False):
+    """
+    Get current deals from the precomputed cache; `tags` is comma-separated,
+    `match` is all|any, `explain` adds a cached explanation to each deal
+    """
+    if match not in ('all', 'any'):
+        raise HTTPException(status_code=400, detail="match must be 'all' or 'any'")
+    tag_list = [t.strip() for t in tags.split(',') if t.strip()] if tags else None
+    deals = deals_cache.get(limit, listing_type, tag_list, match)
+    if explain:
+        deals = [d.model_copy(update={'explanation': explainer.explain_deal(d)}) for d in deals]
+    return deals
 
 @app.post("/api/ai/deals/detect")
 async def detect_deals():
-    """Trigger deal detection"""
-    # In a real scenario, this would trigger a background task
-    deals = await deal_detector.run_mock_detection()
+    """Trigger deal detection and refresh the cache"""
+    deals = await deals_cache.refresh()
     return {"message": "Deal detection completed", "deals_found": len(deals)}
 
+@app.post("/api/ai/deals/explain")
+async def explain_deals(request: ExplainRequest):
+    """
+    Explain many deals (and trip recommendations) in one call, streamed
+    as NDJSON: one {"id", "explanation"} line per deal id in request
+    order ({"id", "error"} if it is not cached), then one
+    {"recommendation", "explanation"} line per recommendation.
+    """
+    if len(request.deal_ids) + len(request.recommendations) > EXPLAIN_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"at most {EXPLAIN_MAX_ITEMS} items per request")
+
+    async def lines():
+        batch = []
+        for deal_id, deal in zip(request.deal_ids, deals_cache.lookup(request.deal_ids)):
+            if deal is None:
+                batch.append({'id': deal_id, 'error': 'not_found'})
+            else:
+                batch.append({'id': deal_id, 'explanation': explainer.explain_deal(deal)})
+            if len(batch) >= EXPLAIN_CHUNK:
+                yield ''.join(json.dumps(line) + '\n' for line in batch)
+                batch = []
+                await asyncio.sleep(0)
+        for i, recommendation in enumerate(request.recommendations):
+            batch.append({'recommendation': i,
+                          'explanation': explainer.explain_recommendation(recommendation, request.factors)})
+        if batch:
+            yield ''.join(json.dumps(line) + '\n' for line in batch)
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
 # Concierge Router
 @app.post("/api/ai/concierge/query")
 async def process_query(query: UserQuery):
@@ -75,8 +191,29 @@ async def process_query(query: UserQuery):
 @app.post("/api/ai/concierge/plan-trip")
 async def plan_trip(trip_plan: TripPlan):
     """Plan a complete trip"""
-    # TODO: Integrate TripPlanner agent
-    return {"itinerary": [], "estimated_cost": 0}
+    preferences = trip_plan.preferences or {}
+    if not preferences.get('origin'):
+        raise HTTPException(status_code=400, detail="preferences.origin is required")
+    candidates = None
+    if trip_data.enabled:
+        destinations = trip_planner.airports_for(trip_plan.destination)
+        candidates = await trip_data.fetch_trip_candidates(
+            trip_planner.airports_for(preferences['origin']),
+            destinations,
+            preferences.get('hotel_city') or trip_planner.city_of(destinations[0]) or trip_plan.destination,
+            trip_plan.start_date,
+            trip_plan.end_date
+        )
+    plan = await asyncio.to_thread(trip_planner.plan_trip, {
+        **preferences,
+        'destination': trip_plan.destination,
+        'start_date': trip_plan.start_date,
+        'end_date': trip_plan.end_date,
+        'budget': trip_plan.budget
+    }, candidates)
+    if candidates is not None:
+        plan['sources'] = {'errors': candidates['errors'], 'timings_ms': candidates['timings_ms']}
+    return plan
 
 # WebSocket endpoint for real-time events
 @app.websocket("/ws/events")
@@ -85,9 +222,10 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            # Echo back for now
-            await ws_service.send_to_client(websocket, {"message": data})
+            await ws_service.handle_message(websocket, data)
     except WebSocketDisconnect:
+        pass
+    finally:
         ws_service.disconnect(websocket)
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ Pydantic Schemas for AI Agent
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 
 class Deal(BaseModel):
@@ -13,11 +13,22 @@ class Deal(BaseModel):
     price: float
     original_price: Optional[float] = None
     discount_percentage: Optional[float] = None
-    listing_type: str  # flight, hotel, car
+    listing_type: Literal['flight', 'hotel', 'car']
+    route: Optional[str] = None  # e.g. LAX-SFO, flights only
+    city: Optional[str] = None
     tags: List[str] = []
     score: float = 0.0
+    score_version: Optional[int] = None
+    factors: Optional[dict] = None  # scoring inputs/contributions behind `score`
+    explanation: Optional[str] = None
     expires_at: Optional[datetime] = None
 
+class ExplainRequest(BaseModel):
+    deal_ids: List[str] = []
+    # Trip bundles (as returned by plan-trip) and the preferences they were built for
+    recommendations: List[dict] = []
+    factors: Optional[dict] = None
+
 class UserQuery(BaseModel):
     query: str
     user_id: Optional[str] = None
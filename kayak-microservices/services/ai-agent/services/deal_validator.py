@@ -0,0 +1,123 @@
+"""
+Deal Validator Service
+Columnar batch validation compiled from the Deal schema
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Literal, Optional, Tuple, Union, get_args, get_origin
+import numpy as np
+import pandas as pd
+from models.schemas import Deal
+
+MAX_PRICE = 100000.0
+# (low, high) bounds per Deal field; low is exclusive for prices
+DEFAULT_BOUNDS = {
+    'price': (0.0, MAX_PRICE),
+    'original_price': (0.0, MAX_PRICE),
+    'discount_percentage': (0.0, 100.0),
+}
+EXCLUSIVE_LOW = {'price', 'original_price'}
+DEFAULT_CURRENCIES = ('USD',)
+
+
+def _unwrap(annotation) -> Tuple[object, bool]:
+    """(inner type, optional) for `Optional[X]` / `X`"""
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        return (args[0] if len(args) == 1 else annotation), True
+    return annotation, False
+
+
+class DealValidator:
+    """
+    Compiled once from a pydantic model: every field becomes a column check
+    (required/non-empty, numeric + bounds, enum membership for Literal
+    fields, parseable and unexpired datetimes). `validate` runs those checks
+    over a whole DataFrame and returns a boolean rejection mask, so a batch
+    of a million rows costs a few vector ops instead of a model per row.
+
+    `columns` maps model fields to frame columns (feeds name things
+    differently); fields in `derived` are filled later and not checked.
+    """
+
+    def __init__(self, model=Deal, columns: Optional[Dict[str, str]] = None, derived: Iterable[str] = (),
+                 bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+                 currencies: Iterable[str] = DEFAULT_CURRENCIES):
+        columns = columns or {}
+        bounds = dict(DEFAULT_BOUNDS, **(bounds or {}))
+        derived = set(derived)
+        self.currencies = {c.upper() for c in currencies}
+        self.checks: List[dict] = []
+        for name, field in model.model_fields.items():
+            if name in derived:
+                continue
+            kind, _ = _unwrap(field.annotation)
+            check = {'field': name, 'column': columns.get(name, name), 'required': field.is_required()}
+            if get_origin(kind) is Literal:
+                check.update(kind='enum', values=set(get_args(kind)))
+            elif kind in (float, int):
+                check.update(kind='number', bounds=bounds.get(name), exclusive=name in EXCLUSIVE_LOW)
+            elif kind is datetime:
+                check.update(kind='datetime')
+            elif kind is str:
+                check.update(kind='string')
+            else:
+                continue  # lists/nested models are produced by the agents, not feeds
+            self.checks.append(check)
+        self.last_reasons: Dict[str, int] = {}
+
+    def validate(self, frame: pd.DataFrame, now: Optional[datetime] = None) -> np.ndarray:
+        """Boolean mask, True where the row must be rejected; reason counts in `last_reasons`"""
+        now = pd.Timestamp(now or datetime.now(timezone.utc))
+        if now.tzinfo is None:
+            now = now.tz_localize('UTC')
+        rejected = np.zeros(len(frame), dtype=bool)
+        reasons: Dict[str, int] = {}
+
+        def reject(reason: str, mask):
+            mask = np.asarray(mask, dtype=bool)
+            count = int(np.count_nonzero(mask & ~rejected))
+            if count:
+                reasons[reason] = reasons.get(reason, 0) + count
+            rejected[:] |= mask
+
+        for check in self.checks:
+            column = check['column']
+            if column not in frame:
+                if check['required']:
+                    reject(f"{check['field']}:missing", np.ones(len(frame), dtype=bool))
+                continue
+            values = frame[column]
+            missing = values.isna().to_numpy()
+            if values.dtype == object:
+                missing = missing | values.eq('').to_numpy()
+            if check['required']:
+                reject(f"{check['field']}:missing", missing)
+            present = ~missing
+
+            if check['kind'] == 'number':
+                numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+                reject(f"{check['field']}:type", present & np.isnan(numbers))
+                if check['bounds'] is not None:
+                    low, high = check['bounds']
+                    below = numbers <= low if check['exclusive'] else numbers < low
+                    reject(f"{check['field']}:range", present & (below | (numbers > high)))
+            elif check['kind'] == 'enum':
+                reject(f"{check['field']}:enum", present & ~values.isin(check['values']).to_numpy())
+            elif check['kind'] == 'datetime':
+                stamps = pd.to_datetime(values, errors='coerce', utc=True, format='ISO8601')
+                reject(f"{check['field']}:type", present & stamps.isna().to_numpy())
+                reject(f"{check['field']}:expired", present & (stamps <= now).to_numpy())
+
+        if 'currency' in frame:
+            currency = frame['currency']
+            given = currency.notna().to_numpy()
+            reject('currency:unsupported',
+                   given & ~currency.astype(str).str.upper().isin(self.currencies).to_numpy())
+
+        self.last_reasons = reasons
+        return rejected
+
+    def is_valid(self, record: dict, now: Optional[datetime] = None) -> bool:
+        """Single-record convenience wrapper over `validate`"""
+        return not self.validate(pd.DataFrame([record]), now)[0]
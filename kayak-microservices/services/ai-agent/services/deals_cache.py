@@ -0,0 +1,287 @@
+"""
+Deals Cache Service
+Precomputed top-K deals per listing type, refreshed in the background
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from models.schemas import Deal
+from services.kafka_service import DEALS_DETECTED, LISTING_DELETED
+from services.tag_index import MATCH_ALL, TagIndex
+
+ALL_TYPES = 'all'
+SNAPSHOT_VERSION = 1
+
+
+def _type_tag(listing_type: str) -> str:
+    """Listing type rides in the tag index as a reserved tag"""
+    return f"type:{listing_type}"
+
+
+class DealsCache:
+    def __init__(self, detector, refresh_interval: Optional[float] = None,
+                 ttl: Optional[float] = None, top_k: int = 500, publish=None,
+                 snapshot_path: Optional[str] = None):
+        self.detector = detector
+        self.publish = publish
+        # Called with each batch of new or re-scored deals
+        self.listeners: List[Callable[[List[Deal]], object]] = []
+        self.refresh_interval = refresh_interval or float(os.getenv('DEALS_REFRESH_INTERVAL', '60'))
+        self.ttl = ttl or float(os.getenv('DEALS_CACHE_TTL', str(self.refresh_interval * 2)))
+        self.top_k = top_k
+        self._by_type: Dict[str, List[Deal]] = {}
+        # Every cached deal by id, and the tag -> deal bitmap index over them
+        self._deals: Dict[str, Deal] = {}
+        self.index = TagIndex()
+        self.snapshot_path = snapshot_path or os.getenv('DEALS_SNAPSHOT_PATH') or None
+        self._refreshed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Optional[asyncio.Task] = None
+        # Incremental updates that arrived while a refresh was running
+        self._deferred: List[tuple] = []
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.incremental_updates = 0
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        """Warm-start from the last snapshot, then start the background refresh loop"""
+        if self.snapshot_path and self._refreshed_at is None:
+            try:
+                await asyncio.to_thread(self.load_snapshot)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Deals snapshot not loaded: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Cancel the background refresh loop"""
+        for task in (self._task, self._pending):
+            if task is not None:
+                task.cancel()
+        self._task = None
+        self._pending = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Deals cache refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self) -> List[Deal]:
+        """Run detection and swap in freshly sorted top-K lists"""
+        async with self._lock:
+            try:
+                deals = await self.detector.run_mock_detection()
+            except BaseException:
+                self._replay_deferred(notify=True)
+                raise
+            self._store(deals)
+            # Updates newer than the detection snapshot go back on top of it
+            replayed = self._replay_deferred(notify=False)
+            self.refreshes += 1
+            self.last_error = None
+        self._notify(deals)
+        if replayed:
+            self._notify(replayed)
+        await self._save_snapshot()
+        if self.publish is not None:
+            for deal in deals:
+                await self.publish(DEALS_DETECTED, deal.model_dump(mode='json'))
+        return deals
+
+    def _store(self, deals: List[Deal]):
+        ranked = sorted(deals, key=lambda d: d.score, reverse=True)
+        by_type: Dict[str, List[Deal]] = {ALL_TYPES: ranked[:self.top_k]}
+        for deal in ranked:
+            bucket = by_type.setdefault(deal.listing_type, [])
+            if len(bucket) < self.top_k:
+                bucket.append(deal)
+        cached = {d.id: d for bucket in by_type.values() for d in bucket}
+        index = TagIndex()
+        for deal in cached.values():
+            index.add(deal.id, self._index_tags(deal))
+        # Single reference swap: readers never see a half-built cache
+        self._by_type, self._deals, self.index = by_type, cached, index
+        self._refreshed_at = time.monotonic()
+
+    def _replay_deferred(self, notify: bool) -> List[Deal]:
+        deferred, self._deferred = self._deferred, []
+        replayed = []
+        for upserts, removed_ids in deferred:
+            self._patch(upserts, removed_ids, notify)
+            replayed.extend(upserts)
+        return replayed
+
+    def _index_tags(self, deal: Deal) -> List[str]:
+        return list(deal.tags) + [_type_tag(deal.listing_type)]
+
+    def apply_updates(self, upserts: List[Deal], removed_ids: Iterable[str] = ()):
+        """
+        Merge re-scored deals into the cached lists without a full rescan.
+        During a refresh the update is queued and replayed once the new
+        lists are stored, so the refresh cannot overwrite it.
+        """
+        if self._lock.locked():
+            self._deferred.append((list(upserts), list(removed_ids)))
+            return
+        self._patch(upserts, removed_ids)
+
+    def _patch(self, upserts: List[Deal], removed_ids: Iterable[str], notify: bool = True):
+        changed = {d.id for d in upserts} | set(removed_ids)
+        if not changed:
+            return
+        fresh = sorted(upserts, key=lambda d: d.score, reverse=True)
+        by_type: Dict[str, List[Deal]] = {}
+        types = set(self._by_type) | {ALL_TYPES} | {d.listing_type for d in fresh}
+        for listing_type in types:
+            kept = [d for d in self._by_type.get(listing_type, []) if d.id not in changed]
+            added = fresh if listing_type == ALL_TYPES else [d for d in fresh if d.listing_type == listing_type]
+            merged = heapq.merge(kept, added, key=lambda d: -d.score)
+            by_type[listing_type] = [d for _, d in zip(range(self.top_k), merged)]
+        cached = {d.id: d for bucket in by_type.values() for d in bucket}
+        # Patch the index: drop evicted/removed deals, re-add changed ones
+        for deal_id in self._deals.keys() - cached.keys():
+            self.index.remove(deal_id)
+        for deal in upserts:
+            if deal.id in cached:
+                self.index.add(deal.id, self._index_tags(deal))
+        self._by_type, self._deals = by_type, cached
+        self.incremental_updates += 1
+        if notify:
+            self._notify(upserts)
+
+    def _notify(self, deals: List[Deal]):
+        for listener in self.listeners:
+            try:
+                listener(deals)
+            except Exception as e:
+                print(f"Deals listener failed: {e}")
+
+    async def apply_listing_events(self, events):
+        """Kafka handler: re-score changed flight listings and patch the cache"""
+        changed, deleted = {}, []
+        for topic, payload in events:
+            listing = payload.get('listing', payload)
+            listing_type = payload.get('listing_type') or payload.get('type') or 'flight'
+            if listing_type != 'flight' or 'id' not in listing:
+                continue
+            if topic == LISTING_DELETED:
+                changed.pop(str(listing['id']), None)
+                deleted.append(str(listing['id']))
+            else:
+                # Last event per listing wins within a batch
+                changed[str(listing['id'])] = listing
+        await self.apply_listings(list(changed.values()), deleted)
+
+    async def apply_listings(self, listings: List[dict], removed_ids: Iterable[str] = ()):
+        """Re-score flight rows off the event loop and patch the cache"""
+        deals, dropped = await asyncio.to_thread(self.detector.rescore, listings)
+        self.apply_updates(deals, dropped + list(removed_ids))
+
+    def trigger_refresh(self):
+        """Schedule a refresh without waiting for it"""
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self.refresh())
+
+    def get(self, limit: int = 10, listing_type: Optional[str] = None,
+            tags: Optional[List[str]] = None, match: str = MATCH_ALL) -> List[Deal]:
+        """
+        Return up to `limit` best deals; never blocks on detection.
+        With `tags`, only deals carrying all (match='all') or any
+        (match='any') of them, answered from the tag index.
+        """
+        if self._refreshed_at is None or self.age() > self.ttl:
+            self.misses += 1
+            self.trigger_refresh()
+        else:
+            self.hits += 1
+        if not tags:
+            return self._by_type.get(listing_type or ALL_TYPES, [])[:max(limit, 0)]
+        index, deals = self.index, self._deals
+        bitmap = index.bitmap(tags, match)
+        if listing_type:
+            bitmap &= index.bitmap([_type_tag(listing_type)])
+        matched = (deals[deal_id] for deal_id in index.ids(bitmap))
+        return heapq.nlargest(max(limit, 0), matched, key=lambda d: d.score)
+
+    def lookup(self, deal_ids: List[str]) -> List[Optional[Deal]]:
+        """Cached deals by id, in request order (None where unknown)"""
+        deals = self._deals
+        return [deals.get(deal_id) for deal_id in deal_ids]
+
+    def snapshot(self) -> dict:
+        """JSON-safe copy of the cached deals and tag index"""
+        return {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'deals': [d.model_dump(mode='json') for d in self._deals.values()],
+            'by_type': {k: [d.id for d in v] for k, v in self._by_type.items()},
+            'index': self.index.to_dict()
+        }
+
+    def save_snapshot(self, snapshot: Optional[dict] = None):
+        """Write a snapshot to `snapshot_path` (atomic replace)"""
+        snapshot = snapshot or self.snapshot()
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def load_snapshot(self):
+        """Restore deals and tag index without re-running detection"""
+        with open(self.snapshot_path) as f:
+            snapshot = json.load(f)
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {snapshot.get('version')}")
+        deals = {d['id']: Deal(**d) for d in snapshot['deals']}
+        self._by_type = {k: [deals[i] for i in ids] for k, ids in snapshot['by_type'].items()}
+        self._deals = deals
+        self.index = TagIndex.from_dict(snapshot['index'])
+        # Keep the snapshot's real age so a stale one still refreshes promptly
+        self._refreshed_at = time.monotonic() - max(time.time() - snapshot['saved_at'], 0.0)
+        print(f"Deals cache warm-started from {self.snapshot_path} ({len(deals)} deals)")
+
+    async def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        try:
+            # Built on the loop so it cannot race apply_updates; written off it
+            await asyncio.to_thread(self.save_snapshot, self.snapshot())
+        except Exception as e:
+            print(f"Deals snapshot not saved: {e}")
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last successful refresh"""
+        if self._refreshed_at is None:
+            return None
+        return time.monotonic() - self._refreshed_at
+
+    def stats(self) -> dict:
+        age = self.age()
+        lookups = self.hits + self.misses
+        return {
+            'age_seconds': round(age, 3) if age is not None else None,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'refreshes': self.refreshes,
+            'incremental_updates': self.incremental_updates,
+            'deals': {k: len(v) for k, v in self._by_type.items()},
+            'tag_index': self.index.stats(),
+            'last_error': self.last_error
+        }
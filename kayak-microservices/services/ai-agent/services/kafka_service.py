@@ -2,27 +2,335 @@
 Kafka Service for AI Agent
 """
 
-class KafkaService:
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Listing lifecycle topics (see shared/constants/topics.js)
+LISTING_CREATED = 'listing.created'
+LISTING_UPDATED = 'listing.updated'
+LISTING_DELETED = 'listing.deleted'
+LISTING_TOPICS = [LISTING_CREATED, LISTING_UPDATED, LISTING_DELETED]
+DEALS_DETECTED = 'deals.detected'
+
+IDLE_SLEEP = 0.05
+
+# Producer batching defaults
+MAX_BATCH_EVENTS = 500
+MAX_BATCH_BYTES = 1024 * 1024
+LINGER_SECONDS = 0.05
+MAX_QUEUED_EVENTS = 10000
+
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000)
+
+Event = Tuple[str, dict]
+EventHandler = Callable[[List[Event]], Awaitable[None]]
+
+TopicPartition = namedtuple('TopicPartition', ['topic', 'partition'])
+ConsumerRecord = namedtuple('ConsumerRecord', ['topic', 'partition', 'offset', 'value'])
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds values <= buckets[i], last is overflow"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        labels = [str(b) for b in self.buckets] + ['+Inf']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else 0.0
+        }
+
+
+class TopicMetrics:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.events = 0
+        self.bytes = 0
+        self.errors = 0
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            'events': self.events,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'events_per_sec': round(self.events / elapsed, 3),
+            'batch_size': self.batch_size.snapshot(),
+            'latency_ms': self.latency_ms.snapshot()
+        }
+
+
+class InMemoryBroker:
+    """In-process stand-in for a Kafka cluster, for local runs and tests"""
+
     def __init__(self):
+        self.topics = defaultdict(list)
+
+    def send(self, topic, value):
+        if not isinstance(value, bytes):
+            value = json.dumps(value).encode('utf-8')
+        log = self.topics[topic]
+        log.append(ConsumerRecord(topic, 0, len(log), value))
+
+    def consumer(self, *topics, **kwargs):
+        return InMemoryConsumer(self, *topics)
+
+    def producer(self, **kwargs):
+        return InMemoryProducer(self)
+
+
+class InMemoryConsumer:
+    """Mimics the KafkaConsumer.poll() contract over an InMemoryBroker"""
+
+    def __init__(self, broker: InMemoryBroker, *topics):
+        self.broker = broker
+        self.offsets = {}
+        self.subscribe(topics)
+
+    def subscribe(self, topics):
+        for topic in topics:
+            self.offsets.setdefault(topic, 0)
+
+    def poll(self, timeout_ms=0, max_records=None):
+        batch = {}
+        remaining = max_records
+        for topic, offset in self.offsets.items():
+            records = self.broker.topics[topic][offset:]
+            if remaining is not None:
+                records = records[:remaining]
+                remaining -= len(records)
+            if records:
+                batch[TopicPartition(topic, 0)] = records
+                self.offsets[topic] = offset + len(records)
+            if remaining == 0:
+                break
+        return batch
+
+    def close(self):
+        pass
+
+
+class InMemoryProducer:
+    """Mimics the KafkaProducer send()/flush() contract over an InMemoryBroker"""
+
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+
+    def send(self, topic, value):
+        self.broker.send(topic, value)
+        return _DeliveredFuture()
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+
+class _DeliveredFuture:
+    exception = None
+
+    def failed(self):
+        return False
+
+
+class KafkaService:
+    def __init__(self, brokers: Optional[str] = None, group_id: Optional[str] = None,
+                 consumer_factory: Optional[Callable] = None,
+                 producer_factory: Optional[Callable] = None,
+                 max_batch_events=MAX_BATCH_EVENTS, max_batch_bytes=MAX_BATCH_BYTES,
+                 linger=LINGER_SECONDS):
+        self.brokers = (brokers or os.getenv('KAFKA_BROKERS', 'localhost:9092')).split(',')
+        self.group_id = group_id or os.getenv('KAFKA_GROUP_ID', 'ai-agent')
+        self.compression = os.getenv('KAFKA_COMPRESSION', 'gzip')
+        self.consumer_factory = consumer_factory or self._kafka_consumer
+        self.producer_factory = producer_factory or self._kafka_producer
+        self.max_batch_events = max_batch_events
+        self.max_batch_bytes = max_batch_bytes
+        self.linger = linger
         self.producer = None
         self.consumer = None
-    
-    async def connect(self):
+        self._running = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.topic_metrics: Dict[str, TopicMetrics] = defaultdict(TopicMetrics)
+        self.events_consumed = 0
+        self.batches_consumed = 0
+
+    def _kafka_consumer(self, *topics):
+        from kafka import KafkaConsumer
+        return KafkaConsumer(
+            *topics,
+            bootstrap_servers=self.brokers,
+            group_id=self.group_id,
+            client_id='ai-agent',
+            auto_offset_reset='latest',
+            enable_auto_commit=True
+        )
+
+    def _kafka_producer(self):
+        from kafka import KafkaProducer
+        return KafkaProducer(
+            bootstrap_servers=self.brokers,
+            client_id='ai-agent',
+            compression_type=self.compression,
+            linger_ms=int(self.linger * 1000),
+            batch_size=256 * 1024,
+            acks=1
+        )
+
+    async def connect(self, topics=()):
         """Connect to Kafka"""
-        # TODO: Initialize Kafka client
+        self.consumer = await asyncio.to_thread(self.consumer_factory, *topics)
         print("Kafka connected")
-    
+
     async def publish_event(self, topic, message):
-        """Publish event to Kafka"""
-        # TODO: Publish to Kafka
-        print(f"Publishing to {topic}: {message}")
-    
-    async def consume_events(self, topics):
-        """Consume events from Kafka"""
-        # TODO: Consume from Kafka
-        pass
-    
+        """
+        Queue an event for publishing.
+        Returns as soon as the event is queued; a background flusher sends
+        size- and time-bounded batches. Only waits when the queue is full.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=MAX_QUEUED_EVENTS)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+        value = json.dumps(message, default=str).encode('utf-8')
+        await self._queue.put((topic, value, time.monotonic()))
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][1])
+            deadline = loop.time() + self.linger
+            while len(batch) < self.max_batch_events and size < self.max_batch_bytes:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                batch.append(item)
+                size += len(item[1])
+            try:
+                await asyncio.to_thread(self._send_batch, batch)
+            except Exception as e:
+                print(f"Kafka publish failed: {e}")
+                for topic, _, _ in batch:
+                    self.topic_metrics[topic].errors += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send_batch(self, batch):
+        if self.producer is None:
+            self.producer = self.producer_factory()
+        futures = [(topic, value, queued_at, self.producer.send(topic, value))
+                   for topic, value, queued_at in batch]
+        self.producer.flush()
+        sent_at = time.monotonic()
+
+        per_topic = defaultdict(int)
+        for topic, value, queued_at, future in futures:
+            metrics = self.topic_metrics[topic]
+            if future.failed():
+                metrics.errors += 1
+                continue
+            metrics.events += 1
+            metrics.bytes += len(value)
+            metrics.latency_ms.observe((sent_at - queued_at) * 1000)
+            per_topic[topic] += 1
+        for topic, count in per_topic.items():
+            self.topic_metrics[topic].batch_size.observe(count)
+
+    async def flush(self):
+        """Wait until every queued event has been sent"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def metrics(self) -> dict:
+        """Per-topic producer throughput, batch-size and latency histograms"""
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'consumed': {'events': self.events_consumed, 'batches': self.batches_consumed},
+            'topics': {topic: m.snapshot() for topic, m in self.topic_metrics.items()}
+        }
+
+    async def consume_events(self, topics, handler: EventHandler, max_records=500,
+                             timeout_ms=1000, retry_delay=5.0):
+        """
+        Consume events from Kafka in batches.
+        Each non-empty poll is decoded and handed to `handler` as one list of
+        (topic, payload) pairs, so downstream work is batched per poll.
+        """
+        self._running = True
+        while self._running:
+            if self.consumer is None:
+                try:
+                    await self.connect(topics)
+                except Exception as e:
+                    print(f"Kafka connection failed: {e}")
+                    await asyncio.sleep(retry_delay)
+                    continue
+
+            batch = await asyncio.to_thread(self.consumer.poll, timeout_ms=timeout_ms,
+                                            max_records=max_records)
+            events = self._decode(batch)
+            if not events:
+                # Non-blocking consumers (InMemoryConsumer) return at once; don't spin
+                await asyncio.sleep(IDLE_SLEEP)
+                continue
+
+            self.events_consumed += len(events)
+            self.batches_consumed += 1
+            try:
+                await handler(events)
+            except Exception as e:
+                print(f"Error processing Kafka batch: {e}")
+
+    def _decode(self, batch) -> List[Event]:
+        events = []
+        for records in batch.values():
+            for record in records:
+                try:
+                    events.append((record.topic, json.loads(record.value)))
+                except (TypeError, ValueError) as e:
+                    print(f"Skipping undecodable message on {record.topic}: {e}")
+        return events
+
     async def disconnect(self):
         """Disconnect from Kafka"""
-        pass
-
+        self._running = False
+        if self._flusher is not None:
+            await self.flush()
+            self._flusher.cancel()
+            self._flusher = None
+        if self.producer is not None:
+            await asyncio.to_thread(self.producer.close)
+            self.producer = None
+        if self.consumer is not None:
+            await asyncio.to_thread(self.consumer.close)
+            self.consumer = None
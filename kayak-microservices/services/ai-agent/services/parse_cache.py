@@ -0,0 +1,266 @@
+"""
+Parse Cache Service
+Memoizes concierge query parses, optionally shared across uvicorn workers
+"""
+
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+from typing import Any, Hashable, Optional
+import asyncio
+import os
+import re
+import signal
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_MAXSIZE = 10000
+DEFAULT_TTL = 300.0
+# Seconds before the first reconnect to the shared tier; doubles per failure
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 60.0
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s$.,/'-]+")
+_TRAILING_RE = re.compile(r"(?<!\d)[.,/'-]+|[.,/'-]+(?!\d)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str, casefold: bool = True) -> str:
+    """Case-fold, drop stray punctuation and collapse whitespace; keeps $, 1,200 and 12/07"""
+    text = _PUNCTUATION_RE.sub(' ', text.casefold() if casefold else text)
+    text = _TRAILING_RE.sub(' ', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+class LRUCache:
+    """Thread-safe LRU with per-entry TTL"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SharedCacheManager(BaseManager):
+    """Serves one LRUCache to every worker over a local socket"""
+
+
+def default_socket_path() -> str:
+    """Socket inside a per-user directory (XDG_RUNTIME_DIR when set)"""
+    base = os.getenv('XDG_RUNTIME_DIR') or os.path.join(tempfile.gettempdir(), f'kayak-ai-agent-{os.getuid()}')
+    return os.path.join(base, 'parse-cache.sock')
+
+
+def read_authkey() -> Optional[bytes]:
+    """Manager authkey from PARSE_CACHE_AUTHKEY_FILE or PARSE_CACHE_AUTHKEY; no default"""
+    path = os.getenv('PARSE_CACHE_AUTHKEY_FILE')
+    if path:
+        with open(path, 'rb') as f:
+            key = f.read().strip()
+    else:
+        key = os.getenv('PARSE_CACHE_AUTHKEY', '').encode()
+    return key or None
+
+
+def check_private_dir(address: str, create: bool = False):
+    """
+    The socket's directory must be ours and closed to group/other (0700),
+    so nobody else can bind the path or reach the socket.
+    """
+    directory = os.path.dirname(os.path.abspath(address))
+    if create and not os.path.exists(directory):
+        os.makedirs(directory, mode=0o700)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"{directory} must be owned by this user with mode 0700")
+
+
+def serve(address: str, authkey: bytes, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+    """Run the shared cache server (blocks); `python -m services.parse_cache`"""
+    if not authkey:
+        raise ValueError("an authkey is required (PARSE_CACHE_AUTHKEY or PARSE_CACHE_AUTHKEY_FILE)")
+    check_private_dir(address, create=True)
+    if os.path.exists(address):
+        raise FileExistsError(f"{address} already exists; remove it if no parse cache is running")
+    cache = LRUCache(maxsize, ttl)
+    SharedCacheManager.register('cache', callable=lambda: cache)
+    manager = SharedCacheManager(address=address, authkey=authkey)
+    server = manager.get_server()
+    print(f"Parse cache serving on {address}")
+    # Exit through the finally below on `docker stop` / kill as well as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        # The path is the socket this server bound
+        if os.path.exists(address):
+            os.unlink(address)
+
+
+class ParseCache:
+    """
+    Per-process LRU in front of an optional shared LRU.
+    The shared tier is reached over a Unix socket (PARSE_CACHE_SOCKET),
+    authenticated with PARSE_CACHE_AUTHKEY(_FILE), and is best effort: if
+    it is down, lookups fall back to the local tier and the connection is
+    retried with exponential backoff. Async callers use aget/aset, which
+    run the blocking IPC on a worker thread.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, shared_address: Optional[str] = None,
+                 authkey: Optional[bytes] = None):
+        self.local = LRUCache(maxsize, ttl)
+        self.shared_address = shared_address
+        self.authkey = authkey
+        self._shared = None
+        self._connect_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._retry_delay = RECONNECT_DELAY
+        self.shared_hits = 0
+        self.shared_errors = 0
+        if shared_address and not authkey:
+            print("Shared parse cache needs PARSE_CACHE_AUTHKEY; using local cache only")
+            self.shared_address = None
+        if self.shared_address:
+            self._connect_shared()
+
+    @classmethod
+    def from_env(cls) -> 'ParseCache':
+        return cls(
+            maxsize=int(os.getenv('PARSE_CACHE_SIZE', DEFAULT_MAXSIZE)),
+            ttl=float(os.getenv('PARSE_CACHE_TTL', DEFAULT_TTL)),
+            shared_address=os.getenv('PARSE_CACHE_SOCKET') or None,
+            authkey=read_authkey()
+        )
+
+    def _connect_shared(self):
+        with self._connect_lock:
+            if self._shared is not None or time.monotonic() < self._retry_at:
+                return
+            try:
+                check_private_dir(self.shared_address)
+                SharedCacheManager.register('cache')
+                manager = SharedCacheManager(address=self.shared_address, authkey=self.authkey)
+                manager.connect()
+                self._shared = manager.cache()
+                self._retry_delay = RECONNECT_DELAY
+            except Exception as e:
+                self._failed(e)
+
+    def _failed(self, error: Exception):
+        """Drop the shared tier and schedule the next reconnect attempt"""
+        if self._shared is not None or self.shared_errors == 0:
+            print(f"Shared parse cache unavailable ({error}); retrying in {self._retry_delay:.0f}s")
+        self._shared = None
+        self.shared_errors += 1
+        self._retry_at = time.monotonic() + self._retry_delay
+        self._retry_delay = min(self._retry_delay * 2, MAX_RECONNECT_DELAY)
+
+    def _shared_tier(self):
+        if self._shared is None and self.shared_address:
+            self._connect_shared()
+        return self._shared
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        return self._shared_get(key)
+
+    def _shared_get(self, key: Hashable) -> Optional[Any]:
+        shared = self._shared_tier()
+        if shared is None:
+            return None
+        try:
+            value = shared.get(key)
+        except Exception as e:
+            self._failed(e)
+            return None
+        if value is not None:
+            self.shared_hits += 1
+            self.local.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self.local.set(key, value)
+        self._shared_set(key, value)
+
+    def _shared_set(self, key: Hashable, value: Any):
+        shared = self._shared_tier()
+        if shared is not None:
+            try:
+                shared.set(key, value)
+            except Exception as e:
+                self._failed(e)
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        """get() that keeps shared-tier IPC off the event loop"""
+        value = self.local.get(key)
+        if value is not None or not self.shared_address:
+            return value
+        return await asyncio.to_thread(self._shared_get, key)
+
+    async def aset(self, key: Hashable, value: Any):
+        """set() that keeps shared-tier IPC off the event loop"""
+        self.local.set(key, value)
+        if self.shared_address:
+            await asyncio.to_thread(self._shared_set, key, value)
+
+    def stats(self) -> dict:
+        stats = self.local.stats()
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'shared': self._shared is not None,
+            'shared_hits': self.shared_hits,
+            'shared_errors': self.shared_errors,
+            # Local or shared hit: the parse was skipped
+            'overall_hit_rate': round((stats['hits'] + self.shared_hits) / lookups, 4) if lookups else 0.0
+        })
+        return stats
+
+
+if __name__ == '__main__':
+    serve(os.getenv('PARSE_CACHE_SOCKET') or default_socket_path(), read_authkey(),
+          maxsize=int(os.getenv('PARSE_CACHE_SIZE', DEFAULT_MAXSIZE)),
+          ttl=float(os.getenv('PARSE_CACHE_TTL', DEFAULT_TTL)))
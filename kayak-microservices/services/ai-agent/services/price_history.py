@@ -0,0 +1,200 @@
+"""
+Price History Store
+Rolling per-route price quantiles for deal scoring
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Extended P-square markers tracking p25 and the median:
+# min, p12.5, p25, p37.5, p50, p75, max
+MARKER_P = np.array([0.0, 0.125, 0.25, 0.375, 0.5, 0.75, 1.0])
+MARKER_FRACTIONS = MARKER_P.tolist()
+N_MARKERS = len(MARKER_P)
+P25_MARKER = 2
+MEDIAN_MARKER = 4
+# Departure weeks kept behind the newest week observed; comfortably longer
+# than the booking horizon, so only weeks that have flown are dropped
+RETENTION_WEEKS = 26
+
+RouteKey = Tuple[str, str, str, int]
+
+
+def route_key(departure_airport, arrival_airport, cabin_class, departure_time) -> RouteKey:
+    """Build the (origin, destination, cabin, departure week) history key"""
+    if isinstance(departure_time, str):
+        departure_time = datetime.fromisoformat(departure_time)
+    year, week, _ = departure_time.isocalendar()
+    return (departure_airport, arrival_airport, cabin_class, year * 100 + week)
+
+
+class PriceHistoryStore:
+    """
+    Array-backed streaming quantile sketches, one slot per route key.
+    Every key holds a fixed 7-marker P-square sketch, so memory per route is
+    constant and p25/median lookups are O(1) regardless of observations.
+    The history is rolling: when a newer departure week is observed, keys
+    more than `retention_weeks` behind it are dropped and their slots reused.
+    """
+
+    def __init__(self, capacity=4096, retention_weeks=RETENTION_WEEKS):
+        self.retention_weeks = retention_weeks
+        self._slots: Dict[RouteKey, int] = {}
+        self._free: List[int] = []
+        self._next_slot = 0
+        self._newest_week: Optional[int] = None
+        self.evicted = 0
+        self._heights = np.zeros((capacity, N_MARKERS))
+        self._positions = np.zeros((capacity, N_MARKERS))
+        self._counts = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, key: RouteKey) -> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = self._next_slot
+                if slot == len(self._counts):
+                    self._grow()
+                self._next_slot += 1
+            self._slots[key] = slot
+        return slot
+
+    def _grow(self):
+        capacity = len(self._counts) * 2
+        self._heights = np.resize(self._heights, (capacity, N_MARKERS))
+        self._positions = np.resize(self._positions, (capacity, N_MARKERS))
+        self._counts = np.resize(self._counts, capacity)
+        self._counts[self._next_slot:] = 0
+
+    def observe(self, departure_airport, arrival_airport, cabin_class, departure_time, price):
+        """Add one observed price to its route sketch"""
+        key = route_key(departure_airport, arrival_airport, cabin_class, departure_time)
+        self._advance(key[3])
+        self._observe_slot(self._slot(key), float(price))
+
+    def observe_frame(self, flights: pd.DataFrame):
+        """Add every row of a `flights` DataFrame to the sketches"""
+        keys = self._frame_keys(flights)
+        if keys:
+            # Evict first, so expired slots are reused by this frame's new keys
+            self._advance(max(key[3] for key in keys))
+        for key, price in zip(keys, flights['price'].to_numpy(dtype=np.float64)):
+            self._observe_slot(self._slot(key), price)
+
+    def _advance(self, week: int):
+        """Track the newest departure week; evict expired weeks when it moves forward"""
+        if self._newest_week is not None and week <= self._newest_week:
+            return
+        self._newest_week = week
+        newest = date.fromisocalendar(week // 100, week % 100, 1)
+        year, number, _ = (newest - timedelta(weeks=self.retention_weeks)).isocalendar()
+        self.evict_before(year * 100 + number)
+
+    def evict_before(self, week: int) -> int:
+        """Drop every key whose departure week (year * 100 + ISO week) is before `week`"""
+        expired = [key for key in self._slots if key[3] < week]
+        for key in expired:
+            slot = self._slots.pop(key)
+            self._counts[slot] = 0
+            self._free.append(slot)
+        self.evicted += len(expired)
+        return len(expired)
+
+    def _observe_slot(self, slot, x):
+        n = int(self._counts[slot])
+
+        # Warm-up: keep the first observations sorted in the marker array
+        if n < N_MARKERS:
+            row = self._heights[slot]
+            row[n] = x
+            row[:n + 1].sort()
+            self._counts[slot] = n + 1
+            if n + 1 == N_MARKERS:
+                self._positions[slot] = np.arange(1, N_MARKERS + 1)
+            return
+
+        # Work on plain lists; per-element numpy indexing dominates otherwise
+        q = self._heights[slot].tolist()
+        pos = self._positions[slot].tolist()
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[-1]:
+            q[-1] = x
+            k = N_MARKERS - 2
+        else:
+            k = bisect_right(q, x) - 1
+        for i in range(k + 1, N_MARKERS):
+            pos[i] += 1
+        n += 1
+
+        for i in range(1, N_MARKERS - 1):
+            d = 1 + (n - 1) * MARKER_FRACTIONS[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                s = 1 if d > 0 else -1
+                candidate = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if q[i - 1] < candidate < q[i + 1]:
+                    q[i] = candidate
+                else:
+                    q[i] = q[i] + s * (q[i + s] - q[i]) / (pos[i + s] - pos[i])
+                pos[i] += s
+
+        self._heights[slot] = q
+        self._positions[slot] = pos
+        self._counts[slot] = n
+
+    def _quantile(self, slot, marker) -> float:
+        n = self._counts[slot]
+        if n < N_MARKERS:
+            return float(np.percentile(self._heights[slot, :n], MARKER_P[marker] * 100))
+        return float(self._heights[slot, marker])
+
+    def quantiles(self, departure_airport, arrival_airport, cabin_class, departure_time) -> Optional[dict]:
+        """Return count, p25 and median for a route key, or None if unseen"""
+        key = route_key(departure_airport, arrival_airport, cabin_class, departure_time)
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        return {
+            'count': int(self._counts[slot]),
+            'p25': self._quantile(slot, P25_MARKER),
+            'median': self._quantile(slot, MEDIAN_MARKER)
+        }
+
+    def price_position(self, departure_airport, arrival_airport, cabin_class, departure_time, price) -> Optional[dict]:
+        """How far below the route's p25 and median a price is, as fractions"""
+        stats = self.quantiles(departure_airport, arrival_airport, cabin_class, departure_time)
+        if stats is None:
+            return None
+        price = float(price)
+        stats['below_p25'] = (stats['p25'] - price) / stats['p25'] if stats['p25'] > 0 else 0.0
+        stats['below_median'] = (stats['median'] - price) / stats['median'] if stats['median'] > 0 else 0.0
+        return stats
+
+    def medians_for(self, flights: pd.DataFrame) -> np.ndarray:
+        """Route medians aligned with the rows of a `flights` DataFrame (NaN if unseen)"""
+        keys = pd.Series(self._frame_keys(flights))
+        codes, uniques = pd.factorize(keys)
+        lookup = np.full(len(uniques), np.nan)
+        for i, key in enumerate(uniques):
+            slot = self._slots.get(key)
+            if slot is not None:
+                lookup[i] = self._quantile(slot, MEDIAN_MARKER)
+        return lookup[codes]
+
+    def _frame_keys(self, flights: pd.DataFrame):
+        iso = pd.to_datetime(flights['departure_time']).dt.isocalendar()
+        weeks = (iso['year'] * 100 + iso['week']).to_numpy()
+        return list(zip(flights['departure_airport'], flights['arrival_airport'],
+                        flights['cabin_class'], weeks.tolist()))
@@ -0,0 +1,112 @@
+"""
+Subscription Index
+Maps deal filter keys to subscribed WebSocket clients
+"""
+
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+import itertools
+
+# Filters matched by exact value through the index
+INDEXED_FILTERS = ('listing_type', 'route', 'city')
+# Filters checked per candidate after the index lookup
+PRICE_FILTER = 'max_price'
+
+
+class Subscription:
+    __slots__ = ('id', 'client', 'keys', 'max_price')
+
+    def __init__(self, sub_id: int, client: Hashable, keys: List[Tuple[str, str]], max_price: Optional[float]):
+        self.id = sub_id
+        self.client = client
+        self.keys = keys
+        self.max_price = max_price
+
+
+def normalize_filters(filters: dict) -> Tuple[List[Tuple[str, str]], Optional[float]]:
+    """Validate client filters into indexed (key, value) pairs and a price ceiling"""
+    if not isinstance(filters, dict):
+        raise TypeError("filters must be an object")
+    unknown = set(filters) - set(INDEXED_FILTERS) - {PRICE_FILTER}
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+    keys = [(k, str(filters[k]).strip().lower()) for k in INDEXED_FILTERS if filters.get(k)]
+    max_price = filters.get(PRICE_FILTER)
+    return keys, float(max_price) if max_price is not None else None
+
+
+class SubscriptionIndex:
+    """
+    Inverted index from (filter key, value) to subscriptions.
+    A subscription matches when all of its indexed filters match and the
+    price is under its ceiling; publishing only visits subscriptions
+    reachable from the deal's own keys plus filter-less ones.
+    """
+
+    def __init__(self):
+        self._index: Dict[Tuple[str, str], Set[Subscription]] = defaultdict(set)
+        self._unindexed: Set[Subscription] = set()
+        self._by_client: Dict[Hashable, Dict[int, Subscription]] = defaultdict(dict)
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return sum(len(subs) for subs in self._by_client.values())
+
+    def subscribe(self, client: Hashable, filters: dict) -> int:
+        keys, max_price = normalize_filters(filters)
+        sub = Subscription(next(self._ids), client, keys, max_price)
+        if keys:
+            for key in keys:
+                self._index[key].add(sub)
+        else:
+            self._unindexed.add(sub)
+        self._by_client[client][sub.id] = sub
+        return sub.id
+
+    def unsubscribe(self, client: Hashable, sub_id: Optional[int] = None) -> int:
+        """Remove one subscription, or all of a client's when sub_id is None"""
+        if sub_id is not None and (not isinstance(sub_id, int) or isinstance(sub_id, bool)):
+            raise TypeError("id must be an integer")
+        subs = self._by_client.get(client)
+        if not subs:
+            return 0
+        targets = list(subs.values()) if sub_id is None else [subs[sub_id]] if sub_id in subs else []
+        for sub in targets:
+            del subs[sub.id]
+            if sub.keys:
+                for key in sub.keys:
+                    bucket = self._index[key]
+                    bucket.discard(sub)
+                    if not bucket:
+                        del self._index[key]
+            else:
+                self._unindexed.discard(sub)
+        if not subs:
+            del self._by_client[client]
+        return len(targets)
+
+    def subscriptions(self, client: Hashable) -> List[dict]:
+        return [
+            {'id': sub.id, 'filters': dict(sub.keys), PRICE_FILTER: sub.max_price}
+            for sub in self._by_client.get(client, {}).values()
+        ]
+
+    def match(self, deal: dict) -> Set[Hashable]:
+        """Clients with at least one subscription matching the deal"""
+        hits: Dict[Subscription, int] = defaultdict(int)
+        for key in INDEXED_FILTERS:
+            value = deal.get(key)
+            if value is None:
+                continue
+            for sub in self._index.get((key, str(value).lower()), ()):
+                hits[sub] += 1
+
+        price = deal.get('price')
+        clients = set()
+        for sub, count in itertools.chain(hits.items(), ((s, 0) for s in self._unindexed)):
+            if count != len(sub.keys) or sub.client in clients:
+                continue
+            if sub.max_price is not None and (price is None or price > sub.max_price):
+                continue
+            clients.add(sub.client)
+        return clients
@@ -0,0 +1,120 @@
+"""
+Tag Index Service
+Inverted index from deal tags to bitmaps of deal ids
+"""
+
+from typing import Dict, Iterable, List, Optional
+import base64
+import numpy as np
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+
+
+class TagIndex:
+    """
+    Each deal id owns a slot number; each tag owns a bitmap (a Python int)
+    with the slots of the deals carrying it. AND/OR queries are big-int
+    `&`/`|` over a few bitmaps, and only the matching slots are decoded
+    back to ids. Slots of removed deals are reused.
+    """
+
+    def __init__(self):
+        self._slot_of: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._tags_of: Dict[str, List[str]] = {}
+        self._bitmaps: Dict[str, int] = {}
+        self._occupied = 0
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def __contains__(self, deal_id: str):
+        return deal_id in self._slot_of
+
+    @property
+    def tags(self) -> List[str]:
+        return sorted(tag for tag, bitmap in self._bitmaps.items() if bitmap)
+
+    def add(self, deal_id: str, tags: Iterable[str]):
+        """Index `deal_id` under `tags`, replacing any tags it had before"""
+        self.remove(deal_id)
+        slot = self._free.pop() if self._free else len(self._ids)
+        if slot == len(self._ids):
+            self._ids.append(deal_id)
+        else:
+            self._ids[slot] = deal_id
+        self._slot_of[deal_id] = slot
+        tags = sorted(set(tags))
+        self._tags_of[deal_id] = tags
+        bit = 1 << slot
+        self._occupied |= bit
+        for tag in tags:
+            self._bitmaps[tag] = self._bitmaps.get(tag, 0) | bit
+
+    def remove(self, deal_id: str):
+        slot = self._slot_of.pop(deal_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        self._occupied &= mask
+        for tag in self._tags_of.pop(deal_id, ()):
+            self._bitmaps[tag] &= mask
+        self._ids[slot] = None
+        self._free.append(slot)
+
+    def bitmap(self, tags: Iterable[str], match: str = MATCH_ALL) -> int:
+        """Bitmap of deals carrying all (or any) of `tags`"""
+        tags = list(tags)
+        if not tags:
+            return self._occupied
+        bitmaps = [self._bitmaps.get(tag, 0) for tag in tags]
+        result = bitmaps[0]
+        for other in bitmaps[1:]:
+            result = result & other if match == MATCH_ALL else result | other
+        return result
+
+    def query(self, tags: Iterable[str], match: str = MATCH_ALL) -> List[str]:
+        """Ids of deals carrying all (or any) of `tags`"""
+        return self.ids(self.bitmap(tags, match))
+
+    def ids(self, bitmap: int) -> List[str]:
+        """Decode a bitmap into deal ids"""
+        if not bitmap:
+            return []
+        raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+        slots = np.flatnonzero(np.unpackbits(raw, bitorder='little'))
+        return [self._ids[s] for s in slots]
+
+    def to_dict(self) -> dict:
+        """JSON-safe snapshot; bitmaps are base64 little-endian bytes"""
+        return {
+            'ids': self._ids,
+            'tags': {tag: base64.b64encode(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')).decode()
+                     for tag, bitmap in self._bitmaps.items() if bitmap}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TagIndex':
+        index = cls()
+        index._ids = list(data.get('ids', []))
+        index._slot_of = {deal_id: slot for slot, deal_id in enumerate(index._ids) if deal_id is not None}
+        index._free = [slot for slot, deal_id in enumerate(index._ids) if deal_id is None]
+        for slot in index._slot_of.values():
+            index._occupied |= 1 << slot
+        index._bitmaps = {tag: int.from_bytes(base64.b64decode(value), 'little')
+                          for tag, value in data.get('tags', {}).items()}
+        for tag, bitmap in index._bitmaps.items():
+            for deal_id in index.ids(bitmap):
+                index._tags_of.setdefault(deal_id, []).append(tag)
+        for deal_id in index._slot_of:
+            index._tags_of.setdefault(deal_id, [])
+        return index
+
+    def stats(self) -> dict:
+        return {
+            'deals': len(self),
+            'tags': len(self.tags),
+            'slots': len(self._ids)
+        }
@@ -0,0 +1,189 @@
+"""
+Trip Data Service
+Concurrent, pooled lookups of trip candidates from MySQL listings and MongoDB reviews
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import os
+import time
+import pandas as pd
+
+DEFAULT_TIMEOUTS = {'flights': 1.0, 'hotels': 1.0, 'cars': 1.0, 'reviews': 0.5}
+REVIEWS_PER_LISTING = 3
+
+FLIGHT_COLUMNS = ('id, flight_code, airline, departure_airport, arrival_airport, departure_time, '
+                  'arrival_time, duration, stops, price, seats_left, cabin_class, rating')
+HOTEL_COLUMNS = 'id, listing_id, name, city, state, star_rating, rating, price_per_night, room_type'
+CAR_COLUMNS = 'id, company_name, brand, model, type, seats, daily_rental_price, location, rating'
+
+
+def _listings_url_from_env() -> Optional[str]:
+    url = os.getenv('LISTINGS_DB_URL')
+    if url or not os.getenv('DB_HOST'):
+        return url
+    return 'mysql+aiomysql://{user}:{password}@{host}:{port}/{name}'.format(
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', ''),
+        host=os.getenv('DB_HOST'),
+        port=os.getenv('DB_PORT', '3306'),
+        name=os.getenv('DB_NAME', 'kayak_listings')
+    )
+
+
+class TripDataService:
+    """
+    Async data-access layer for trip planning.
+    MySQL is reached through one pooled SQLAlchemy async engine and MongoDB
+    through one pooled motor client, both created at startup. Candidate
+    lookups run concurrently, each under its own timeout; a source that
+    fails or times out is reported in `errors` and the rest still return.
+    """
+
+    def __init__(self, listings_url: Optional[str] = None, mongo_uri: Optional[str] = None,
+                 mongo_db='kayak', timeouts: Optional[Dict[str, float]] = None, pool_size=10):
+        self.listings_url = listings_url
+        self.mongo_uri = mongo_uri
+        self.mongo_db = mongo_db
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.pool_size = pool_size
+        self.engine = None
+        self.mongo = None
+
+    @classmethod
+    def from_env(cls) -> 'TripDataService':
+        timeouts = {source: float(os.getenv(f'TRIP_DATA_TIMEOUT_{source.upper()}', default))
+                    for source, default in DEFAULT_TIMEOUTS.items()}
+        return cls(
+            listings_url=_listings_url_from_env(),
+            mongo_uri=os.getenv('MONGO_URI') or None,
+            mongo_db=os.getenv('MONGO_DB', 'kayak'),
+            timeouts=timeouts,
+            pool_size=int(os.getenv('TRIP_DATA_POOL_SIZE', '10'))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.listings_url or self.mongo_uri)
+
+    async def connect(self):
+        """Create the connection pools (drivers are only imported when configured)"""
+        if self.listings_url and self.engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            options = {} if self.listings_url.startswith('sqlite') else {
+                'pool_size': self.pool_size, 'max_overflow': self.pool_size, 'pool_recycle': 1800}
+            self.engine = create_async_engine(self.listings_url, pool_pre_ping=True, **options)
+            print("Trip data: MySQL pool ready")
+        if self.mongo_uri and self.mongo is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self.mongo = AsyncIOMotorClient(self.mongo_uri, maxPoolSize=self.pool_size)
+            print("Trip data: MongoDB pool ready")
+
+    async def close(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+        if self.mongo is not None:
+            self.mongo.close()
+            self.mongo = None
+
+    async def _query(self, sql: str, params: dict, expanding: Iterable[str] = ()) -> pd.DataFrame:
+        from sqlalchemy import bindparam, text
+        statement = text(sql)
+        for name in expanding:
+            statement = statement.bindparams(bindparam(name, expanding=True))
+        async with self.engine.connect() as conn:
+            result = await conn.execute(statement, params)
+            return pd.DataFrame(result.mappings().all(), columns=list(result.keys()))
+
+    async def fetch_flights(self, origins: List[str], destinations: List[str],
+                            start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Flights that can make up an origin -> destination trip (and the way
+        back): every departure from either end plus every arrival at either
+        end inside the travel days, enough for one-stop connections.
+        """
+        airports = sorted(set(origins) | set(destinations))
+        windows = [(start, start + timedelta(days=1))]
+        if end is not None:
+            windows.append((end, end + timedelta(days=1)))
+        clauses, params = [], {'airports': airports}
+        for i, (lo, hi) in enumerate(windows):
+            clauses.append(f"(departure_time >= :lo{i} AND departure_time < :hi{i})")
+            params[f'lo{i}'] = datetime.combine(lo.date(), datetime.min.time())
+            params[f'hi{i}'] = datetime.combine(hi.date(), datetime.min.time())
+        sql = (f"SELECT {FLIGHT_COLUMNS} FROM flights "
+               f"WHERE (departure_airport IN :airports OR arrival_airport IN :airports) "
+               f"AND ({' OR '.join(clauses)})")
+        return await self._query(sql, params, expanding=['airports'])
+
+    async def fetch_hotels(self, city: str) -> pd.DataFrame:
+        sql = (f"SELECT {HOTEL_COLUMNS} FROM hotels WHERE city = :city "
+               f"AND (approval_status IS NULL OR approval_status = 'approved')")
+        return await self._query(sql, {'city': city})
+
+    async def fetch_cars(self, places: List[str]) -> pd.DataFrame:
+        sql = (f"SELECT {CAR_COLUMNS} FROM cars WHERE location IN :places "
+               f"AND (availability_status IS NULL OR availability_status)")
+        return await self._query(sql, {'places': list(places)}, expanding=['places'])
+
+    async def fetch_reviews(self, listing_ids: List[int], per_listing=REVIEWS_PER_LISTING) -> Dict[int, dict]:
+        """Review count and most recent reviews per hotel listing_id"""
+        if not listing_ids:
+            return {}
+        pipeline = [
+            {'$match': {'listing_id': {'$in': [int(i) for i in listing_ids]}}},
+            {'$sort': {'date': -1}},
+            {'$group': {
+                '_id': '$listing_id',
+                'count': {'$sum': 1},
+                'recent': {'$push': {'reviewer_name': '$reviewer_name', 'date': '$date', 'comments': '$comments'}}
+            }},
+            {'$project': {'count': 1, 'recent': {'$slice': ['$recent', per_listing]}}}
+        ]
+        cursor = self.mongo[self.mongo_db]['reviews'].aggregate(pipeline)
+        return {doc['_id']: {'count': doc['count'], 'recent': doc['recent']} async for doc in cursor}
+
+    async def _timed(self, source: str, coro, report: dict):
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(coro, self.timeouts.get(source))
+        except asyncio.TimeoutError:
+            report['errors'][source] = 'timeout'
+        except Exception as e:
+            report['errors'][source] = str(e) or type(e).__name__
+            print(f"Trip data: {source} lookup failed: {e}")
+        finally:
+            report['timings_ms'][source] = round((time.perf_counter() - started) * 1000, 2)
+        return None
+
+    async def fetch_trip_candidates(self, origins: List[str], destinations: List[str], city: Optional[str],
+                                    start: datetime, end: Optional[datetime] = None) -> dict:
+        """
+        Flights, hotels, cars and hotel reviews for one trip, fetched
+        concurrently. Reviews need the hotel ids, so they chain onto the
+        hotel lookup while flights and cars are still in flight; overall
+        latency is the slowest branch, not the sum. Missing sources are None.
+        """
+        report = {'flights': None, 'hotels': None, 'cars': None, 'reviews': None,
+                  'errors': {}, 'timings_ms': {}}
+        if self.engine is None:
+            return report
+
+        async def hotels_with_reviews():
+            hotels = await self._timed('hotels', self.fetch_hotels(city), report) if city else None
+            reviews = None
+            if self.mongo is not None and hotels is not None and 'listing_id' in hotels:
+                ids = hotels['listing_id'].dropna().astype(int).tolist()
+                reviews = await self._timed('reviews', self.fetch_reviews(ids), report)
+            return hotels, reviews
+
+        places = list(destinations) + ([city] if city else [])
+        flights, (hotels, reviews), cars = await asyncio.gather(
+            self._timed('flights', self.fetch_flights(origins, destinations, start, end), report),
+            hotels_with_reviews(),
+            self._timed('cars', self.fetch_cars(places), report)
+        )
+        report.update(flights=flights, hotels=hotels, cars=cars, reviews=reviews)
+        return report
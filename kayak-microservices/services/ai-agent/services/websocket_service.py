@@ -3,27 +3,183 @@ WebSocket Service for Real-time Communication
 """
 
 from fastapi import WebSocket
-from typing import List
+from typing import Dict, Iterable, List, Optional, Set
+from models.schemas import Deal
+from services.subscriptions import SubscriptionIndex
+import asyncio
+import json
+import os
+
+# What to do when a client's outbound queue is full
+DROP_OLDEST = 'drop_oldest'
+DISCONNECT = 'disconnect'
+
+DEFAULT_QUEUE_SIZE = 100
+
+
+class ClientChannel:
+    """Bounded outbound queue plus a writer task for one connection"""
+
+    def __init__(self, websocket: WebSocket, service: 'WebSocketService', queue_size: int):
+        self.websocket = websocket
+        self.service = service
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.task = asyncio.create_task(self._writer())
+
+    def offer(self, payload: str) -> bool:
+        """Queue a pre-serialized payload without waiting; False if the client is too slow"""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            pass
+        if self.service.slow_client_policy == DISCONNECT:
+            return False
+        self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+        self.dropped += 1
+        self.service.messages_dropped += 1
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                payload = await self.queue.get()
+                await self.websocket.send_text(payload)
+                self.service.messages_sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Dead socket: drop it without affecting anyone else
+            self.service.disconnect(self.websocket)
+
+    def close(self):
+        self.task.cancel()
+
 
 class WebSocketService:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
+    def __init__(self, queue_size: Optional[int] = None, slow_client_policy: Optional[str] = None):
+        self.queue_size = queue_size or int(os.getenv('WS_CLIENT_QUEUE_SIZE', DEFAULT_QUEUE_SIZE))
+        self.slow_client_policy = slow_client_policy or os.getenv('WS_SLOW_CLIENT_POLICY', DROP_OLDEST)
+        self.active_connections: Set[WebSocket] = set()
+        self._channels: Dict[WebSocket, ClientChannel] = {}
+        self.subscriptions = SubscriptionIndex()
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.slow_disconnects = 0
+
     async def connect(self, websocket: WebSocket):
         """Accept WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-    
+        self.register(websocket)
+
+    def register(self, websocket: WebSocket):
+        """Track an already-accepted connection"""
+        self.active_connections.add(websocket)
+        self._channels[websocket] = ClientChannel(websocket, self, self.queue_size)
+
     def disconnect(self, websocket: WebSocket):
         """Remove WebSocket connection"""
-        self.active_connections.remove(websocket)
-    
+        self.active_connections.discard(websocket)
+        self.subscriptions.unsubscribe(websocket)
+        channel = self._channels.pop(websocket, None)
+        if channel is not None:
+            channel.close()
+
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients"""
-        for connection in self.active_connections:
-            await connection.send_json(message)
-    
+        self.publish_to(list(self.active_connections), message)
+
+    def publish_to(self, connections: Iterable[WebSocket], message: dict) -> int:
+        """
+        Serialize once and queue the payload on every target's channel.
+        Writers drain their queues concurrently, so one slow client never
+        delays the others. Returns the number of clients the payload reached.
+        """
+        payload = json.dumps(message, default=str)
+        delivered = 0
+        slow = []
+        for websocket in connections:
+            channel = self._channels.get(websocket)
+            if channel is None:
+                continue
+            if channel.offer(payload):
+                delivered += 1
+            else:
+                slow.append(websocket)
+        for websocket in slow:
+            self.slow_disconnects += 1
+            self.disconnect(websocket)
+            asyncio.create_task(self._close_quietly(websocket))
+        return delivered
+
+    def publish_deals(self, deals: List[Deal]) -> int:
+        """Push each deal only to clients whose subscriptions match it"""
+        delivered = 0
+        for deal in deals:
+            message = deal.model_dump(mode='json')
+            targets = self.subscriptions.match(message)
+            if targets:
+                delivered += self.publish_to(targets, {'type': 'deal', 'deal': message})
+        return delivered
+
+    async def handle_message(self, websocket: WebSocket, text: str):
+        """
+        Client protocol:
+          {"action": "subscribe", "filters": {"route": "LAX-SFO", "max_price": 300}}
+          {"action": "unsubscribe", "id": 3}   (omit id to drop all)
+          {"action": "subscriptions"}
+        Anything else is echoed back.
+        """
+        try:
+            request = json.loads(text)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict) or 'action' not in request:
+            await self.send_to_client(websocket, {"message": text})
+            return
+
+        action = request['action']
+        if action == 'subscribe':
+            filters = request.get('filters')
+            try:
+                sub_id = self.subscriptions.subscribe(websocket, {} if filters is None else filters)
+            except (TypeError, ValueError) as e:
+                await self.send_to_client(websocket, {"type": "error", "error": str(e)})
+                return
+            await self.send_to_client(websocket, {"type": "subscribed", "id": sub_id})
+        elif action == 'unsubscribe':
+            try:
+                removed = self.subscriptions.unsubscribe(websocket, request.get('id'))
+            except TypeError as e:
+                await self.send_to_client(websocket, {"type": "error", "error": str(e)})
+                return
+            await self.send_to_client(websocket, {"type": "unsubscribed", "removed": removed})
+        elif action == 'subscriptions':
+            await self.send_to_client(websocket, {
+                "type": "subscriptions",
+                "subscriptions": self.subscriptions.subscriptions(websocket)
+            })
+        else:
+            await self.send_to_client(websocket, {"type": "error", "error": f"Unknown action: {action}"})
+
+    async def _close_quietly(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=1008)
+        except Exception:
+            pass
+
     async def send_to_client(self, websocket: WebSocket, message: dict):
         """Send message to specific client"""
-        await websocket.send_json(message)
+        self.publish_to((websocket,), message)
 
+    def stats(self) -> dict:
+        return {
+            'connections': len(self.active_connections),
+            'subscriptions': len(self.subscriptions),
+            'messages_sent': self.messages_sent,
+            'messages_dropped': self.messages_dropped,
+            'slow_disconnects': self.slow_disconnects,
+            'slow_client_policy': self.slow_client_policy
+        }
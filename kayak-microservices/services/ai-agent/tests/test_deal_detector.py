@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from agents.deal_detector import DealDetector
+
+EDGE_ROWS = [
+    {'price': 70, 'base_price': 100, 'discount_percent': 0, 'seats_left': 0, 'rating': 5},
+    {'price': 70, 'base_price': 100, 'discount_percent': 0, 'seats_left': 12, 'rating': None},
+    {'price': 70, 'base_price': 100, 'discount_percent': 0, 'seats_left': None, 'rating': float('nan')},
+    {'price': 140, 'base_price': 100, 'discount_percent': 0, 'seats_left': 50, 'rating': 4.2},
+    {'price': 90, 'base_price': 0, 'discount_percent': 20, 'seats_left': 200, 'rating': 3.0},
+    {'price': 95, 'base_price': 100, 'discount_percent': None, 'seats_left': 250, 'rating': 4.9},
+]
+
+
+def test_scalar_and_batch_scores_match_on_edge_rows():
+    detector = DealDetector()
+    scalar = [detector.calculate_deal_score(row) for row in EDGE_ROWS]
+    columns = {k: [np.nan if row[k] is None else row[k] for row in EDGE_ROWS] for k in EDGE_ROWS[0]}
+    batch = detector.score_batch(columns['price'], columns['base_price'], columns['discount_percent'],
+                                 columns['seats_left'], columns['rating'])
+    np.testing.assert_allclose(scalar, batch)
+
+
+def test_zero_seats_is_fully_scarce():
+    assert DealDetector().calculate_deal_score(EDGE_ROWS[0]) == pytest.approx(1.0)
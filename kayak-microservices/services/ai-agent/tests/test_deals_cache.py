@@ -0,0 +1,87 @@
+import asyncio
+
+from models.schemas import Deal
+from services.deals_cache import DealsCache
+
+
+def deal(deal_id, score, listing_type='flight', tags=()):
+    return Deal(id=deal_id, title=deal_id, description=deal_id, price=100.0,
+                listing_type=listing_type, tags=list(tags), score=score)
+
+
+class GatedDetector:
+    """run_mock_detection returns `deals` once `release` is set"""
+
+    def __init__(self, deals):
+        self.deals = deals
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def run_mock_detection(self):
+        self.started.set()
+        await self.release.wait()
+        return list(self.deals)
+
+
+def test_update_during_refresh_survives_the_refresh():
+    async def scenario():
+        detector = GatedDetector([deal('a', 0.5), deal('b', 0.4), deal('c', 0.3)])
+        cache = DealsCache(detector, refresh_interval=60)
+        notified = []
+        cache.listeners.append(notified.append)
+
+        refresh = asyncio.create_task(cache.refresh())
+        await detector.started.wait()
+        # Lands after detection started, so it is newer than the refresh result
+        cache.apply_updates([deal('b', 0.9, tags=['hot'])], ['c'])
+        assert cache.lookup(['b']) == [None]
+        detector.release.set()
+        await refresh
+        return cache, notified
+
+    cache, notified = asyncio.run(scenario())
+    assert [d.id for d in cache.get(10)] == ['b', 'a']
+    assert cache.lookup(['b'])[0].score == 0.9
+    assert cache.lookup(['c']) == [None]
+    assert [d.id for d in cache.get(10, tags=['hot'])] == ['b']
+    # Listeners see the replayed update after the refresh batch
+    assert [d.id for d in notified[-1]] == ['b']
+
+
+def test_update_during_failed_refresh_is_still_applied():
+    class FailingDetector(GatedDetector):
+        async def run_mock_detection(self):
+            await super().run_mock_detection()
+            raise RuntimeError('detection failed')
+
+    async def scenario():
+        cache = DealsCache(GatedDetector([deal('a', 0.5)]), refresh_interval=60)
+        await cache.refresh()
+        cache.detector = detector = FailingDetector([])
+        refresh = asyncio.create_task(cache.refresh())
+        await detector.started.wait()
+        cache.apply_updates([deal('z', 0.7)])
+        detector.release.set()
+        try:
+            await refresh
+        except RuntimeError:
+            pass
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert [d.id for d in cache.get(10)] == ['z', 'a']
+
+
+def test_apply_updates_outside_refresh_patches_in_place():
+    async def scenario():
+        detector = GatedDetector([deal('a', 0.5), deal('h', 0.6, listing_type='hotel')])
+        detector.release.set()
+        cache = DealsCache(detector, refresh_interval=60)
+        await cache.refresh()
+        cache.apply_updates([deal('a', 0.1)])
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert [d.id for d in cache.get(10)] == ['h', 'a']
+    assert [d.id for d in cache.get(10, listing_type='flight')] == ['a']
+    assert cache.incremental_updates == 1
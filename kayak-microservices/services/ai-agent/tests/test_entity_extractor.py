@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from agents.entity_extractor import EntityExtractor
+
+TODAY = date(2026, 10, 17)
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return EntityExtractor.from_csv()
+
+
+def test_airports_dictionary_ships_with_service(extractor):
+    assert 'LAX' in extractor.airports
+
+
+@pytest.mark.parametrize('query, amount', [
+    ('hotel in Paris under $99.99', 99.99),
+    ('trip to Denver for $1.5k', 1500.0),
+    ('budget 1,200.50 dollars', 1200.5),
+    ('max $300', 300.0),
+])
+def test_budget_keeps_decimals(extractor, query, amount):
+    assert extractor.extract(query, TODAY)['budget']['amount'] == amount
+
+
+def test_date_tokens_are_not_locations(extractor):
+    entities = extractor.extract('flights from SFO Dec 20 to Dec 27', TODAY)
+    assert entities['origin']['iata'] == 'SFO'
+    assert 'destination' not in entities
+    assert [loc['iata'] for loc in entities['locations']] == ['SFO']
+    assert entities['dates'] == ['2026-12-20', '2026-12-27']
@@ -0,0 +1,184 @@
+import asyncio
+import csv
+import io
+import json
+
+import httpx
+import pytest
+
+from agents.feed_ingestion import FeedIngestionAgent
+
+
+def record(i, price=None):
+    return {'id': f'f{i}', 'departure_airport': 'SFO', 'arrival_airport': 'JFK',
+            'price': 200 + i if price is None else price, 'base_price': 400,
+            'departure_time': '2026-12-20T08:00:00', 'cabin_class': 'economy', 'seats_left': 5, 'rating': 4.5}
+
+
+def encode(records, fmt):
+    if fmt == 'json':
+        return json.dumps(records).encode()
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(r) + '\n' for r in records).encode()
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(records[0]) + ['notes'])
+    writer.writeheader()
+    for r in records:
+        # A quoted field spanning lines must not split the row
+        writer.writerow(dict(r, notes='window seat,\n"quiet" row'))
+    return out.getvalue().encode()
+
+
+async def chunked(body: bytes, size=7, pulled=None, gate=None):
+    """Body in small chunks; counts chunks read and can pause at `gate`"""
+    for start in range(0, len(body), size):
+        if gate is not None and start >= len(body) // 2:
+            await gate.wait()
+        if pulled is not None:
+            pulled.append(start)
+        yield body[start:start + size]
+
+
+def agent(handler, sources, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return FeedIngestionAgent(sources=sources, client=client, **kwargs)
+
+
+class Sink:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, changed, removed):
+        self.batches.append(([d['id'] for d in changed], removed))
+
+    @property
+    def ids(self):
+        return sorted(i for changed, _ in self.batches for i in changed)
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson', 'csv'])
+def test_streamed_formats_parse_across_chunk_boundaries(fmt):
+    records = [record(i) for i in range(12)]
+
+    async def handler(request):
+        return httpx.Response(200, content=chunked(encode(records, fmt)))
+
+    sink = Sink()
+    feeds = agent(handler, [{'name': 'p', 'url': f'http://partner/feed.{fmt}', 'format': fmt}], batch_size=5)
+    stats = asyncio.run(feeds.ingest_feeds(sink))['p']
+
+    assert stats['error'] is None
+    assert stats['records'] == 12 and stats['inserted'] == 12
+    assert sink.ids == sorted(r['id'] for r in records)
+    assert [len(changed) for changed, _ in sink.batches] == [5, 5, 2]
+
+
+def test_records_reach_the_sink_before_the_body_ends():
+    gate = asyncio.Event()
+    body = encode([record(i) for i in range(20)], 'ndjson')
+
+    async def handler(request):
+        return httpx.Response(200, content=chunked(body, size=64, gate=gate))
+
+    async def sink(changed, removed):
+        # Only a streaming parser can deliver while the second half is held back
+        gate.set()
+
+    feeds = agent(handler, [{'name': 'p', 'url': 'http://partner/feed', 'format': 'ndjson'}], batch_size=2)
+    stats = asyncio.run(asyncio.wait_for(feeds.ingest_feeds(sink), 5))['p']
+    assert stats['records'] == 20
+
+
+def test_full_queue_stops_reading_the_feed():
+    pulled = []
+    body = encode([record(i) for i in range(200)], 'ndjson')
+    total_chunks = -(-len(body) // 64)
+    release = asyncio.Event()
+    received = []
+
+    async def handler(request):
+        return httpx.Response(200, content=chunked(body, size=64, pulled=pulled))
+
+    async def slow_sink(changed, removed):
+        received.append(len(changed))
+        await release.wait()
+
+    async def run():
+        feeds = agent(handler, [{'name': 'p', 'url': 'http://partner/feed', 'format': 'ndjson'}],
+                      batch_size=5, queue_size=1)
+        task = asyncio.create_task(feeds.ingest_feeds(slow_sink))
+        await asyncio.sleep(0.3)
+        # Sink holds one batch, the queue one more, the producer blocks on a third
+        stalled_at = len(pulled)
+        assert received == [5]
+        assert stalled_at < total_chunks // 4
+        await asyncio.sleep(0.2)
+        assert len(pulled) == stalled_at
+        release.set()
+        return await task
+
+    stats = asyncio.run(run())['p']
+    assert stats['records'] == 200
+    assert len(pulled) == total_chunks
+    assert sum(received) == 200
+
+
+def test_failing_source_does_not_block_the_others():
+    async def handler(request):
+        if request.url.path == '/down':
+            return httpx.Response(503)
+        if request.url.path == '/truncated':
+            return httpx.Response(200, content=chunked(b'[' + json.dumps(record(99)).encode() + b', {"id": "f'))
+        if request.url.path == '/slow':
+            await asyncio.sleep(0.2)
+        return httpx.Response(200, content=chunked(encode([record(i) for i in range(3)], 'json')))
+
+    sink = Sink()
+    feeds = agent(handler, [
+        {'name': 'down', 'url': 'http://partner/down'},
+        {'name': 'truncated', 'url': 'http://partner/truncated'},
+        {'name': 'slow', 'url': 'http://partner/slow'},
+        {'name': 'ok', 'url': 'http://partner/ok'},
+    ])
+    stats = asyncio.run(feeds.ingest_feeds(sink))
+
+    assert '503' in stats['down']['error']
+    assert stats['truncated']['error'] == 'truncated JSON feed'
+    assert stats['slow']['error'] is None and stats['slow']['records'] == 3
+    assert stats['ok']['error'] is None and stats['ok']['records'] == 3
+    # Nothing from the failed pulls was committed; they are retried in full next poll
+    assert sink.ids == ['f0', 'f0', 'f1', 'f1', 'f2', 'f2']
+    assert 'f99' not in feeds.state['truncated'].records
+
+
+def test_conditional_polls_and_record_level_deltas():
+    versions = {'current': [record(i) for i in range(4)], 'etag': '"v1"'}
+    seen_headers = []
+
+    async def handler(request):
+        seen_headers.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == versions['etag']:
+            return httpx.Response(304)
+        return httpx.Response(200, content=chunked(encode(versions['current'], 'json')),
+                              headers={'ETag': versions['etag'], 'Last-Modified': 'Sat, 17 Oct 2026 06:00:00 GMT'})
+
+    async def run():
+        feeds = agent(handler, [{'name': 'p', 'url': 'http://partner/feed'}])
+        sink = Sink()
+        first = dict((await feeds.ingest_feeds(sink))['p'])
+        assert sink.ids == ['f0', 'f1', 'f2', 'f3']
+
+        sink.batches.clear()
+        second = dict((await feeds.ingest_feeds(sink))['p'])
+        assert second['not_modified'] and sink.batches == []
+
+        versions['current'] = [record(0), record(1, price=150), record(2), record(4)]
+        versions['etag'] = '"v2"'
+        third = dict((await feeds.ingest_feeds(sink))['p'])
+        return first, third, sink.batches
+
+    first, third, batches = asyncio.run(run())
+    assert seen_headers == [None, '"v1"', '"v1"']
+    assert first['inserted'] == 4
+    assert (third['inserted'], third['updated'], third['removed']) == (1, 1, 1)
+    assert batches == [(['f1', 'f4'], ['f3'])]
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from agents.intent_parser import IntentParser
+from models.schemas import UserQuery
+from services.parse_cache import ParseCache
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return IntentParser(cache=ParseCache())
+
+
+def parse(parser, text):
+    return asyncio.run(parser.parse(UserQuery(query=text)))
+
+
+def test_uppercase_iata_codes_are_extracted(parser):
+    assert parse(parser, 'show me LAX deals')['entities']['destination']['iata'] == 'LAX'
+    entities = parse(parser, 'SFO to JFK flights')['entities']
+    assert [loc['iata'] for loc in entities['locations']] == ['SFO', 'JFK']
+    assert entities['destination']['iata'] == 'JFK'
+
+
+def test_case_variants_do_not_share_a_cached_parse(parser):
+    assert 'locations' not in parse(parser, 'show me lax deals today')['entities']
+    assert parse(parser, 'show me LAX deals today')['entities']['destination']['iata'] == 'LAX'
+
+
+def test_punctuation_variants_hit_the_cache(parser):
+    parse(parser, 'Find hotels in Paris!')
+    hits = parser.cache.local.hits
+    result = parse(parser, '  Find   hotels in Paris...')
+    assert parser.cache.local.hits == hits + 1
+    assert result['entities']['destination']['city'] == 'Paris'
+
+
+def test_add_phrases_invalidates_cached_parses():
+    parser = IntentParser(cache=ParseCache())
+    assert parse(parser, 'grab a flight')['intent'] == 'unknown'
+    parser.add_phrases('book', ['grab'])
+    assert parse(parser, 'grab a flight')['intent'] == 'book'
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from agents.offer_tagger import OfferTaggerAgent
+
+
+@pytest.fixture(scope='module')
+def tagger():
+    return OfferTaggerAgent()
+
+
+@pytest.mark.parametrize('offer, tags', [
+    ({'price': 500, 'rating': 4.9}, ['luxury', 'top-rated']),
+    ({'name': 'The'}, []),
+    ({'name': 'The', 'price': 50}, ['budget']),
+])
+def test_offers_without_vocabulary_still_get_rule_tags(tagger, offer, tags):
+    assert tagger.tag_offer(offer) == tags
+
+
+def test_batch_without_vocabulary_has_empty_keywords(tagger):
+    assert tagger.tag_batch([{'name': 'The', 'price': 50}, {'price': 500}]) == [
+        {'tags': ['budget'], 'keywords': []},
+        {'tags': ['luxury'], 'keywords': []},
+    ]
+    assert tagger.extract_keywords({'name': 'a the'}) == []
+
+
+def test_keywords_come_from_offer_text(tagger):
+    [result] = tagger.tag_batch([{'name': 'Cozy loft with desk', 'price': 120}])
+    assert result['tags'] == ['business']
+    assert {'cozy', 'loft', 'desk'} <= set(result['keywords'])
+
+
+def flight(cabin, price, rating=4.2, route=('SFO', 'JFK')):
+    return {'airline': 'Delta', 'cabin_class': cabin, 'price': price, 'rating': rating,
+            'departure_airport': route[0], 'arrival_airport': route[1]}
+
+
+def test_flights_use_cabin_and_fare_rules(tagger):
+    flights = pd.DataFrame([
+        flight('premium economy', 187),
+        flight('business', 900),
+        flight('first', 2400, rating=4.9),
+        flight('economy', 120),
+        flight('economy', 420),
+    ])
+    assert tagger.tag_flights(flights) == [[], ['luxury'], ['luxury', 'top-rated'], ['budget'], []]
+
+
+def test_flight_budget_is_relative_on_busy_routes(tagger):
+    fares = [300 + 10 * i for i in range(40)]
+    tags = tagger.tag_flights(pd.DataFrame([flight('economy', fare) for fare in fares]))
+    budget = [fare for fare, t in zip(fares, tags) if 'budget' in t]
+    assert budget == fares[:10]
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from services import parse_cache
+from services.parse_cache import ParseCache, serve
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTHKEY = 'test-secret'
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    directory = tmp_path / 'run'
+    directory.mkdir(mode=0o700)
+    return str(directory / 'parse-cache.sock')
+
+
+def start_server(address, authkey=AUTHKEY):
+    env = dict(os.environ, PARSE_CACHE_SOCKET=address, PARSE_CACHE_AUTHKEY=authkey)
+    process = subprocess.Popen([sys.executable, '-m', 'services.parse_cache'], cwd=AGENT_DIR, env=env,
+                               stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(address):
+        assert process.poll() is None and time.monotonic() < deadline, 'parse cache server did not start'
+        time.sleep(0.05)
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait(timeout=10)
+
+
+def test_serve_requires_an_authkey(socket_path):
+    with pytest.raises(ValueError):
+        serve(socket_path, b'')
+
+
+def test_serve_refuses_a_shared_directory(tmp_path):
+    directory = tmp_path / 'open'
+    directory.mkdir()
+    directory.chmod(0o777)
+    with pytest.raises(PermissionError):
+        serve(str(directory / 'parse-cache.sock'), b'key')
+
+
+def test_serve_leaves_existing_paths_alone(socket_path):
+    with open(socket_path, 'w') as f:
+        f.write('not ours')
+    with pytest.raises(FileExistsError):
+        serve(socket_path, b'key')
+    assert open(socket_path).read() == 'not ours'
+
+
+def test_client_without_authkey_stays_local(socket_path):
+    cache = ParseCache(shared_address=socket_path)
+    assert cache.shared_address is None
+    assert cache.stats()['shared'] is False
+
+
+def test_wrong_authkey_is_rejected(socket_path):
+    server = start_server(socket_path)
+    try:
+        cache = ParseCache(shared_address=socket_path, authkey=b'wrong')
+        assert cache.stats()['shared'] is False
+        assert cache.shared_errors == 1
+    finally:
+        stop_server(server)
+
+
+def test_shared_tier_reconnects_after_restart(socket_path, monkeypatch):
+    monkeypatch.setattr(parse_cache, 'RECONNECT_DELAY', 0.0)
+    server = start_server(socket_path)
+    try:
+        writer = ParseCache(shared_address=socket_path, authkey=AUTHKEY.encode())
+        reader = ParseCache(shared_address=socket_path, authkey=AUTHKEY.encode())
+        asyncio.run(writer.aset('q', {'intent': 'book'}))
+        assert asyncio.run(reader.aget('q')) == {'intent': 'book'}
+        assert reader.shared_hits == 1
+
+        stop_server(server)
+        assert not os.path.exists(socket_path)
+        assert reader.get('missing') is None
+        assert reader.stats()['shared'] is False
+
+        server = start_server(socket_path)
+        writer = ParseCache(shared_address=socket_path, authkey=AUTHKEY.encode())
+        writer.set('after', 1)
+        assert reader.get('after') == 1
+        assert reader.stats()['shared'] is True
+    finally:
+        stop_server(server)
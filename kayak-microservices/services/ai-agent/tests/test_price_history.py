@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.price_history import PriceHistoryStore
+
+MONDAY = datetime(2026, 1, 5, 9, 0)
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_p_square_tracks_numpy_percentiles(seed):
+    prices = np.random.default_rng(seed).lognormal(mean=5.5, sigma=0.4, size=5000)
+    store = PriceHistoryStore()
+    for price in prices:
+        store.observe('SFO', 'JFK', 'economy', MONDAY, price)
+
+    stats = store.quantiles('SFO', 'JFK', 'economy', MONDAY)
+    assert stats['count'] == len(prices)
+    assert stats['median'] == pytest.approx(np.percentile(prices, 50), rel=0.02)
+    assert stats['p25'] == pytest.approx(np.percentile(prices, 25), rel=0.02)
+
+
+def test_warm_up_uses_exact_percentiles():
+    store = PriceHistoryStore()
+    for price in (300, 100, 200):
+        store.observe('SFO', 'JFK', 'economy', MONDAY, price)
+    stats = store.quantiles('SFO', 'JFK', 'economy', MONDAY)
+    assert stats['median'] == np.percentile([100, 200, 300], 50)
+    assert stats['p25'] == np.percentile([100, 200, 300], 25)
+
+
+def test_frame_and_row_observations_agree():
+    rng = np.random.default_rng(7)
+    flights = pd.DataFrame({
+        'departure_airport': 'SFO', 'arrival_airport': 'JFK', 'cabin_class': 'economy',
+        'departure_time': [MONDAY + timedelta(hours=int(h)) for h in rng.integers(0, 100, 500)],
+        'price': rng.uniform(100, 400, 500),
+    })
+    by_frame, by_row = PriceHistoryStore(), PriceHistoryStore()
+    by_frame.observe_frame(flights)
+    for row in flights.itertuples():
+        by_row.observe(row.departure_airport, row.arrival_airport, row.cabin_class, row.departure_time, row.price)
+    assert by_frame.medians_for(flights).tolist() == by_row.medians_for(flights).tolist()
+
+
+def test_weeks_behind_the_retention_window_are_evicted_and_slots_reused():
+    store = PriceHistoryStore(capacity=4, retention_weeks=2)
+    for week in range(3):
+        store.observe('SFO', 'JFK', 'economy', MONDAY + timedelta(weeks=week), 200)
+    assert len(store) == 3 and store.evicted == 0
+
+    # Week 3 is newest: week 0 is more than two weeks behind it
+    store.observe('SFO', 'JFK', 'economy', MONDAY + timedelta(weeks=3), 200)
+    assert len(store) == 3 and store.evicted == 1
+    assert store.quantiles('SFO', 'JFK', 'economy', MONDAY) is None
+    assert store.quantiles('SFO', 'JFK', 'economy', MONDAY + timedelta(weeks=1))['count'] == 1
+
+    # Older departures arriving late don't move the window back
+    store.observe('SFO', 'JFK', 'economy', MONDAY + timedelta(weeks=2), 300)
+    assert store.evicted == 1
+
+    # A jump across the year boundary evicts everything before it; freed slots are reused
+    store.observe_frame(pd.DataFrame({
+        'departure_airport': ['SFO'] * 3, 'arrival_airport': ['JFK'] * 3, 'cabin_class': ['economy'] * 3,
+        'departure_time': [MONDAY + timedelta(weeks=52 + i) for i in range(3)], 'price': [250.0] * 3,
+    }))
+    assert len(store) == 3 and store.evicted == 4
+    assert len(store._counts) == 4
+    assert store.quantiles('SFO', 'JFK', 'economy', MONDAY + timedelta(weeks=53))['count'] == 1
@@ -0,0 +1,172 @@
+import asyncio
+import sqlite3
+import time
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from services.trip_data import TripDataService
+
+START = datetime(2026, 12, 20)
+END = datetime(2026, 12, 27)
+
+
+class AsyncMongo:
+    """motor-shaped view of a mongomock client: db[name].aggregate() is async-iterable"""
+
+    def __init__(self, client, fail=False):
+        self.client = client
+        self.fail = fail
+
+    def __getitem__(self, db):
+        return AsyncDatabase(self.client[db], self.fail)
+
+
+class AsyncDatabase:
+    def __init__(self, db, fail):
+        self.db = db
+        self.fail = fail
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.db[name], self.fail)
+
+
+class AsyncCollection:
+    def __init__(self, collection, fail):
+        self.collection = collection
+        self.fail = fail
+
+    async def aggregate(self, pipeline):
+        if self.fail:
+            raise RuntimeError('mongo down')
+        for doc in self.collection.aggregate(pipeline):
+            yield doc
+
+
+@pytest.fixture
+def listings_db(tmp_path):
+    path = tmp_path / 'listings.db'
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE flights (id TEXT, flight_code TEXT, airline TEXT, departure_airport TEXT,
+            arrival_airport TEXT, departure_time TEXT, arrival_time TEXT, duration INT, stops INT,
+            price REAL, seats_left INT, cabin_class TEXT, rating REAL);
+        CREATE TABLE hotels (id TEXT, listing_id INT, name TEXT, city TEXT, state TEXT, star_rating INT,
+            rating REAL, price_per_night REAL, room_type TEXT, approval_status TEXT);
+        CREATE TABLE cars (id TEXT, company_name TEXT, brand TEXT, model TEXT, type TEXT, seats INT,
+            daily_rental_price REAL, location TEXT, rating REAL, availability_status INT);
+    """)
+    conn.executemany("INSERT INTO flights VALUES (?, ?, 'UA', ?, ?, ?, ?, 300, 0, ?, 20, 'economy', 4.2)", [
+        ('f1', 'UA1', 'SFO', 'JFK', '2026-12-20 08:00:00', '2026-12-20 16:00:00', 250.0),
+        ('f2', 'UA2', 'JFK', 'SFO', '2026-12-27 09:00:00', '2026-12-27 12:00:00', 240.0),
+        ('f3', 'UA3', 'SFO', 'JFK', '2026-12-22 08:00:00', '2026-12-22 16:00:00', 199.0),
+        ('f4', 'UA4', 'LAX', 'ORD', '2026-12-20 08:00:00', '2026-12-20 14:00:00', 180.0),
+    ])
+    conn.executemany("INSERT INTO hotels VALUES (?, ?, ?, ?, 'NY', 4, 4.6, ?, 'Entire home', ?)", [
+        ('h1', 101, 'Midtown Loft', 'New York', 180.0, 'approved'),
+        ('h2', 102, 'Soho Studio', 'New York', 220.0, None),
+        ('h3', 103, 'Pending Place', 'New York', 90.0, 'pending'),
+        ('h4', 104, 'Lake House', 'Chicago', 120.0, 'approved'),
+    ])
+    conn.executemany("INSERT INTO cars VALUES (?, 'Hertz', 'Toyota', 'Camry', 'sedan', 5, ?, ?, 4.0, ?)", [
+        ('c1', 55.0, 'JFK', 1),
+        ('c2', 60.0, 'New York', 0),
+        ('c3', 45.0, 'ORD', 1),
+    ])
+    conn.commit()
+    conn.close()
+    return f'sqlite+aiosqlite:///{path}'
+
+
+@pytest.fixture
+def reviews():
+    collection = mongomock.MongoClient()['kayak']['reviews']
+    collection.insert_many([
+        {'listing_id': 101, 'reviewer_name': f'guest{i}', 'date': datetime(2026, 1, i + 1), 'comments': 'ok'}
+        for i in range(5)
+    ] + [{'listing_id': 104, 'reviewer_name': 'far', 'date': datetime(2026, 2, 1), 'comments': 'ok'}])
+    return collection.database.client
+
+
+def fetch(service, mongo=None, slow=None, **kwargs):
+    """Run fetch_trip_candidates against the stand-ins; `slow` delays named fetch_* methods"""
+    async def run():
+        await service.connect()
+        if mongo is not None:
+            service.mongo = mongo
+        for name, delay in (slow or {}).items():
+            original = getattr(service, f'fetch_{name}')
+
+            async def delayed(*args, _original=original, _delay=delay):
+                await asyncio.sleep(_delay)
+                return await _original(*args)
+            setattr(service, f'fetch_{name}', delayed)
+        try:
+            return await service.fetch_trip_candidates(['SFO'], ['JFK'], 'New York', START, END, **kwargs)
+        finally:
+            service.mongo = None
+            await service.close()
+    return asyncio.run(run())
+
+
+def test_candidates_from_every_source(listings_db, reviews):
+    report = fetch(TripDataService(listings_url=listings_db), AsyncMongo(reviews))
+
+    assert report['errors'] == {}
+    assert sorted(report['flights']['id']) == ['f1', 'f2']
+    assert sorted(report['hotels']['name']) == ['Midtown Loft', 'Soho Studio']
+    assert report['cars']['id'].tolist() == ['c1']
+    assert report['reviews'][101]['count'] == 5
+    assert [r['reviewer_name'] for r in report['reviews'][101]['recent']] == ['guest4', 'guest3', 'guest2']
+    assert 104 not in report['reviews']
+    assert set(report['timings_ms']) == {'flights', 'hotels', 'cars', 'reviews'}
+
+
+def test_lookups_run_concurrently(listings_db, reviews):
+    service = TripDataService(listings_url=listings_db)
+    started = time.perf_counter()
+    report = fetch(service, AsyncMongo(reviews), slow={'flights': 0.3, 'hotels': 0.3, 'cars': 0.3})
+    elapsed = time.perf_counter() - started
+
+    assert report['errors'] == {}
+    # Three 0.3s lookups side by side; sequential would be at least 0.9s
+    assert elapsed < 0.8
+    for source in ('flights', 'hotels', 'cars'):
+        assert report['timings_ms'][source] >= 300
+
+
+def test_reviews_wait_for_hotels_but_not_for_flights(listings_db, reviews):
+    report = fetch(TripDataService(listings_url=listings_db), AsyncMongo(reviews),
+                   slow={'flights': 0.4, 'reviews': 0.1})
+
+    assert report['reviews'][101]['count'] == 5
+    assert report['timings_ms']['reviews'] < report['timings_ms']['flights']
+
+
+def test_timeout_is_reported_per_source(listings_db, reviews):
+    service = TripDataService(listings_url=listings_db, timeouts={'flights': 0.05})
+    report = fetch(service, AsyncMongo(reviews), slow={'flights': 0.5})
+
+    assert report['errors'] == {'flights': 'timeout'}
+    assert report['flights'] is None
+    assert 40 <= report['timings_ms']['flights'] < 400
+    assert len(report['hotels']) == 2 and len(report['cars']) == 1
+
+
+def test_failed_sources_do_not_block_the_rest(listings_db, reviews, tmp_path):
+    sqlite3.connect(listings_db.split('///', 1)[1]).execute('DROP TABLE cars').connection.commit()
+    report = fetch(TripDataService(listings_url=listings_db), AsyncMongo(reviews, fail=True))
+
+    assert set(report['errors']) == {'cars', 'reviews'}
+    assert 'cars' in report['errors']['cars']
+    assert report['errors']['reviews'] == 'mongo down'
+    assert report['cars'] is None and report['reviews'] is None
+    assert sorted(report['flights']['id']) == ['f1', 'f2']
+    assert len(report['hotels']) == 2
+    assert set(report['timings_ms']) == {'flights', 'hotels', 'cars', 'reviews'}
+
+
+def test_without_listings_database_nothing_is_fetched():
+    report = asyncio.run(TripDataService().fetch_trip_candidates(['SFO'], ['JFK'], 'New York', START))
+    assert report['flights'] is None and report['errors'] == {} and report['timings_ms'] == {}
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized deal scoring vs the scalar is_deal path
+"""
+
+import argparse
+import os
+import sys
+import time
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../services/ai-agent')
+sys.path.insert(0, os.path.abspath(AGENT_DIR))
+
+import numpy as np
+from agents.deal_detector import DealDetector
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    detector = DealDetector()
+    flights = detector.generate_mock_flights(args.rows, seed=42)
+    print(f"Scoring {len(flights):,} synthetic flights")
+
+    start = time.perf_counter()
+    scores = detector.score_frame(flights)
+    vector_mask = scores >= detector.threshold
+    vector_time = time.perf_counter() - start
+    print(f"  vectorized score_batch: {vector_time:.3f}s ({vector_mask.sum():,} deals)")
+
+    records = flights.to_dict('records')
+    start = time.perf_counter()
+    scalar_mask = np.fromiter((detector.is_deal(r) for r in records), dtype=bool, count=len(records))
+    scalar_time = time.perf_counter() - start
+    print(f"  scalar is_deal loop:    {scalar_time:.3f}s ({scalar_mask.sum():,} deals)")
+
+    mismatches = int((vector_mask != scalar_mask).sum())
+    print(f"  speedup: {scalar_time / vector_time:.1f}x, mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: WebSocketService fan-out vs sequential send_json broadcast
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../services/ai-agent')
+sys.path.insert(0, os.path.abspath(AGENT_DIR))
+
+from services.websocket_service import WebSocketService
+
+
+class SimulatedSocket:
+    """In-process client; a fraction of clients are slow to read"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def send_json(self, message):
+        await self.send_text(json.dumps(message))
+
+    async def close(self, code=1000):
+        pass
+
+
+def make_sockets(n, slow_ratio, slow_delay):
+    n_slow = int(n * slow_ratio)
+    return [SimulatedSocket(slow_delay if i < n_slow else 0.0) for i in range(n)]
+
+
+async def sequential(n, messages, slow_ratio, slow_delay):
+    sockets = make_sockets(n, slow_ratio, slow_delay)
+    start = time.perf_counter()
+    for i in range(messages):
+        for socket in sockets:
+            await socket.send_json({'type': 'deal', 'seq': i})
+    return time.perf_counter() - start
+
+
+async def fan_out(n, messages, slow_ratio, slow_delay):
+    service = WebSocketService()
+    sockets = make_sockets(n, slow_ratio, slow_delay)
+    for socket in sockets:
+        await service.connect(socket)
+    fast = [s for s in sockets if not s.delay]
+
+    start = time.perf_counter()
+    for i in range(messages):
+        await service.broadcast({'type': 'deal', 'seq': i})
+    # Time until every fast client has the whole stream
+    while any(s.received < messages for s in fast):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    for socket in sockets:
+        service.disconnect(socket)
+    return elapsed, service.stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--slow-ratio', type=float, default=0.01)
+    parser.add_argument('--slow-delay', type=float, default=0.005)
+    args = parser.parse_args()
+
+    for n in (1_000, 10_000):
+        print(f"{n:,} connections, {args.messages} messages, {args.slow_ratio:.0%} slow clients")
+        elapsed, stats = await fan_out(n, args.messages, args.slow_ratio, args.slow_delay)
+        print(f"  fan-out engine: {elapsed:.3f}s to deliver to all fast clients "
+              f"(dropped {stats['messages_dropped']:,} for slow clients)")
+        elapsed = await sequential(n, args.messages, args.slow_ratio, args.slow_delay)
+        print(f"  sequential send_json: {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: column-wise listing cleaners vs the scalar import_listings.py helpers
+"""
+
+import argparse
+import os
+import sys
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../scripts')
+sys.path.insert(0, os.path.abspath(SCRIPTS_DIR))
+
+import numpy as np
+import pandas as pd
+import import_listings as scalar
+import listing_cleaners as vector
+
+# Messy values seen in Inside Airbnb dumps, plus edge cases around every threshold
+PRICES = ['$150.00', '$1,250.00', '$9.99', '$10.00', '$10,000.00', '$10,000.01', '', 'abc',
+          '1.2.3', '.', '$85', ' $99.50 ', '€120,00', '$0.00']
+SCORES = ['', 'N/A', '4.95', '4.8', '4.79', '4.5', '4.0', '3.99', '3.5', '0', '97', '100',
+          ' 4.6 ', 'abc4', '5', '5.01', '-1', '80.0']
+COORDS_LAT = ['', 'x', '40.70', '40.75', '40.65', '40.55', '40.85', '40.91', '41.5']
+COORDS_LON = ['', 'x', '-74.00', '-73.95', '-73.90', '-73.80', '-73.72', '-74.04', '-75']
+NEIGHBOURHOODS = ['', 'Brooklyn, New York, United States', '  Harlem ', 'x' * 150]
+AMENITIES = ['', '[]', '["Wifi", "Kitchen"]', '["' + '", "'.join(f'a{i}' for i in range(15)) + '"]']
+
+
+def make_listings(rows, seed=42):
+    """Listings as csv.DictReader yields them: every value a string, '' when empty"""
+    rng = np.random.default_rng(seed)
+
+    def pick(values, noise=None):
+        column = pd.Series(np.array(values, dtype=object)[rng.integers(0, len(values), rows)])
+        if noise is not None:
+            # Mostly realistic random values, with the edge cases mixed in
+            mask = rng.random(rows) < 0.7
+            column[mask] = noise[mask]
+        return column
+
+    lat = np.char.mod('%.5f', rng.uniform(40.5, 40.95, rows)).astype(object)
+    lon = np.char.mod('%.5f', rng.uniform(-74.1, -73.65, rows)).astype(object)
+    return pd.DataFrame({
+        'price': pick(PRICES, np.char.mod('$%.2f', rng.uniform(5, 12000, rows)).astype(object)),
+        'review_scores_rating': pick(SCORES, np.char.mod('%.2f', rng.uniform(2.5, 5.0, rows)).astype(object)),
+        'neighbourhood': pick(NEIGHBOURHOODS),
+        'neighbourhood_cleansed': pick(['', 'Williamsburg', 'Astoria ', 'Bedford-Stuyvesant']),
+        'latitude': pick(COORDS_LAT, lat),
+        'longitude': pick(COORDS_LON, lon),
+        'amenities': pick(AMENITIES),
+    })
+
+
+def scalar_clean(listings):
+    records = listings.to_dict('records')
+    location = [scalar.extract_location(r['neighbourhood'], r['neighbourhood_cleansed'],
+                                        r['latitude'], r['longitude']) for r in records]
+    return pd.DataFrame({
+        'city': [loc[0] for loc in location],
+        'state': [loc[1] for loc in location],
+        'zip_code': [loc[2] for loc in location],
+        'price': [scalar.clean_price(r['price']) for r in records],
+        'star_rating': [scalar.get_star_rating(r['review_scores_rating']) for r in records],
+        'amenities': [scalar.parse_amenities(r['amenities']) for r in records],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    listings = make_listings(args.rows)
+    print(f"Cleaning {len(listings):,} synthetic listings")
+
+    start = time.perf_counter()
+    vectorized = vector.clean_frame(listings)
+    vector_time = time.perf_counter() - start
+    print(f"  column-wise clean_frame: {vector_time:.3f}s")
+
+    start = time.perf_counter()
+    expected = scalar_clean(listings)
+    scalar_time = time.perf_counter() - start
+    print(f"  scalar helpers per row:  {scalar_time:.3f}s")
+
+    mismatches = {}
+    for column in expected:
+        left, right = vectorized[column].tolist(), expected[column].tolist()
+        mismatches[column] = sum(a != b for a, b in zip(left, right))
+    print(f"  speedup: {scalar_time / vector_time:.1f}x, mismatches: {mismatches}")
+    return 1 if any(mismatches.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())